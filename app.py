@@ -0,0 +1,87 @@
+from contextlib import asynccontextmanager
+from typing import List, Literal
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from pydantic import create_model
+
+from src.constants import (APP_HOST, APP_PORT, APP_MODEL_FILE_PATH, APP_MAX_BATCH_SIZE, APP_MAX_WAIT_MS,
+                           APP_INFERENCE_WORKERS, MODEL_CACHE_REFRESH_SECONDS, SCHEMA_FILE_PATH, TARGET_COLUMN)
+from src.logger import logging
+from src.pipline.prediction_pipeline import MicroBatcher, prediction_executor
+from src.utils.main_utils import read_yaml_file
+
+
+def vehicle_record_model():
+    """
+    Builds the request body model from config/schema.yaml: one required field per input
+    column, with the categorical columns restricted to their known values.
+    """
+    schema = read_yaml_file(SCHEMA_FILE_PATH)
+    types = {"int": int, "float": float, "category": str}
+    fields = {}
+    for column in schema["columns"]:
+        for name, kind in column.items():
+            if name == TARGET_COLUMN:
+                continue
+            values = schema["category_values"].get(name)
+            fields[name] = (Literal[tuple(values)] if values else types[kind], ...)
+    return create_model("VehicleRecord", **fields)
+
+
+VehicleRecord = vehicle_record_model()
+
+# scored once at startup so that the workers have loaded the model before the first request
+WARMUP_RECORD = {"Gender": "Male", "Age": 30, "Driving_License": 1, "Region_Code": 28.0, "Previously_Insured": 0,
+                 "Vehicle_Age": "1-2 Year", "Vehicle_Damage": "Yes", "Annual_Premium": 30000.0,
+                 "Policy_Sales_Channel": 26.0, "Vintage": 100}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logging.info(f"Loading model {APP_MODEL_FILE_PATH} with {APP_INFERENCE_WORKERS} inference workers")
+    executor = prediction_executor(APP_MODEL_FILE_PATH, APP_INFERENCE_WORKERS, refresh_seconds=MODEL_CACHE_REFRESH_SECONDS)
+    batcher = MicroBatcher(executor, max_batch_size=APP_MAX_BATCH_SIZE, max_wait_seconds=APP_MAX_WAIT_MS / 1000,
+                           max_concurrent_batches=max(APP_INFERENCE_WORKERS, 1))
+    await batcher.score({name: [value] for name, value in WARMUP_RECORD.items()})
+    await batcher.start()
+    app.state.batcher = batcher
+    yield
+    await batcher.stop()
+    executor.shutdown(cancel_futures=True)
+
+
+app = FastAPI(title="Vehicle insurance response prediction", lifespan=lifespan)
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "model": APP_MODEL_FILE_PATH, "max_batch_size": APP_MAX_BATCH_SIZE,
+            "max_wait_ms": APP_MAX_WAIT_MS}
+
+
+@app.post("/predict")
+async def predict(record: VehicleRecord):
+    try:
+        prediction, probability = await app.state.batcher.submit(record.model_dump())
+    except Exception as e:
+        logging.error(f"Prediction failed: {e}")
+        raise HTTPException(status_code=500, detail="Prediction failed")
+    return {"prediction": int(prediction), "probability": probability}
+
+
+@app.post("/predict/batch")
+async def predict_batch(records: List[VehicleRecord]):
+    if not records:
+        return {"predictions": [], "probabilities": []}
+    rows = [record.model_dump() for record in records]
+    try:
+        predictions, probabilities = await app.state.batcher.score({name: [row[name] for row in rows] for name in rows[0]})
+    except Exception as e:
+        logging.error(f"Batch prediction failed: {e}")
+        raise HTTPException(status_code=500, detail="Prediction failed")
+    return {"predictions": predictions.astype(int).tolist(), "probabilities": probabilities.tolist()}
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host=APP_HOST, port=APP_PORT)
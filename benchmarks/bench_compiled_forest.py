@@ -0,0 +1,66 @@
+"""
+Throughput of CompiledForest against the estimator's own predict_proba across batch sizes.
+
+The forest (or histogram gradient boosting model) is fitted on synthetic records and
+compiled with float64 and with float32 thresholds; every batch is scored on the
+preprocessed float32 features, one process, and the median over repeats is reported:
+
+    python benchmarks/bench_compiled_forest.py
+    python benchmarks/bench_compiled_forest.py --model hist_gradient_boosting --batch-sizes 1 1024 65536
+"""
+import argparse
+import time
+
+from vehicle_data import transformed_arrays, vehicle_frame
+
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+
+from src.entity.estimator import CompiledForest
+
+
+def median_seconds(function, argument, repeats: int) -> float:
+    function(argument)
+    seconds = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function(argument)
+        seconds.append(time.perf_counter() - started)
+    return float(np.median(seconds))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", choices=["random_forest", "hist_gradient_boosting"], default="random_forest")
+    parser.add_argument("--train-rows", type=int, default=50000)
+    parser.add_argument("--trees", type=int, default=200)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 256, 1024, 8192, 65536])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    _, features, target = transformed_arrays(vehicle_frame(args.train_rows + max(args.batch_sizes)))
+    features = np.asarray(features, dtype=np.float32)
+    train_x, score_x = features[:args.train_rows], features[args.train_rows:]
+    if args.model == "random_forest":
+        estimator = RandomForestClassifier(n_estimators=args.trees, criterion="entropy", max_depth=20, min_samples_split=7,
+                                           min_samples_leaf=6, n_jobs=1, random_state=101)
+    else:
+        estimator = HistGradientBoostingClassifier(max_iter=args.trees, max_leaf_nodes=31, early_stopping=False,
+                                                   random_state=101)
+    estimator.fit(train_x, target[:args.train_rows])
+    compiled = {"float64": CompiledForest.from_estimator(estimator),
+                "float32": CompiledForest.from_estimator(estimator, float32_thresholds=True)}
+    print(f"{compiled['float64']!r}\n")
+
+    print(f"{'rows':>7}{'sklearn rows/s':>16}{'float64 rows/s':>16}{'float32 rows/s':>16}{'speedup':>9}{'max |diff|':>12}")
+    for batch_size in args.batch_sizes:
+        batch = score_x[:batch_size]
+        repeats = max(3, args.repeats * 1024 // max(batch_size, 1024))
+        rates = [batch_size / median_seconds(function, batch, repeats)
+                 for function in (estimator.predict_proba, compiled["float64"].predict_proba, compiled["float32"].predict_proba)]
+        difference = np.abs(compiled["float32"].predict_proba(batch) - estimator.predict_proba(batch)).max()
+        print(f"{batch_size:>7}{rates[0]:>16.0f}{rates[1]:>16.0f}{rates[2]:>16.0f}{max(rates[1:]) / rates[0]:>8.1f}x{difference:>12.1e}")
+
+
+if __name__ == "__main__":
+    main()
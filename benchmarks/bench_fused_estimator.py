@@ -0,0 +1,62 @@
+"""
+Latency of scoring raw records with VehicleInsuranceModel against the pandas/sklearn path.
+
+The pandas path is MyModel: records in a DataFrame, encoded, then scaled by the fitted
+ColumnTransformer before the forest runs. VehicleInsuranceModel scores the same records
+from a dict of NumPy columns (a dict of scalars for one record). Both the preprocessing
+alone and the full score are timed, as p50/p99 over repeated calls:
+
+    python benchmarks/bench_fused_estimator.py
+    python benchmarks/bench_fused_estimator.py --batch-sizes 1 32 1024 8192 --repeats 500
+"""
+import argparse
+import time
+
+from vehicle_data import fitted_model, vehicle_frame
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from src.constants import TARGET_COLUMN
+from src.entity.estimator import VehicleInsuranceModel
+
+
+def percentiles(function, argument, repeats: int) -> tuple:
+    function(argument)
+    seconds = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function(argument)
+        seconds.append(time.perf_counter() - started)
+    return tuple(np.percentile(seconds, [50, 99]) * 1000)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--train-rows", type=int, default=50000)
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 1024])
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    model = fitted_model(vehicle_frame(args.train_rows),
+                         RandomForestClassifier(n_estimators=args.trees, max_depth=20, min_samples_leaf=6, random_state=101))
+    fused = VehicleInsuranceModel(model)
+    frame = vehicle_frame(max(args.batch_sizes), seed=1).drop(columns=TARGET_COLUMN)
+    columns = {name: frame[name].to_numpy() for name in frame.columns}
+    one_record = frame.iloc[0].to_dict()
+
+    print(f"{'rows':>6}  {'step':<12}{'pandas p50':>12}{'p99 ms':>9}{'fused p50':>12}{'p99 ms':>9}{'speedup':>9}")
+    for batch_size in args.batch_sizes:
+        records = one_record if batch_size == 1 else {name: values[:batch_size] for name, values in columns.items()}
+        batch = frame.iloc[:batch_size]
+        for step, pandas_path, fused_path in (("preprocess", model.transform, fused.transform),
+                                              ("score", model.predict_proba, fused.predict_proba)):
+            pandas_p50, pandas_p99 = percentiles(pandas_path, batch, args.repeats)
+            fused_p50, fused_p99 = percentiles(fused_path, records, args.repeats)
+            print(f"{batch_size:>6}  {step:<12}{pandas_p50:>12.3f}{pandas_p99:>9.3f}{fused_p50:>12.3f}{fused_p99:>9.3f}"
+                  f"{pandas_p50 / fused_p50:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Fit time, model size and F1 of the model families of config/model.yaml.
+
+The random forest baseline is fitted on the float features, histogram gradient boosting
+both on the float features and on the uint8 bins written by the transformation stage.
+The bins are fitted once per run and shared by every binned candidate, but
+HistGradientBoostingClassifier still maps its input to its own bins on every fit; the
+"own binning" column times that step, for the float and the pre-binned input:
+
+    python benchmarks/bench_model_families.py --rows 100000
+    python benchmarks/bench_model_families.py --rows 400000 --forest-trees 200
+"""
+import argparse
+import pickle
+import time
+
+from vehicle_data import transformed_arrays, vehicle_frame
+
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.ensemble._hist_gradient_boosting.binning import _BinMapper
+from sklearn.metrics import f1_score
+
+from src.entity.estimator import BinnedClassifier, FeatureBinner
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--forest-trees", type=int, default=100)
+    parser.add_argument("--boosting-iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    frame = vehicle_frame(args.rows + args.rows // 4)
+    _, features, target = transformed_arrays(frame)
+    train_x, test_x = features[:args.rows], features[args.rows:]
+    train_y, test_y = target[:args.rows], target[args.rows:]
+
+    binner, binner_fit_seconds = timed(FeatureBinner.fit, train_x)
+    binned_train_x, bin_seconds = timed(binner.transform, train_x)
+    print(f"{args.rows} training rows, {train_x.shape[1]} features; "
+          f"FeatureBinner fit {binner_fit_seconds:.2f}s + transform {bin_seconds:.2f}s, once per run\n")
+
+    boosting = dict(learning_rate=0.1, max_iter=args.boosting_iterations, max_leaf_nodes=31,
+                    early_stopping=False, random_state=101)
+    families = [
+        ("random_forest", RandomForestClassifier(n_estimators=args.forest_trees, criterion="entropy", max_depth=20,
+                                                 min_samples_split=7, min_samples_leaf=6, n_jobs=1, random_state=101),
+         train_x, lambda model: model),
+        ("hist_gradient_boosting", HistGradientBoostingClassifier(**boosting), train_x, lambda model: model),
+        ("hist_gradient_boosting (binned)", HistGradientBoostingClassifier(**boosting), binned_train_x,
+         lambda model: BinnedClassifier(binner, model)),
+    ]
+    print(f"{'family':<34}{'fit s':>8}{'own binning s':>15}{'size MiB':>10}{'F1':>8}")
+    for name, estimator, train, wrap in families:
+        _, fit_seconds = timed(estimator.fit, train, train_y)
+        own_binning = "-"
+        if isinstance(estimator, HistGradientBoostingClassifier):
+            _, seconds = timed(_BinMapper(n_bins=256, random_state=101).fit_transform, np.asarray(train, dtype=np.float64))
+            own_binning = f"{seconds:.3f}"
+        model = wrap(estimator)
+        size = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 2**20
+        f1 = f1_score(test_y, model.predict(test_x))
+        print(f"{name:<34}{fit_seconds:>8.2f}{own_binning:>15}{size:>10.2f}{f1:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
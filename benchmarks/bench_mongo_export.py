@@ -0,0 +1,78 @@
+"""
+Throughput of the MongoDB export as the number of workers grows.
+
+By default the collection is served by mongomock, in one process, so the workers are
+threads and the numbers mostly show the partitioning overhead. Pass --mongo-url of a
+local mongod to measure the real export with one process per worker:
+
+    python benchmarks/bench_mongo_export.py --rows 50000
+    python benchmarks/bench_mongo_export.py --mongo-url mongodb://localhost:27017 --rows 2000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.configuration.mongo_db_connection import MongoDBConnection
+from src.constants import DATABASE_NAME
+from src.data_access.proj1_data import Proj1Data
+
+COLLECTION = "bench_vehicle_data"
+
+
+def documents(n_rows: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [{"id": i, "Gender": ["Male", "Female"][int(g)], "Age": int(a), "Driving_License": 1,
+             "Region_Code": float(r), "Previously_Insured": int(p), "Vehicle_Age": "1-2 Year",
+             "Vehicle_Damage": "Yes", "Annual_Premium": float(ap), "Policy_Sales_Channel": 26.0,
+             "Vintage": int(v), "Response": int(p)}
+            for i, (g, a, r, p, ap, v) in enumerate(zip(rng.integers(0, 2, n_rows), rng.integers(20, 85, n_rows),
+                                                          rng.integers(0, 52, n_rows), rng.integers(0, 2, n_rows),
+                                                          rng.uniform(2630, 540165, n_rows), rng.integers(10, 299, n_rows)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--partitions-per-worker", type=int, default=2)
+    parser.add_argument("--mongo-url", default=None)
+    args = parser.parse_args()
+
+    if args.mongo_url is None:
+        import mongomock
+        client = mongomock.MongoClient()
+        MongoDBConnection._create_client = staticmethod(lambda: client)
+    else:
+        os.environ["mongo_url"] = args.mongo_url
+        import pymongo
+        client = pymongo.MongoClient(args.mongo_url)
+        MongoDBConnection._create_client = staticmethod(lambda: pymongo.MongoClient(args.mongo_url))
+    collection = client[DATABASE_NAME][COLLECTION]
+    collection.drop()
+    collection.insert_many(documents(args.rows))
+    use_processes = args.mongo_url is not None
+
+    proj1_data = Proj1Data()
+    started = time.perf_counter()
+    baseline = proj1_data.export_collection_as_dataframe(COLLECTION)
+    seconds = time.perf_counter() - started
+    print(f"{'workers':>8} {'partitions':>10} {'seconds':>8} {'rows/s':>10}")
+    print(f"{'stream':>8} {1:>10} {seconds:>8.2f} {len(baseline) / seconds:>10.0f}")
+    for workers in args.workers:
+        partitions = workers * args.partitions_per_worker
+        started = time.perf_counter()
+        df = proj1_data.export_collection_parallel(COLLECTION, num_partitions=partitions, max_workers=workers,
+                                                   use_processes=use_processes)
+        seconds = time.perf_counter() - started
+        assert len(df) == len(baseline)
+        print(f"{workers:>8} {partitions:>10} {seconds:>8.2f} {len(df) / seconds:>10.0f}")
+    collection.drop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Throughput of SimpleStorageService transfers, and the work saved when an interrupted one resumes.
+
+A random file of --size-mib is uploaded and downloaded once with a single request (below the
+multipart threshold) and then in parts with every --concurrency value, reporting MiB/s.
+An upload and a download are then interrupted halfway and resumed, and the bytes sent again
+are reported. By default the bucket lives on a local moto server, which measures the client
+side of the transfer; pass --endpoint-url (and credentials in the environment) to measure a
+real S3-compatible store:
+
+    python benchmarks/bench_s3_transfer.py
+    python benchmarks/bench_s3_transfer.py --size-mib 512 --concurrency 1 4 8 16 --endpoint-url http://minio:9000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.cloud_storage.aws_storage import SimpleStorageService
+from src.configuration.aws_connection import S3Client
+
+MIB = 1024 * 1024
+BUCKET = "bench-s3-transfer"
+
+
+def interrupt_after(storage: SimpleStorageService, operation: str, calls: int) -> list:
+    """
+    Makes the client's `operation` fail after `calls` calls, recording every call; returns the record.
+    """
+    original, made = getattr(storage.s3_client, operation), []
+
+    def operation_call(**kwargs):
+        made.append(kwargs)
+        if len(made) > calls:
+            raise ConnectionError("interrupted by the benchmark")
+        return original(**kwargs)
+
+    setattr(storage.s3_client, operation, operation_call)
+    return made
+
+
+def restore(storage: SimpleStorageService, operation: str) -> None:
+    delattr(storage.s3_client, operation)
+
+
+def timed(function, *args) -> float:
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mib", type=int, default=128)
+    parser.add_argument("--part-size-mib", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--endpoint-url", default=None)
+    parser.add_argument("--port", type=int, default=5056)
+    args = parser.parse_args()
+
+    server = None
+    if args.endpoint_url is None:
+        from moto.server import ThreadedMotoServer
+        server = ThreadedMotoServer(port=args.port, verbose=False)
+        server.start()
+        args.endpoint_url = f"http://127.0.0.1:{args.port}"
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+    S3Client(endpoint_url=args.endpoint_url).s3_client.create_bucket(Bucket=BUCKET)
+    directory = tempfile.mkdtemp()
+    source = os.path.join(directory, "model.bin")
+    with open(source, "wb") as file:
+        for _ in range(args.size_mib):
+            file.write(os.urandom(MIB))
+    size = args.size_mib * MIB
+    part_size = args.part_size_mib * MIB
+
+    def transfer(key: str, **options) -> tuple:
+        storage = SimpleStorageService(state_dir=os.path.join(directory, "state"), **options)
+        upload = timed(storage.upload_file, source, BUCKET, key)
+        download = timed(storage.download_file, BUCKET, key, os.path.join(directory, key))
+        return size / MIB / upload, size / MIB / download
+
+    try:
+        print(f"{args.size_mib} MiB file, {args.part_size_mib} MiB parts, {args.endpoint_url}\n")
+        print(f"{'transfer':<28}{'upload MiB/s':>14}{'download MiB/s':>16}")
+        upload, download = transfer("single", multipart_threshold=size, max_concurrency=1)
+        print(f"{'single request':<28}{upload:>14.1f}{download:>16.1f}")
+        for concurrency in args.concurrency:
+            upload, download = transfer(f"parts-{concurrency}", part_size=part_size, multipart_threshold=part_size,
+                                        max_concurrency=concurrency)
+            print(f"{f'multipart, {concurrency} at a time':<28}{upload:>14.1f}{download:>16.1f}")
+
+        n_parts = -(-size // part_size)
+        storage = SimpleStorageService(part_size=part_size, multipart_threshold=part_size, max_concurrency=1,
+                                       state_dir=os.path.join(directory, "state"))
+        interrupt_after(storage, "upload_part", n_parts // 2)
+        try:
+            storage.upload_file(source, BUCKET, "resumed")
+        except Exception:
+            restore(storage, "upload_part")
+        resent = interrupt_after(storage, "upload_part", n_parts)
+        storage.upload_file(source, BUCKET, "resumed")
+        restore(storage, "upload_part")
+        print(f"\nupload interrupted after {n_parts // 2}/{n_parts} parts: resumed with {len(resent)} parts "
+              f"({sum(len(call['Body']) for call in resent) / MIB:.0f} of {args.size_mib} MiB)")
+
+        local_path = os.path.join(directory, "resumed.bin")
+        interrupt_after(storage, "get_object", n_parts // 2)
+        try:
+            storage.download_file(BUCKET, "resumed", local_path)
+        except Exception:
+            restore(storage, "get_object")
+        fetched = interrupt_after(storage, "get_object", n_parts)
+        storage.download_file(BUCKET, "resumed", local_path)
+        restore(storage, "get_object")
+        print(f"download interrupted after {n_parts // 2}/{n_parts} parts: resumed with {len(fetched)} ranged GETs")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+        if server is not None:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
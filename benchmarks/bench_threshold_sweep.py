@@ -0,0 +1,64 @@
+"""
+Time of the sorted threshold sweep against a loop calling f1_score once per threshold.
+
+The scores are synthetic positive-class probabilities with the class balance of the vehicle
+data. optimal_threshold sweeps every distinct score; the naive loop is timed on a sample of
+those thresholds and extrapolated to all of them, and also run in full on a 101-point grid:
+
+    python benchmarks/bench_threshold_sweep.py
+    python benchmarks/bench_threshold_sweep.py --rows 100000 --naive-thresholds 50
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sklearn.metrics import f1_score
+
+from src.entity.estimator import optimal_threshold
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--positive-rate", type=float, default=0.12)
+    parser.add_argument("--naive-thresholds", type=int, default=20,
+                        help="thresholds of the sweep timed with the naive loop")
+    parser.add_argument("--grid-points", type=int, default=101)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    y_true = rng.random(args.rows) < args.positive_rate
+    scores = np.clip(rng.normal(0.3 + 0.25 * y_true, 0.15), 0.0, 1.0)
+
+    started = time.perf_counter()
+    threshold, best, curve = optimal_threshold(y_true, scores)
+    sweep_seconds = time.perf_counter() - started
+    n_thresholds = len(curve["threshold"])
+
+    sample = rng.choice(n_thresholds, size=min(args.naive_thresholds, n_thresholds), replace=False)
+    started = time.perf_counter()
+    naive = [f1_score(y_true, scores >= curve["threshold"][index]) for index in sample]
+    per_threshold = (time.perf_counter() - started) / len(sample)
+    max_diff = float(np.max(np.abs(np.array(naive) - curve["f_beta"][sample])))
+
+    grid = np.linspace(0.0, 1.0, args.grid_points)
+    started = time.perf_counter()
+    grid_f1 = [f1_score(y_true, scores >= value) for value in grid]
+    grid_seconds = time.perf_counter() - started
+
+    print(f"{args.rows} rows, {n_thresholds} distinct thresholds\n")
+    print(f"sorted sweep, every threshold   {sweep_seconds:10.3f}s  best f1 {curve['f_beta'][best]:.5f} at {threshold:.4f}")
+    print(f"f1_score loop, every threshold  {per_threshold * n_thresholds:10.0f}s  "
+          f"(extrapolated from {len(sample)}, {per_threshold * 1000:.1f}ms each; max |diff| {max_diff:.1e})")
+    print(f"f1_score loop, {args.grid_points}-point grid   {grid_seconds:10.3f}s  "
+          f"best f1 {max(grid_f1):.5f} at {grid[int(np.argmax(grid_f1))]:.4f}")
+    print(f"\nspeedup over the full loop: {per_threshold * n_thresholds / sweep_seconds:.0f}x, "
+          f"over the grid: {grid_seconds / sweep_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
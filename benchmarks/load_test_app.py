@@ -0,0 +1,123 @@
+"""
+Load test of the prediction API (app.py) with micro-batching on and off.
+
+For every --max-batch-sizes value a server is started on --port with that
+APP_MAX_BATCH_SIZE (1 disables batching), then --requests single-record POST /predict
+calls are sent from --concurrency client threads, each on its own keep-alive connection.
+Latency p50/p99 and requests/s are reported. The model is --model (any APP_MODEL_FILE_PATH
+value, e.g. the registry s3://bucket/key) or, by default, a forest fitted on synthetic records:
+
+    python benchmarks/load_test_app.py
+    python benchmarks/load_test_app.py --model artifact/production_model/model.pkl --concurrency 1 8 64
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from vehicle_data import fitted_model, vehicle_frame
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from src.constants import TARGET_COLUMN
+from src.utils.main_utils import save_object
+
+
+def serve(model_file_path: str, max_batch_size: int, max_wait_ms: float, inference_workers: int, port: int) -> None:
+    import uvicorn
+
+    import src.constants
+    # app.py reads its settings from src.constants when it is imported
+    src.constants.APP_MODEL_FILE_PATH = model_file_path
+    src.constants.APP_MAX_BATCH_SIZE = max_batch_size
+    src.constants.APP_MAX_WAIT_MS = max_wait_ms
+    src.constants.APP_INFERENCE_WORKERS = inference_workers
+    from app import app
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def wait_until_ready(port: int, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/health")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"The server on port {port} did not start within {timeout}s")
+
+
+def run_load(port: int, bodies: list, n_requests: int, concurrency: int) -> tuple:
+    """
+    Returns the latencies of `n_requests` POST /predict calls sent by `concurrency` threads, and the elapsed time.
+    """
+    latencies, lock, counter = [], threading.Lock(), iter(range(n_requests))
+
+    def client() -> None:
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        own = []
+        for index in counter:
+            started = time.perf_counter()
+            connection.request("POST", "/predict", body=bodies[index % len(bodies)],
+                               headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                raise RuntimeError(f"POST /predict returned {response.status}")
+            own.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies), time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--max-batch-sizes", type=int, nargs="+", default=[1, 64])
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--inference-workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=5055)
+    args = parser.parse_args()
+
+    model_file_path = args.model
+    if model_file_path is None:
+        model_file_path = os.path.join(tempfile.mkdtemp(), "model.pkl")
+        save_object(model_file_path, fitted_model(vehicle_frame(50000), RandomForestClassifier(
+            n_estimators=100, max_depth=20, min_samples_leaf=6, random_state=101)))
+    bodies = [json.dumps(record) for record in vehicle_frame(1000, seed=1).drop(columns=TARGET_COLUMN).to_dict("records")]
+
+    print(f"{'max batch':>9}{'clients':>9}{'p50 ms':>9}{'p99 ms':>9}{'req/s':>9}")
+    for max_batch_size in args.max_batch_sizes:
+        server = multiprocessing.get_context("spawn").Process(
+            target=serve, args=(model_file_path, max_batch_size, args.max_wait_ms, args.inference_workers, args.port))
+        server.start()
+        try:
+            wait_until_ready(args.port)
+            for concurrency in args.concurrency:
+                run_load(args.port, bodies, min(args.requests, 200), concurrency)
+                latencies, seconds = run_load(args.port, bodies, args.requests, concurrency)
+                p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+                print(f"{max_batch_size:>9}{concurrency:>9}{p50:>9.1f}{p99:>9.1f}{args.requests / seconds:>9.0f}")
+        finally:
+            server.terminate()
+            server.join()
+
+
+if __name__ == "__main__":
+    main()
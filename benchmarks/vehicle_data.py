@@ -0,0 +1,68 @@
+"""
+Synthetic vehicle insurance records and models fitted on them, shared by the benchmarks.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from src.components.data_transformation import DataTransformation
+from src.constants import SCHEMA_FILE_PATH, TARGET_COLUMN
+from src.entity.estimator import FeatureEncoder, MyModel
+from src.logger import logging
+from src.utils.main_utils import read_yaml_file
+
+# keep the pipeline's INFO logs out of the benchmark tables
+logging.getLogger().setLevel(logging.WARNING)
+
+
+def vehicle_frame(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Raw records with the columns of config/schema.yaml; the response mostly follows
+    Vehicle_Damage, Previously_Insured and Age, with about 20% positives.
+    """
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "Gender": rng.choice(["Male", "Female"], n_rows),
+        "Age": rng.integers(20, 85, n_rows),
+        "Driving_License": rng.choice([0, 1], n_rows, p=[0.01, 0.99]),
+        "Region_Code": rng.integers(0, 52, n_rows).astype(float),
+        "Previously_Insured": rng.choice([0, 1], n_rows),
+        "Vehicle_Age": rng.choice(["< 1 Year", "1-2 Year", "> 2 Year"], n_rows),
+        "Vehicle_Damage": rng.choice(["Yes", "No"], n_rows),
+        "Annual_Premium": rng.uniform(2630, 100000, n_rows).round(0),
+        "Policy_Sales_Channel": rng.integers(1, 163, n_rows).astype(float),
+        "Vintage": rng.integers(10, 299, n_rows),
+    })
+    logit = (-3 + 3 * (frame.Vehicle_Damage == "Yes") - 3 * frame.Previously_Insured
+             + 0.05 * (frame.Age - 40) + np.sin(frame.Region_Code.to_numpy()))
+    frame[TARGET_COLUMN] = (rng.random(n_rows) < 1 / (1 + np.exp(-logit))).astype(int)
+    return frame
+
+
+def feature_encoder() -> FeatureEncoder:
+    return FeatureEncoder(read_yaml_file(SCHEMA_FILE_PATH))
+
+
+def transformed_arrays(frame: pd.DataFrame) -> tuple:
+    """
+    Encodes and scales `frame` as the transformation stage does.
+    Returns:
+        tuple: (fitted preprocessing pipeline, float features, target)
+    """
+    encoder = feature_encoder()
+    features = pd.DataFrame(encoder.encode(frame), columns=encoder.feature_names, copy=False)
+    preprocessing = DataTransformation(None, None, None).get_transformation_object()
+    return preprocessing, preprocessing.fit_transform(features), frame[TARGET_COLUMN].to_numpy()
+
+
+def fitted_model(frame: pd.DataFrame, estimator: object, decision_threshold: float = None) -> MyModel:
+    """
+    Fits `estimator` on the transformed `frame` and bundles it as the trainer does.
+    """
+    preprocessing, features, target = transformed_arrays(frame)
+    estimator.fit(features, target)
+    return MyModel(preprocessing, estimator, feature_encoder(), decision_threshold=decision_threshold)
@@ -1,4 +1,15 @@
+import argparse
+
 from src.pipline.training_pipeline import TrainingPipeline
 
-train= TrainingPipeline()
-train.run_pipeline()
\ No newline at end of file
+parser = argparse.ArgumentParser(description="Run the training pipeline graph.")
+parser.add_argument("--stages", nargs="+", default=None,
+                    help="stages to run together with their upstream stages (default: the full graph)")
+parser.add_argument("--full-refresh", action="store_true", help="rebuild the feature store from a full export")
+parser.add_argument("--force-recompute", action="store_true", help="ignore the stage cache")
+parser.add_argument("--workers", type=int, default=None, help="number of stages run concurrently")
+args = parser.parse_args()
+
+options = {"max_workers": args.workers} if args.workers else {}
+train = TrainingPipeline(full_refresh=args.full_refresh, force_recompute=args.force_recompute, **options)
+train.run_pipeline(stages=args.stages)
@@ -0,0 +1,311 @@
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from botocore.exceptions import ClientError
+
+from src.configuration.aws_connection import S3Client
+from src.constants import (S3_MULTIPART_THRESHOLD, S3_PART_SIZE, S3_MAX_CONCURRENCY, S3_SHA256_METADATA_KEY,
+                           S3_TRANSFER_STATE_DIR)
+from src.exception import MyException
+from src.logger import logging
+from src.utils.stage_cache import hash_file
+
+# block size used to stream ranged GET bodies to disk
+DOWNLOAD_BLOCK_SIZE = 1024 * 1024
+
+
+class SimpleStorageService:
+    """
+    Transfers files between the local disk and S3 (or an S3-compatible endpoint).
+
+    Every uploaded object carries the sha256 of its content in its metadata, so a transfer
+    is skipped when the other side already holds the same content. Files above the
+    multipart threshold are moved in parts on a thread pool: uploads read each part with
+    pread, downloads write each ranged GET to its offset with pwrite, so no whole object
+    is held in memory. The progress of a multipart transfer is kept in a state file and an
+    interrupted transfer resumes with the parts that are missing.
+    """
+
+    def __init__(self, part_size: int = S3_PART_SIZE, multipart_threshold: int = S3_MULTIPART_THRESHOLD,
+                 max_concurrency: int = S3_MAX_CONCURRENCY, state_dir: str = S3_TRANSFER_STATE_DIR,
+                 endpoint_url: Optional[str] = None):
+        try:
+            s3_client = S3Client(endpoint_url=endpoint_url)
+            self.s3_resource = s3_client.s3_resource
+            self.s3_client = s3_client.s3_client
+            self.part_size = part_size
+            self.multipart_threshold = multipart_threshold
+            self.max_concurrency = max_concurrency
+            self.state_dir = state_dir
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def s3_key_path_available(self, bucket_name: str, s3_key: str) -> bool:
+        """
+        Returns whether any object exists under the key prefix `s3_key`.
+        """
+        try:
+            response = self.s3_client.list_objects_v2(Bucket=bucket_name, Prefix=s3_key, MaxKeys=1)
+            return response.get("KeyCount", 0) > 0
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def head_object(self, bucket_name: str, s3_key: str) -> Optional[dict]:
+        """
+        Returns the object's metadata (ContentLength, ETag, Metadata...), or None when it does not exist.
+        """
+        try:
+            return self.s3_client.head_object(Bucket=bucket_name, Key=s3_key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise MyException(e, sys)
+
+    def object_sha256(self, bucket_name: str, s3_key: str) -> Optional[str]:
+        """
+        Returns the content sha256 recorded when the object was uploaded, or None.
+        """
+        head = self.head_object(bucket_name, s3_key)
+        return head["Metadata"].get(S3_SHA256_METADATA_KEY) if head else None
+
+    def _state_path(self, kind: str, bucket_name: str, s3_key: str, local_path: str) -> str:
+        digest = hashlib.sha256(json.dumps([kind, bucket_name, s3_key, os.path.abspath(local_path)]).encode()).hexdigest()
+        return os.path.join(self.state_dir, f"{kind}-{digest[:32]}.json")
+
+    @staticmethod
+    def _read_state(state_path: str) -> Optional[dict]:
+        if not os.path.exists(state_path):
+            return None
+        with open(state_path) as file:
+            return json.load(file)
+
+    @staticmethod
+    def _write_state(state_path: str, state: dict) -> None:
+        os.makedirs(os.path.dirname(state_path), exist_ok=True)
+        with open(state_path + ".tmp", "w") as file:
+            json.dump(state, file)
+        os.replace(state_path + ".tmp", state_path)
+
+    def upload_file(self, local_path: str, bucket_name: str, s3_key: str, metadata: Optional[dict] = None) -> bool:
+        """
+        Uploads a file unless the object already holds the same content.
+
+        Parameters:
+        ----------
+        local_path : str
+            File to upload.
+        bucket_name : str
+            Destination bucket.
+        s3_key : str
+            Destination key.
+        metadata : Optional[dict]
+            Extra user metadata stored with the object, next to its sha256.
+
+        Returns:
+        -------
+        bool
+            False when the upload was skipped because the content hash matched.
+        """
+        try:
+            size = os.path.getsize(local_path)
+            sha256 = hash_file(local_path)
+            head = self.head_object(bucket_name, s3_key)
+            if head is not None and head["ContentLength"] == size and head["Metadata"].get(S3_SHA256_METADATA_KEY) == sha256:
+                logging.info(f"Skipped upload of {local_path}: s3://{bucket_name}/{s3_key} has the same content")
+                return False
+            metadata = {**(metadata or {}), S3_SHA256_METADATA_KEY: sha256}
+            if size <= self.multipart_threshold:
+                with open(local_path, "rb") as file:
+                    self.s3_client.put_object(Bucket=bucket_name, Key=s3_key, Body=file, Metadata=metadata)
+            else:
+                self._multipart_upload(local_path, bucket_name, s3_key, size, sha256, metadata)
+            logging.info(f"Uploaded {local_path} ({size} bytes) to s3://{bucket_name}/{s3_key}")
+            return True
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def _uploaded_parts(self, bucket_name: str, s3_key: str, upload_id: str) -> Optional[dict]:
+        """
+        Returns {part number: (etag, size)} of an open multipart upload, or None when it no longer exists.
+        """
+        parts = {}
+        try:
+            paginator = self.s3_client.get_paginator("list_parts")
+            for page in paginator.paginate(Bucket=bucket_name, Key=s3_key, UploadId=upload_id):
+                for part in page.get("Parts", []):
+                    parts[part["PartNumber"]] = (part["ETag"], part["Size"])
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchUpload", "404"):
+                return None
+            raise
+        return parts
+
+    def _multipart_upload(self, local_path: str, bucket_name: str, s3_key: str, size: int, sha256: str, metadata: dict) -> None:
+        state_path = self._state_path("upload", bucket_name, s3_key, local_path)
+        state = self._read_state(state_path)
+        done = {}
+        if state is not None and state["sha256"] == sha256 and state["part_size"] == self.part_size:
+            uploaded = self._uploaded_parts(bucket_name, s3_key, state["upload_id"])
+            if uploaded is None:
+                state = None
+            else:
+                # the last part may be short, every other part is complete only at full size
+                done = {number: etag for number, (etag, part_size) in uploaded.items()
+                        if part_size == min(self.part_size, size - (number - 1) * self.part_size)}
+        elif state is not None:
+            # the file changed since the interrupted upload: its parts cannot be reused
+            try:
+                self.s3_client.abort_multipart_upload(Bucket=bucket_name, Key=s3_key, UploadId=state["upload_id"])
+            except ClientError:
+                pass
+            state = None
+        if state is None:
+            upload_id = self.s3_client.create_multipart_upload(Bucket=bucket_name, Key=s3_key, Metadata=metadata)["UploadId"]
+            state = {"upload_id": upload_id, "sha256": sha256, "part_size": self.part_size}
+            self._write_state(state_path, state)
+
+        n_parts = math.ceil(size / self.part_size)
+        remaining = [number for number in range(1, n_parts + 1) if number not in done]
+        if done:
+            logging.info(f"Resuming upload of {local_path}: {len(done)}/{n_parts} parts already uploaded")
+        with open(local_path, "rb") as file:
+            descriptor = file.fileno()
+
+            def upload_part(number: int) -> tuple:
+                offset = (number - 1) * self.part_size
+                body = os.pread(descriptor, min(self.part_size, size - offset), offset)
+                response = self.s3_client.upload_part(Bucket=bucket_name, Key=s3_key, UploadId=state["upload_id"],
+                                                      PartNumber=number, Body=body)
+                return number, response["ETag"]
+
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                for number, etag in executor.map(upload_part, remaining):
+                    done[number] = etag
+        self.s3_client.complete_multipart_upload(
+            Bucket=bucket_name, Key=s3_key, UploadId=state["upload_id"],
+            MultipartUpload={"Parts": [{"PartNumber": number, "ETag": done[number]} for number in sorted(done)]})
+        os.remove(state_path)
+
+    def download_file(self, bucket_name: str, s3_key: str, local_path: str) -> bool:
+        """
+        Downloads an object to `local_path` unless the file already holds the same content.
+
+        The object is fetched in ranged GETs written straight to their offsets in a
+        `.part` file, which replaces `local_path` once every part is written and the
+        content hash is verified.
+
+        Returns:
+        -------
+        bool
+            False when the download was skipped because the content hash matched.
+        """
+        try:
+            head = self.head_object(bucket_name, s3_key)
+            if head is None:
+                raise FileNotFoundError(f"s3://{bucket_name}/{s3_key} does not exist")
+            size, etag = head["ContentLength"], head["ETag"]
+            sha256 = head["Metadata"].get(S3_SHA256_METADATA_KEY)
+            if sha256 and os.path.exists(local_path) and os.path.getsize(local_path) == size and hash_file(local_path) == sha256:
+                logging.info(f"Skipped download of s3://{bucket_name}/{s3_key}: {local_path} has the same content")
+                return False
+
+            os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+            partial_path = local_path + ".part"
+            state_path = self._state_path("download", bucket_name, s3_key, local_path)
+            state = self._read_state(state_path)
+            if not (state and state["etag"] == etag and state["part_size"] == self.part_size
+                    and os.path.exists(partial_path) and os.path.getsize(partial_path) == size):
+                with open(partial_path, "wb") as file:
+                    file.truncate(size)
+                state = {"etag": etag, "part_size": self.part_size, "parts": []}
+                self._write_state(state_path, state)
+            done = set(state["parts"])
+            n_parts = math.ceil(size / self.part_size)
+            remaining = [number for number in range(1, n_parts + 1) if number not in done]
+            if done:
+                logging.info(f"Resuming download of s3://{bucket_name}/{s3_key}: {len(done)}/{n_parts} parts already written")
+
+            lock = threading.Lock()
+            descriptor = os.open(partial_path, os.O_WRONLY)
+            try:
+                def download_part(number: int) -> None:
+                    start = (number - 1) * self.part_size
+                    end = min(start + self.part_size, size) - 1
+                    # IfMatch fails the part if the object was replaced during the transfer
+                    response = self.s3_client.get_object(Bucket=bucket_name, Key=s3_key, Range=f"bytes={start}-{end}", IfMatch=etag)
+                    offset = start
+                    for block in response["Body"].iter_chunks(DOWNLOAD_BLOCK_SIZE):
+                        offset += os.pwrite(descriptor, block, offset)
+                    if offset != end + 1:
+                        raise IOError(f"Part {number} of s3://{bucket_name}/{s3_key} ended at byte {offset}, expected {end + 1}")
+                    with lock:
+                        done.add(number)
+                        self._write_state(state_path, {**state, "parts": sorted(done)})
+
+                with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                    list(executor.map(download_part, remaining))
+                os.fsync(descriptor)
+            finally:
+                os.close(descriptor)
+
+            if sha256 and hash_file(partial_path) != sha256:
+                os.remove(partial_path)
+                os.remove(state_path)
+                raise ValueError(f"Downloaded s3://{bucket_name}/{s3_key} does not match its sha256 {sha256}")
+            os.replace(partial_path, local_path)
+            os.remove(state_path)
+            logging.info(f"Downloaded s3://{bucket_name}/{s3_key} ({size} bytes) to {local_path}")
+            return True
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def list_keys(self, bucket_name: str, prefix: str) -> List[str]:
+        """
+        Returns the keys of every object under `prefix`.
+        """
+        try:
+            keys = []
+            for page in self.s3_client.get_paginator("list_objects_v2").paginate(Bucket=bucket_name, Prefix=prefix):
+                keys.extend(item["Key"] for item in page.get("Contents", []))
+            return keys
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def upload_directory(self, local_dir: str, bucket_name: str, s3_prefix: str) -> List[str]:
+        """
+        Uploads every file under `local_dir` (e.g. a model package) below `s3_prefix`.
+        Returns the keys that were uploaded, files with unchanged content are skipped.
+        """
+        try:
+            uploaded = []
+            for root, _, files in os.walk(local_dir):
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    s3_key = f"{s3_prefix.rstrip('/')}/{os.path.relpath(path, local_dir).replace(os.sep, '/')}"
+                    if self.upload_file(path, bucket_name, s3_key):
+                        uploaded.append(s3_key)
+            return uploaded
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def download_directory(self, bucket_name: str, s3_prefix: str, local_dir: str) -> List[str]:
+        """
+        Downloads every object below `s3_prefix` into `local_dir`, keeping the relative paths.
+        Returns the local paths that were downloaded, files with unchanged content are skipped.
+        """
+        try:
+            downloaded = []
+            prefix = s3_prefix.rstrip("/") + "/"
+            for s3_key in self.list_keys(bucket_name, prefix):
+                path = os.path.join(local_dir, *s3_key[len(prefix):].split("/"))
+                if self.download_file(bucket_name, s3_key, path):
+                    downloaded.append(path)
+            return downloaded
+        except Exception as e:
+            raise MyException(e, sys)
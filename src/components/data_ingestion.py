@@ -1,7 +1,11 @@
 import os
 import sys
+import shutil
 import pandas as pd
 
+from bson import ObjectId
+from datetime import datetime
+
 from pandas import DataFrame
 from sklearn.model_selection import train_test_split
 
@@ -10,6 +14,9 @@ from src.exception import MyException
 from src.entity.artifact_entity import DataIngestionArtifact
 from src.data_access.proj1_data import Proj1Data
 from src.entity.config_entity import DataIngestionConfig
+from src.constants import DATA_INGESTION_WATERMARK_FILE_NAME, SCHEMA_FILE_PATH
+from src.utils.data_profile import profile_dataframe, schema_fingerprint
+from src.utils.main_utils import read_yaml_file, write_yaml_file, get_schema_dtypes, apply_schema_dtypes, save_dataframe, read_dataframe, report_memory_savings
 
 
 class DataIngestion:
@@ -17,25 +24,170 @@ class DataIngestion:
 
         try:
             self.data_ingestion_config = data_ingestion_config
+            self._schema = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+            self._schema_dtypes = get_schema_dtypes(self._schema)
         except Exception as e:
             raise MyException(e,sys)
         
-    #get the dataframe to the feature store
-    def export_data_into_feature_store(self) -> DataFrame:
+    def _export_collection(self, proj1_data: Proj1Data, query: dict = None, projection: dict = None) -> DataFrame:
+        """
+        Exports the documents matching `query`, in parallel when configured.
+        """
+        config=self.data_ingestion_config
+        if config.export_workers > 1:
+            logging.info(f"Parallel export with {config.export_workers} workers over {config.export_partitions} partitions of {config.export_partition_key}")
+            return proj1_data.export_collection_parallel(collection_name=config.collection_name,
+                                                         partition_key=config.export_partition_key,
+                                                         num_partitions=config.export_partitions,
+                                                         max_workers=config.export_workers,
+                                                         use_processes=config.export_use_processes,
+                                                         batch_size=config.export_batch_size,
+                                                         projection=projection, query=query)
+        return proj1_data.export_collection_as_dataframe(collection_name=config.collection_name,
+                                                         batch_size=config.export_batch_size,
+                                                         query=query, projection=projection)
+
+    @staticmethod
+    def _encode_watermark(value) -> dict:
+        if isinstance(value, ObjectId):
+            return {"type": "objectid", "value": str(value)}
+        if isinstance(value, datetime):
+            return {"type": "datetime", "value": value.isoformat()}
+        return {"type": "raw", "value": value}
+
+    @staticmethod
+    def _decode_watermark(watermark: dict):
+        if watermark["type"] == "objectid":
+            return ObjectId(watermark["value"])
+        if watermark["type"] == "datetime":
+            return datetime.fromisoformat(watermark["value"])
+        return watermark["value"]
+
+    def update_feature_store(self) -> DataFrame:
+        """
+        Brings the shared feature store in `store_dir` up to date and returns its contents.
+
+        The store is a list of part files plus a watermark holding the largest value of
+        `watermark_field` already exported. Each run only fetches documents above the
+        watermark and appends them as a new part. The first run, a change of watermark
+        field or `full_refresh` rebuilds the store from a full export.
+        When the watermark is an updated-at field, '_id' is kept in the parts so that
+        re-exported documents replace their earlier version.
+        """
         try:
-            logging.info("Exporting data into feature store")
+            config=self.data_ingestion_config
+            watermark_path=os.path.join(config.store_dir, DATA_INGESTION_WATERMARK_FILE_NAME)
+            if config.full_refresh and os.path.exists(config.store_dir):
+                logging.info(f"Full refresh requested, clearing feature store at {config.store_dir}")
+                shutil.rmtree(config.store_dir)
+            os.makedirs(config.store_dir,exist_ok=True)
+
+            state=read_yaml_file(watermark_path) if os.path.exists(watermark_path) else None
+            if state is not None and state["field"] != config.watermark_field:
+                logging.info(f"Watermark field changed from {state['field']} to {config.watermark_field}, rebuilding feature store")
+                state=None
+            parts=state["parts"] if state else []
+
             proj1_data = Proj1Data()
-            dataframe=proj1_data.export_collection_as_dataframe(collection_name=self.data_ingestion_config.collection_name)
+            projection=None if config.watermark_field == "_id" else {"id": 0}
+            query={}
+            if state is not None:
+                query={"$gt": self._decode_watermark(state["watermark"])}
+            high=proj1_data.get_max_value(config.collection_name, config.watermark_field,
+                                          query={config.watermark_field: query} if query else None)
+            if high is None:
+                logging.info("No new documents since the last ingestion")
+            else:
+                # bounded by `high` on every run, also the first: documents inserted after reading
+                # it are above the new watermark and fetched by the next run only
+                query["$lte"]=high
+                delta=self._export_collection(proj1_data, query={config.watermark_field: query},
+                                              projection=projection)
+                if "_id" in delta.columns:
+                    delta["_id"]=delta["_id"].astype(str)
+                logging.info(f"Fetched {len(delta)} new documents up to {config.watermark_field}={high}")
+
+                part_name=f"part-{len(parts):05d}.{config.file_format}"
+                part_path=os.path.join(config.store_dir,part_name)
+                save_dataframe(part_path+".tmp",apply_schema_dtypes(delta,self._schema_dtypes),config.file_format)
+                os.replace(part_path+".tmp",part_path)
+                parts=parts+[part_name]
+                # The watermark only moves once its part is on disk, so a crash re-fetches the delta.
+                write_yaml_file(watermark_path+".tmp",{"field": config.watermark_field,
+                                                       "watermark": self._encode_watermark(high),
+                                                       "parts": parts})
+                os.replace(watermark_path+".tmp",watermark_path)
+
+            dataframe=pd.concat([read_dataframe(os.path.join(config.store_dir,part),os.path.splitext(part)[1][1:],
+                                                dtypes=self._schema_dtypes)
+                                 for part in parts],ignore_index=True) if parts else DataFrame()
+            if "_id" in dataframe.columns:
+                dataframe=dataframe.drop_duplicates(subset="_id",keep="last").drop(columns=["_id"]).reset_index(drop=True)
+            return dataframe
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def export_data(self) -> DataFrame:
+        """
+        Fetches the collection (incrementally through the shared feature store when enabled)
+        and returns it with the schema dtypes applied.
+        """
+        try:
+            logging.info("Exporting data from mongodb")
+            if self.data_ingestion_config.incremental:
+                dataframe=self.update_feature_store()
+            else:
+                dataframe=self._export_collection(Proj1Data())
+            dataframe=apply_schema_dtypes(dataframe,self._schema_dtypes)
+            report_memory_savings("data_ingestion",dataframe)
             logging.info(msg=f'shape of data frame is {dataframe.shape}')
+            return dataframe
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def save_feature_store_snapshot(self, dataframe: DataFrame) -> str:
+        """
+        Writes the exported data to the feature store file of this run and returns its path.
+        """
+        try:
             feature_store_path=self.data_ingestion_config.feature_store_file_path
-            dir_path=os.path.dirname(feature_store_path)
-            os.makedirs(dir_path,exist_ok=True)
             logging.info(f"saving the data at {feature_store_path}")
-            dataframe.to_csv(feature_store_path,index=False,header=True)
+            save_dataframe(feature_store_path,dataframe,self.data_ingestion_config.file_format)
+            return feature_store_path
+        except Exception as e:
+            raise MyException(e, sys)
+
+    #get the dataframe to the feature store
+    def export_data_into_feature_store(self) -> DataFrame:
+        try:
+            logging.info("Exporting data into feature store")
+            dataframe=self.export_data()
+            self.save_feature_store_snapshot(dataframe)
             return dataframe
         except Exception as e:
             raise MyException(e, sys)
 
+    def schema_fingerprint(self) -> str:
+        return schema_fingerprint(self._schema, self.data_ingestion_config.histogram_bins)
+
+    def profile_splits(self, train_data: DataFrame, test_data: DataFrame) -> str:
+        """
+        Profiles the train and test frames while they are still in memory and writes the
+        profiles with the schema fingerprint next to the split files, so that data
+        validation does not have to read the files again.
+        """
+        try:
+            profile_path=self.data_ingestion_config.profile_file_path
+            bins=self.data_ingestion_config.histogram_bins
+            profiles={"schema_fingerprint": self.schema_fingerprint(),
+                      "profiles": {"train": profile_dataframe(train_data,self._schema,bins),
+                                   "test": profile_dataframe(test_data,self._schema,bins)}}
+            write_yaml_file(profile_path,profiles)
+            logging.info(f"Profiles of the split data saved at {profile_path}")
+            return profile_path
+        except Exception as e:
+            raise MyException(e, sys)
+
     def split_data_as_train_test(self, dataframe: DataFrame) -> None:
         logging.info("Splitting data into train and test")
         try:
@@ -45,8 +197,9 @@ class DataIngestion:
             os.makedirs(dir_path,exist_ok=True)
             logging.info(f"Saving train data at {self.data_ingestion_config.training_file_path}")
 
-            train_data.to_csv(self.data_ingestion_config.training_file_path,index=False,header=True)
-            test_data.to_csv(self.data_ingestion_config.testing_file_path,index=False,header=True)
+            save_dataframe(self.data_ingestion_config.training_file_path,train_data,self.data_ingestion_config.file_format)
+            save_dataframe(self.data_ingestion_config.testing_file_path,test_data,self.data_ingestion_config.file_format)
+            self.profile_splits(train_data,test_data)
 
             logging.info(f"Train and test data saved successfully at {self.data_ingestion_config.training_file_path} and {self.data_ingestion_config.testing_file_path}")
         except Exception as e:
@@ -59,7 +212,10 @@ class DataIngestion:
             self.split_data_as_train_test(dataframe=dataframe)
             data_ingestion_artifact = DataIngestionArtifact(
                 trained_file_path=self.data_ingestion_config.training_file_path,
-                test_file_path=self.data_ingestion_config.testing_file_path
+                test_file_path=self.data_ingestion_config.testing_file_path,
+                file_format=self.data_ingestion_config.file_format,
+                profile_file_path=self.data_ingestion_config.profile_file_path,
+                schema_fingerprint=self.schema_fingerprint()
             )
             logging.info("Data ingestion process completed successfully")
             return data_ingestion_artifact
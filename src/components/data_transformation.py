@@ -1,4 +1,5 @@
 import os
+import time
 import pandas as pd
 import numpy as np
 import sys
@@ -6,14 +7,20 @@ import sys
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler,MinMaxScaler
 from sklearn.compose import ColumnTransformer
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import NearestNeighbors
 from imblearn.combine import SMOTEENN
+from imblearn.over_sampling import SMOTE
+from imblearn.under_sampling import EditedNearestNeighbours, RandomUnderSampler
 
 from src.constants import *
 from src.logger import logging
 from src.exception import MyException
 from src.entity.config_entity import DataTransformationConfig
-from src.entity.artifact_entity import DataTransformationArtifact,DataValidationArtifact,DataIngestionArtifact
-from src.utils.main_utils import save_numpy_array_data,load_numpy_array_data,read_yaml_file,save_object,load_object
+from src.entity.artifact_entity import (DataTransformationArtifact, DataValidationArtifact, DataIngestionArtifact,
+                                       FittedTransformationArtifact, TransformedSplitArtifact)
+from src.entity.estimator import FeatureEncoder, FeatureBinner
+from src.utils.main_utils import save_numpy_array_data,load_numpy_array_data,read_yaml_file,save_object,load_object,iter_dataframe_chunks,get_schema_dtypes,report_memory_savings,read_dataframe,count_rows
 
 
 
@@ -24,6 +31,7 @@ class DataTransformation:
             self.data_validation_artifact = data_validation_artifact
             self.data_ingestion_artifact = data_ingestion_artifact
             self._schema=read_yaml_file(SCHEMA_FILE_PATH)
+            self.encoder=FeatureEncoder(self._schema)
         except Exception as e:
             raise MyException(e,sys)
         
@@ -58,182 +66,420 @@ class DataTransformation:
         except Exception as e:
             raise MyException(e,sys)
             
-    def map_gender_columns(self,dataframe:pd.DataFrame) -> pd.DataFrame:
+    def encode_dataset(self, file_path: str) -> tuple:
         '''
-        Map gender columns to numerical values.
-        This method maps the gender columns in the dataframe to numerical values.
+        Encode a dataset file into the float32 feature matrix and the target vector.
+        With a chunk size configured the file is streamed chunk by chunk straight into a
+        matrix preallocated from the row count; otherwise it is encoded in one full-frame pass.
         Args:
-            dataframe (pd.DataFrame): The input dataframe containing gender columns.
+            file_path (str): Path to the train or test split.
         Returns:
-            pd.DataFrame: The output dataframe with gender columns mapped to numerical values.
+            tuple: (features of shape (rows, n_features), target vector)
         '''
         try:
-            logging.info('mapping gender columns to numerical values')
-            dataframe['Gender']=dataframe['Gender'].map({'Male':1,'Female':0}).astype(int)
-            return dataframe
+            file_format = self.data_ingestion_artifact.file_format
+            chunk_size = self.data_transformation_config.chunk_size
+            columns = self.encoder.source_columns + [TARGET_COLUMN]
+            dtypes = get_schema_dtypes(self._schema)
+            if chunk_size:
+                n_rows = count_rows(file_path, file_format)
+                features = np.empty((n_rows, self.encoder.n_features), dtype=np.float32)
+                target = np.empty(n_rows, dtype=np.int8)
+                position = 0
+                for chunk in iter_dataframe_chunks(file_path, file_format, chunk_size, columns=columns, dtypes=dtypes):
+                    end = position + len(chunk)
+                    self.encoder.encode(chunk, out=features[position:end])
+                    target[position:end] = chunk[TARGET_COLUMN].to_numpy()
+                    position = end
+            else:
+                dataframe = read_dataframe(file_path, file_format, columns=columns, dtypes=dtypes)
+                report_memory_savings("data_transformation", dataframe)
+                features = self.encoder.encode(dataframe)
+                target = dataframe[TARGET_COLUMN].to_numpy(dtype=np.int8)
+            logging.info(f"Encoded {file_path} into {features.shape} float32 features ({features.nbytes / 2**20:.2f} MiB)")
+            return features, target
         except Exception as e:
-            raise MyException(e,sys)
-        
-    def create_dummy_columns(self,df:pd.DataFrame) -> pd.DataFrame:
+            raise MyException(e, sys)
+
+    def validation_rows(self, n_rows: int):
+        '''
+        Pick the training rows held out as the validation array, before any resampling.
+        The choice only depends on the number of rows, so the in-memory and out-of-core
+        paths hold out the same rows.
+        Args:
+            n_rows (int): Number of rows of the training split.
+        Returns:
+            np.ndarray: Boolean mask of the validation rows, or None when no rows are held out.
+        '''
+        n_validation = int(round(n_rows * self.data_transformation_config.validation_split_ratio))
+        if n_validation <= 0:
+            return None
+        if n_validation >= n_rows:
+            raise ValueError(f"validation_split_ratio leaves no training rows out of {n_rows}")
+        rows = np.zeros(n_rows, dtype=bool)
+        rows[np.random.default_rng(42).choice(n_rows, size=n_validation, replace=False)] = True
+        return rows
+
+    def _iter_encoded_chunks(self, file_path: str, rows: np.ndarray = None):
+        '''
+        Stream a dataset file as (encoded feature DataFrame, target) chunks,
+        keeping only the rows selected by the boolean mask `rows` when given.
+        '''
+        file_format = self.data_ingestion_artifact.file_format
+        columns = self.encoder.source_columns + [TARGET_COLUMN]
+        dtypes = get_schema_dtypes(self._schema)
+        chunk_size = self.data_transformation_config.chunk_size or DATA_TRANSFORMATION_CHUNK_SIZE
+        position = 0
+        for chunk in iter_dataframe_chunks(file_path, file_format, chunk_size, columns=columns, dtypes=dtypes):
+            if rows is not None:
+                keep = rows[position:position + len(chunk)]
+                position += len(chunk)
+                if not keep.any():
+                    continue
+                chunk = chunk[keep]
+            features = pd.DataFrame(self.encoder.encode(chunk), columns=self.encoder.feature_names, copy=False)
+            yield features, chunk[TARGET_COLUMN].to_numpy()
+
+    def fit_transformation_object_out_of_core(self, file_path: str, rows: np.ndarray = None) -> Pipeline:
+        '''
+        Fit the preprocessing pipeline without holding the training set in memory (pass 1).
+        The pipeline is fitted on the first chunk, then the scalers accumulate the statistics
+        of every following chunk with partial_fit, which gives the same fitted scalers as a
+        fit on the full data.
+        Args:
+            file_path (str): Path to the training split.
+            rows (np.ndarray): Boolean mask of the rows to fit on, all rows when None.
+        Returns:
+            Pipeline: The fitted preprocessing pipeline.
+        '''
+        try:
+            preprocess = self.get_transformation_object()
+            fitted = False
+            for features, _ in self._iter_encoded_chunks(file_path, rows):
+                if not fitted:
+                    preprocess.fit(features)
+                    column_transformer = preprocess.named_steps['preprocessor']
+                    fitted = True
+                    continue
+                for name, transformer, columns in column_transformer.transformers_:
+                    if hasattr(transformer, 'partial_fit'):
+                        transformer.partial_fit(features[columns])
+            if not fitted:
+                raise ValueError(f"No rows to fit the transformation on in {file_path}")
+            logging.info('Fitted transformation object out of core')
+            return preprocess
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def transform_out_of_core(self, preprocess: Pipeline, file_path: str, output_file_path: str,
+                              rows: np.ndarray = None) -> np.ndarray:
         '''
-        Create dummy columns for categorical variables.
-        This method creates dummy columns for the categorical variables in the dataframe.
+        Transform a dataset file chunk by chunk into a .npy file opened as a memory map (pass 2).
+        Each row holds the transformed features followed by the target, as in the in-memory path.
         Args:
-            df (pd.DataFrame): The input dataframe containing categorical variables.
+            preprocess (Pipeline): The fitted preprocessing pipeline.
+            file_path (str): Path to the train or test split.
+            output_file_path (str): Path of the .npy file to write.
+            rows (np.ndarray): Boolean mask of the rows to transform, all rows when None.
         Returns:
-            pd.DataFrame: The output dataframe with dummy columns created.
-        '''
-        logging.info('creating dummy columns for categorical variables')
-        categorical_cols=df.select_dtypes(include=['object']).columns
-        for col in categorical_cols:
-            dummies=pd.get_dummies(df[col],drop_first=True)
-            pd.concat([df,dummies],axis=1)
-            df=df.drop(columns=[col],axis=1)
-        return df
-    
-    def drop_id_column(self,df:pd.DataFrame) -> pd.DataFrame:
-        '''
-        Drop the 'id' column from the dataframe.
-        This method drops the 'id' column from the input dataframe.
+            np.ndarray: The written array, memory-mapped read-only.
+        '''
+        try:
+            if rows is None:
+                n_rows = count_rows(file_path, self.data_ingestion_artifact.file_format)
+            else:
+                n_rows = int(rows.sum())
+            os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+            output = None
+            position = 0
+            for features, target in self._iter_encoded_chunks(file_path, rows):
+                transformed = preprocess.transform(features)
+                if output is None:
+                    output = np.lib.format.open_memmap(output_file_path, mode='w+', dtype=transformed.dtype,
+                                                       shape=(n_rows, transformed.shape[1] + 1))
+                end = position + len(transformed)
+                output[position:end, :-1] = transformed
+                output[position:end, -1] = target
+                position = end
+            if output is None:
+                raise ValueError(f"No rows to transform in {file_path}")
+            output.flush()
+            del output
+            logging.info(f"Transformed {position} rows out of core into {output_file_path}")
+            return np.load(output_file_path, mmap_mode='r')
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def fit_binner(self, train_file_path: str) -> FeatureBinner:
+        '''
+        Fit the bin thresholds shared by every histogram-based candidate of the model search,
+        so that they are all fitted on the same uint8 matrices. The candidates still bin their
+        input internally on each fit; that step is not saved.
+        The bins are fitted on the transformed training rows before resampling, so that the
+        train and test splits can be binned by independent stages; the fitted binner is saved.
+        Args:
+            train_file_path (str): Transformed training array (features then target).
+        Returns:
+            FeatureBinner: The fitted binner.
+        '''
+        try:
+            config = self.data_transformation_config
+            train = np.load(train_file_path, mmap_mode='r')
+            binner = FeatureBinner.fit(train[:, :-1], max_bins=config.max_bins)
+            del train
+            save_object(file_path=config.binner_object_file_path, obj=binner)
+            logging.info(f"Fitted a binner with {binner.n_bins} bins")
+            return binner
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def write_binned_array(self, binner: FeatureBinner, source_path: str, output_path: str) -> None:
+        '''
+        Write the features of a transformed array as uint8 bin indices, chunk by chunk;
+        the rows match the transformed array one to one.
         Args:
-            df (pd.DataFrame): The input dataframe containing an 'id' column.
+            binner (FeatureBinner): The fitted binner.
+            source_path (str): Transformed array (features then target).
+            output_path (str): Path of the .npy file to write.
+        '''
+        try:
+            started = time.perf_counter()
+            chunk_size = self.data_transformation_config.chunk_size or DATA_TRANSFORMATION_CHUNK_SIZE
+            source = np.load(source_path, mmap_mode='r')
+            output = np.lib.format.open_memmap(output_path, mode='w+', dtype=np.uint8,
+                                               shape=(len(source), source.shape[1] - 1))
+            for start in range(0, len(source), chunk_size):
+                binner.transform(source[start:start + chunk_size, :-1], out=output[start:start + chunk_size])
+            output.flush()
+            del output, source
+            logging.info(f"Wrote {output_path} in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def get_resampler(self):
+        '''
+        Create the resampler selected by `resampling_strategy`.
+        'smote' oversamples the minority class, 'smoteenn' also cleans the result with edited
+        nearest neighbours and 'undersample' randomly drops majority rows. The neighbour
+        searches run on `resampling_n_jobs` cores.
         Returns:
-            pd.DataFrame: The output dataframe with the 'id' column dropped.
-        '''
-        logging.info('dropping id column')
-        id_column = self._schema['drop_columns']
-        if id_column in df.columns:
-            df = df.drop(columns=id_column, axis=1)
-            logging.info('id column dropped')
-        return df
-    
-    def rename_columns(self,df:pd.DataFrame) -> pd.DataFrame:
-        '''
-        Rename columns in the dataframe.
-        This method renames the columns in the dataframe based on the schema.
+            The imbalanced-learn sampler, or None for 'none'.
+        '''
+        config = self.data_transformation_config
+        strategy = config.resampling_strategy
+        if strategy == 'none':
+            return None
+        if strategy == 'undersample':
+            return RandomUnderSampler(sampling_strategy=config.resampling_ratio, random_state=42)
+        # SMOTE asks the estimator for k_neighbors + 1 neighbours (the sample itself included)
+        smote = SMOTE(sampling_strategy=config.resampling_ratio, random_state=42,
+                      k_neighbors=NearestNeighbors(n_neighbors=6, n_jobs=config.resampling_n_jobs))
+        if strategy == 'smote':
+            return smote
+        if strategy == 'smoteenn':
+            enn = EditedNearestNeighbours(sampling_strategy='all', n_jobs=config.resampling_n_jobs)
+            return SMOTEENN(smote=smote, enn=enn, random_state=42)
+        raise ValueError(f"Unknown resampling strategy: {strategy}")
+
+    def resample_training_data(self, features: np.ndarray, target: np.ndarray, max_rows: int = None) -> tuple:
+        '''
+        Rebalance the training data with the configured resampling strategy.
+        Above `max_rows` rows (default `resampling_max_rows`) a stratified subsample is resampled
+        instead of the full set; only the subsample's rows are read from a memory-mapped `features`.
+        The wall-clock time of every run is logged for comparing strategies.
         Args:
-            df (pd.DataFrame): The input dataframe with columns to be renamed.
+            features (np.ndarray): Transformed training features.
+            target (np.ndarray): Training target.
+            max_rows (int): Largest number of rows resampled, 0 for no limit.
         Returns:
-            pd.DataFrame: The output dataframe with renamed columns.
-        '''
-        logging.info('renaming columns')
-        df.rename(columns={'Vehicle_Age<1 Year':'Vehicle_Age_lt_1_year','Vehicle_Age>2 Year':'Vehicle_Age_gt_2_year'},inplace=True)
-        logging.info('columns renamed')
-        renamed_columns=['Vehicle_Age_lt_1_year','Vehicle_Age_gt_2_year','Vehicle_Damage_Yes']
-        for col in renamed_columns:
-            if col in df.columns:
-                df[col]=df[col].astype(int)
-                logging.info('columns converted to int')
-
-        return df
-    
+            tuple: (resampled features, resampled target)
+        '''
+        try:
+            config = self.data_transformation_config
+            max_rows = config.resampling_max_rows if max_rows is None else max_rows
+            sampler = self.get_resampler()
+            if sampler is None:
+                logging.info('Resampling disabled, keeping the training data as is')
+                return features, target
+            start = time.perf_counter()
+            n_rows = len(target)
+            if max_rows and n_rows > max_rows:
+                index, _ = train_test_split(np.arange(n_rows), train_size=max_rows,
+                                            stratify=target, random_state=42)
+                index.sort()
+                features, target = features[index], target[index]
+                logging.info(f'Resampling a stratified subsample of {len(index)} of {n_rows} rows')
+            features, target = sampler.fit_resample(features, target)
+            logging.info(f"Resampling strategy '{config.resampling_strategy}': {n_rows} -> {len(target)} rows "
+                         f"in {time.perf_counter() - start:.2f}s")
+            return features, target
+        except Exception as e:
+            raise MyException(e, sys)
+
     @staticmethod
-    def read_data(file_path: str) -> pd.DataFrame:
+    def write_train_array(features: np.ndarray, target: np.ndarray, output_file_path: str) -> None:
+        '''
+        Write features followed by the target into a .npy file through a memory map, without
+        building the concatenated array in memory. The array keeps the dtype of the features
+        (float32), like the test array; the 0/1 target is exact in it.
+        '''
+        try:
+            temporary_path = output_file_path + '.tmp.npy'
+            output = np.lib.format.open_memmap(temporary_path, mode='w+', dtype=features.dtype,
+                                               shape=(len(target), features.shape[1] + 1))
+            output[:, :-1] = features
+            output[:, -1] = target
+            output.flush()
+            del output
+            os.replace(temporary_path, output_file_path)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def fit_transformation(self) -> FittedTransformationArtifact:
+        '''
+        Fit the preprocessing pipeline on the training split and write the transformed training
+        rows, before resampling, next to the validation rows held out of them. With `write_binned`
+        the bin thresholds are fitted on those training rows as well. The train and test splits
+        are then finished by `transform_train` and `transform_test`, independently of each other.
+        Returns:
+            FittedTransformationArtifact: The fitted objects and the transformed training rows.
+        '''
+        try:
+            logging.info('Fitting the data transformation on the training split')
+            config = self.data_transformation_config
+            if not self.data_validation_artifact.validation_status:
+                raise MyException("Data validation failed. Cannot proceed with data transformation.", sys)
+            train_file_path = self.data_ingestion_artifact.trained_file_path
+            # The validation rows are held out of the training split before anything is fitted or
+            # resampled: the decision threshold is tuned on them, never on the test split
+            validation_rows = self.validation_rows(count_rows(train_file_path, self.data_ingestion_artifact.file_format))
+            train_rows = None if validation_rows is None else ~validation_rows
+            if config.out_of_core:
+                # Two streaming passes: fit the scalers, then write the rows into memory maps
+                preprocess = self.fit_transformation_object_out_of_core(train_file_path, train_rows)
+                self.transform_out_of_core(preprocess, train_file_path, config.transformed_file_path_train_unresampled, train_rows)
+                if validation_rows is not None:
+                    self.transform_out_of_core(preprocess, train_file_path, config.transformed_file_path_validation, validation_rows)
+            else:
+                input_train_arr, target_train_df = self.encode_dataset(train_file_path)
+                if validation_rows is not None:
+                    input_validation_arr, target_validation_df = input_train_arr[validation_rows], target_train_df[validation_rows]
+                    input_train_arr, target_train_df = input_train_arr[train_rows], target_train_df[train_rows]
+                preprocess = self.get_transformation_object()
+                transformed_train_df = preprocess.fit_transform(
+                    pd.DataFrame(input_train_arr, columns=self.encoder.feature_names, copy=False))
+                save_numpy_array_data(file_path=config.transformed_file_path_train_unresampled,
+                                      array=np.c_[transformed_train_df, target_train_df])
+                if validation_rows is not None:
+                    transformed_validation_df = preprocess.transform(
+                        pd.DataFrame(input_validation_arr, columns=self.encoder.feature_names, copy=False))
+                    save_numpy_array_data(file_path=config.transformed_file_path_validation,
+                                          array=np.c_[transformed_validation_df, target_validation_df])
+
+            os.makedirs(os.path.dirname(config.transformed_object_file_path), exist_ok=True)
+            save_object(file_path=config.transformed_object_file_path, obj=preprocess)
+            if config.write_binned:
+                self.fit_binner(config.transformed_file_path_train_unresampled)
+            return FittedTransformationArtifact(
+                preprocessing_object_file_path=config.transformed_object_file_path,
+                unresampled_train_file_path=config.transformed_file_path_train_unresampled,
+                transformed_validation_file_path=None if validation_rows is None else config.transformed_file_path_validation,
+                binner_object_file_path=config.binner_object_file_path if config.write_binned else None)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def transform_train(self, fitted_transformation_artifact: FittedTransformationArtifact) -> TransformedSplitArtifact:
         '''
-        Read data from a file with proper error handling and validation.
-        This method reads data from a file and returns a pandas DataFrame.
+        Resample the transformed training rows into the training array and bin it.
+        Only the training data is resampled; the test and validation arrays keep the real class balance.
         Args:
-            file_path (str): The path to the file containing the data.
+            fitted_transformation_artifact (FittedTransformationArtifact): Output of `fit_transformation`.
         Returns:
-            pd.DataFrame: The data read from the file as a pandas DataFrame.
-        Raises:
-            ValueError: If the file is empty or contains only headers.
-            FileNotFoundError: If the file doesn't exist.
+            TransformedSplitArtifact: The training array and its bin indices.
         '''
         try:
-            if not os.path.exists(file_path):
-                raise FileNotFoundError(f"File not found at path: {file_path}")
-                
-            df = pd.read_csv(file_path,chunksize=1000)
-            
-            if df.empty:
-                raise ValueError(f"File is empty: {file_path}")
-                
-            if len(df.columns) == 0:
-                raise ValueError(f"File contains only headers: {file_path}")
-                
-            logging.info(f"Successfully read {len(df)} rows from {file_path}")
-            return df
-            
-        except pd.errors.EmptyDataError:
-            raise ValueError(f"File is empty or contains no data: {file_path}")
+            config = self.data_transformation_config
+            # Out of core only the target column and a stratified subsample of the rows are read into
+            # memory, so the resampled training set holds at most out_of_core_resampling_max_rows rows
+            # (plus the synthetic minority rows)
+            unresampled = np.load(fitted_transformation_artifact.unresampled_train_file_path,
+                                  mmap_mode='r' if config.out_of_core else None)
+            features, target = self.resample_training_data(
+                unresampled[:, :-1], np.ascontiguousarray(unresampled[:, -1]),
+                max_rows=config.out_of_core_resampling_max_rows if config.out_of_core else None)
+            self.write_train_array(features, target, config.transformed_file_path_train)
+            del unresampled, features, target
+            binned_file_path = None
+            if fitted_transformation_artifact.binner_object_file_path:
+                binner = load_object(fitted_transformation_artifact.binner_object_file_path)
+                self.write_binned_array(binner, config.transformed_file_path_train, config.binned_file_path_train)
+                binned_file_path = config.binned_file_path_train
+            return TransformedSplitArtifact(transformed_file_path=config.transformed_file_path_train,
+                                            binned_file_path=binned_file_path)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def transform_test(self, fitted_transformation_artifact: FittedTransformationArtifact) -> TransformedSplitArtifact:
+        '''
+        Transform the test split with the fitted preprocessing pipeline and bin it.
+        Args:
+            fitted_transformation_artifact (FittedTransformationArtifact): Output of `fit_transformation`.
+        Returns:
+            TransformedSplitArtifact: The test array and its bin indices.
+        '''
+        try:
+            config = self.data_transformation_config
+            test_file_path = self.data_ingestion_artifact.test_file_path
+            preprocess = load_object(fitted_transformation_artifact.preprocessing_object_file_path)
+            if config.out_of_core:
+                self.transform_out_of_core(preprocess, test_file_path, config.transformed_file_path_test)
+            else:
+                input_test_arr, target_test_df = self.encode_dataset(test_file_path)
+                transformed_test_df = preprocess.transform(
+                    pd.DataFrame(input_test_arr, columns=self.encoder.feature_names, copy=False))
+                save_numpy_array_data(file_path=config.transformed_file_path_test,
+                                      array=np.c_[transformed_test_df, target_test_df])
+            binned_file_path = None
+            if fitted_transformation_artifact.binner_object_file_path:
+                binner = load_object(fitted_transformation_artifact.binner_object_file_path)
+                self.write_binned_array(binner, config.transformed_file_path_test, config.binned_file_path_test)
+                binned_file_path = config.binned_file_path_test
+            return TransformedSplitArtifact(transformed_file_path=config.transformed_file_path_test,
+                                            binned_file_path=binned_file_path)
         except Exception as e:
-            logging.error(f"Error reading data from {file_path}: {str(e)}")
             raise MyException(e, sys)
-    
+
+    @staticmethod
+    def join_transformation(fitted_transformation_artifact: FittedTransformationArtifact,
+                            train_transformation_artifact: TransformedSplitArtifact,
+                            test_transformation_artifact: TransformedSplitArtifact) -> DataTransformationArtifact:
+        '''
+        Combine the fitted objects and both transformed splits into the artifact the model trainer reads.
+        '''
+        return DataTransformationArtifact(
+            transformed_train_file_path=train_transformation_artifact.transformed_file_path,
+            transformed_test_file_path=test_transformation_artifact.transformed_file_path,
+            preprocessing_object_file_path=fitted_transformation_artifact.preprocessing_object_file_path,
+            transformed_validation_file_path=fitted_transformation_artifact.transformed_validation_file_path,
+            binned_train_file_path=train_transformation_artifact.binned_file_path,
+            binned_test_file_path=test_transformation_artifact.binned_file_path,
+            binner_object_file_path=fitted_transformation_artifact.binner_object_file_path)
+
     def initalize_transformation(self) -> DataTransformationArtifact:
         '''
         Initialize the data transformation process.
-        This method performs the data transformation steps and returns the artifact containing the transformed data paths.
+        This method runs the fit, train and test steps one after the other; the training pipeline
+        runs them as separate stages, with the train and test steps side by side.
         Returns:
             DataTransformationArtifact: An object containing the paths of the transformed training and testing datasets,
             as well as the path to the preprocessing object file.
         '''
         try:
-                logging.info('Starting data transformation process')
-                if not self.data_validation_artifact.validation_status:
-                        raise MyException("Data validation failed. Cannot proceed with data transformation.", sys)
-                chunk_size = 10000
-                train_chunks = pd.read_csv(self.data_ingestion_artifact.trained_file_path, chunksize=chunk_size)
-                test_chunks = pd.read_csv(self.data_ingestion_artifact.test_file_path, chunksize=chunk_size)
-                
-                # Process training data in chunks
-                processed_train_chunks = []
-                for chunk in train_chunks:
-                    input_train_df = chunk.drop(columns=[TARGET_COLUMN], axis=1)
-                    target_train_df = chunk[TARGET_COLUMN]
-                    
-                    input_train_df = self.map_gender_columns(input_train_df)
-                    input_train_df = self.create_dummy_columns(input_train_df)
-                    input_train_df = self.drop_id_column(input_train_df)
-                    input_train_df = self.rename_columns(input_train_df)
-                    
-                    processed_train_chunks.append((input_train_df, target_train_df))
-                
-                # Process test data in chunks
-                processed_test_chunks = []
-                for chunk in test_chunks:
-                    input_test_df = chunk.drop(columns=[TARGET_COLUMN], axis=1)
-                    target_test_df = chunk[TARGET_COLUMN]
-                    
-                    input_test_df = self.map_gender_columns(input_test_df)
-                    input_test_df = self.create_dummy_columns(input_test_df)
-                    input_test_df = self.drop_id_column(input_test_df)
-                    input_test_df = self.rename_columns(input_test_df)
-                    
-                    processed_test_chunks.append((input_test_df, target_test_df))
-                
-                # Combine processed chunks
-                input_train_df = pd.concat([c[0] for c in processed_train_chunks])
-                target_train_df = pd.concat([c[1] for c in processed_train_chunks])
-                input_test_df = pd.concat([c[0] for c in processed_test_chunks])
-                target_test_df = pd.concat([c[1] for c in processed_test_chunks])
-                
-                # Continue with transformation
-                preprocess = self.get_transformation_object()
-                transformed_train_df = preprocess.fit_transform(input_train_df)
-                transformed_test_df = preprocess.transform(input_test_df)
-                
-                # Apply SMOTEENN with adjusted parameters to handle imbalanced data
-                smote_enn = SMOTEENN(sampling_strategy=0.5, random_state=42)
-                final_input_train_df, final_target_train_df = smote_enn.fit_resample(transformed_train_df, target_train_df)
-                final_input_test_df, final_target_test_df = smote_enn.fit_resample(transformed_test_df, target_test_df)
-                
-                # Save transformed data
-                train_array = np.c_[final_input_train_df, np.array(final_target_train_df)]
-                test_array = np.c_[final_input_test_df, np.array(final_target_test_df)]
-                os.makedirs(os.path.dirname(self.data_transformation_config.transformed_object_file_path), exist_ok=True)
-                save_object(file_path=self.data_transformation_config.transformed_object_file_path, obj=preprocess)
-                save_numpy_array_data(file_path=self.data_transformation_config.transformed_file_path_train, array=train_array)
-                save_numpy_array_data(file_path=self.data_transformation_config.transformed_file_path_test, array=test_array)
-                logging.info('completed saved transformed data')
-                
-                return DataTransformationArtifact(
-                    transformed_train_file_path=self.data_transformation_config.transformed_file_path_train,
-                    transformed_test_file_path=self.data_transformation_config.transformed_file_path_test,
-                    preprocessing_object_file_path=self.data_transformation_config.transformed_object_file_path
-                )
-                
-                
+            logging.info('Starting data transformation process')
+            fitted = self.fit_transformation()
+            data_transformation_artifact = self.join_transformation(fitted, self.transform_train(fitted),
+                                                                    self.transform_test(fitted))
+            logging.info('completed saved transformed data')
+            return data_transformation_artifact
         except Exception as e:
-          raise MyException(e, sys)
\ No newline at end of file
+            raise MyException(e, sys)
@@ -2,12 +2,12 @@ import os
 import pandas as pd
 from src.constants import *
 
-from src.utils.main_utils import read_yaml_file
+from src.utils.main_utils import read_yaml_file, write_yaml_file, read_dataframe_header, iter_dataframe_chunks
+from src.utils.data_profile import DataProfiler, schema_fingerprint, profile_checks, drift_scores, drift_warnings
 from src.entity.config_entity import DataValidationConfig, DataIngestionConfig
-from src.entity.artifact_entity import DataValidationArtifact, DataIngestionArtifact
+from src.entity.artifact_entity import DataValidationArtifact, DataIngestionArtifact, DataProfileArtifact
 from src.exception import MyException
 from src.logger import logging
-import json
 import sys  
 
 
@@ -26,118 +26,171 @@ class DataValidation:
        except Exception as e:
               raise MyException(e, sys) from e
 
-    def validate_number_of_columns(self, dataframe: pd.DataFrame) -> bool:
-        '''Validates the number of columns in the dataframe against the schema.
-        
+    def profile_file(self, file_path: str, file_format: str) -> dict:
+        '''Profiles a dataset file in one streaming pass.
+
+        The file is read in chunks of `chunk_size` rows, so memory stays bounded by the
+        chunk and the schema rather than the file.
+
         Args:
-            dataframe (pd.DataFrame): Dataframe to validate.
-        
+            file_path (str): Path to the dataset file.
+            file_format (str): Format of the file ('parquet', 'feather' or 'csv').
+
         Returns:
-            bool: True if the number of columns matches the schema, False otherwise.
+            dict: Profile from DataProfiler.to_dict.
         '''
         try:
-            expected_columns = self.schema_config['columns']
-            actual_columns = dataframe.columns.tolist()
-            if len(expected_columns) != len(actual_columns):
-                logging.info(f"Number of columns mismatch: Expected {len(expected_columns)}, Found {len(actual_columns)}")
-                return False
-            return True
+            profiler = DataProfiler(self.schema_config, self.data_validation_config.histogram_bins)
+            for chunk in iter_dataframe_chunks(file_path, file_format, self.data_validation_config.chunk_size):
+                profiler.update(chunk)
+            if profiler.columns is None:
+                profiler.update(read_dataframe_header(file_path, file_format))
+            logging.info(f"Profiled {profiler.rows} rows of {file_path}")
+            return profiler.to_dict()
         except Exception as e:
-            logging.error(f"Error in validate_number_of_columns: {e}")
+            logging.error(f"Error profiling {file_path}: {e}")
             raise MyException(e, sys) from e
-         
-    
-    def is_column_exists(self,dataframe:pd.DataFrame)->bool:
-        '''Checks if the required columns exist in the dataframe.
+
+    def schema_fingerprint(self) -> str:
+        return schema_fingerprint(self.schema_config, self.data_validation_config.histogram_bins)
+
+    def has_trusted_profiles(self) -> bool:
+        '''True when ingestion profiled the split files against the current schema.'''
+        artifact = self.data_ingestion_artifact
+        return artifact.profile_file_path is not None and os.path.exists(artifact.profile_file_path) \
+            and artifact.schema_fingerprint == self.schema_fingerprint()
+
+    def load_profile(self, split: str) -> dict:
+        '''Returns the profile of the 'train' or 'test' split, from ingestion when its schema
+        fingerprint matches and otherwise by streaming the split file.
+
         Args:
-            dataframe (pd.DataFrame): Dataframe to check for required columns.
+            split (str): 'train' or 'test'.
+
         Returns:
-            bool: True if all required columns exist, False otherwise.'''
-        
+            dict: Profile from DataProfiler.to_dict.
+        '''
         try:
-            columns=dataframe.columns
-            missing_categorical_columns=[]
-            missing_numerical_columns=[]
-            for col in self.schema_config['numerical_columns']:
-                if col not in columns:
-                    missing_numerical_columns.append(col)
-            for col in self.schema_config['categorical_columns']:
-                if col not in columns:
-                    missing_categorical_columns.append(col)
-            if len(missing_numerical_columns)>0:
-                logging.info(f"Missing numerical columns: {missing_numerical_columns}")
-                
-            if len(missing_categorical_columns)>0:
-                logging.info(f"Missing categorical columns: {missing_categorical_columns}")
-                
-            return False if len(missing_numerical_columns) > 0 or len(missing_categorical_columns) > 0 else True
+            if self.has_trusted_profiles():
+                stored = read_yaml_file(self.data_ingestion_artifact.profile_file_path)
+                if stored.get("schema_fingerprint") == self.schema_fingerprint():
+                    logging.info(f"Using the {split} profile computed during ingestion ({self.schema_fingerprint()[:12]})")
+                    return stored["profiles"][split]
+            logging.info(f"No trusted ingestion profiles, profiling the {split} file")
+            file_path = {"train": self.data_ingestion_artifact.trained_file_path,
+                         "test": self.data_ingestion_artifact.test_file_path}[split]
+            return self.profile_file(file_path, self.data_ingestion_artifact.file_format)
         except Exception as e:
-            logging.error(f"Error in is_column_exists: {e}")
             raise MyException(e, sys) from e
-        
 
-    @staticmethod
-    def read_data(file_path: str) -> pd.DataFrame:
-            '''Reads data from a CSV file.
-            
-            Args:
-                file_path (str): Path to the CSV file.
-            
-            Returns:
-                pd.DataFrame: Dataframe containing the data from the CSV file.
-            '''
-            try:
-                return pd.read_csv(file_path)
-            except Exception as e:
-                logging.error(f"Error reading data from {file_path}: {e}")
-                raise MyException(e, sys) from e
-            
-    def initiate_data_validation(self) -> DataValidationArtifact:
+    def load_profiles(self) -> tuple:
+        '''Returns the train and test profiles.
+
+        Returns:
+            tuple: (train profile, test profile)
+        '''
+        return self.load_profile("train"), self.load_profile("test")
+
+    def initiate_split_profile(self, split: str) -> DataProfileArtifact:
+        '''Profiles one split and writes its profile, so that the train and test splits
+        are profiled by independent stages.
+
+        Args:
+            split (str): 'train' or 'test'.
+
+        Returns:
+            DataProfileArtifact: The split and the path of its profile.
+        '''
+        try:
+            profile_file_path = {"train": self.data_validation_config.train_profile_file_path,
+                                 "test": self.data_validation_config.test_profile_file_path}[split]
+            write_yaml_file(profile_file_path, self.load_profile(split))
+            return DataProfileArtifact(split=split, profile_file_path=profile_file_path)
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def load_previous_profile(self):
+        '''Returns the training data profile of the last successful validation, or None.'''
+        try:
+            path = self.data_validation_config.previous_profile_file_path
+            return read_yaml_file(path) if os.path.exists(path) else None
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def save_profile(self, profile: dict) -> None:
+        '''Stores `profile` as the baseline of the next run's drift check.'''
+        try:
+            path = self.data_validation_config.previous_profile_file_path
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_yaml_file(path + ".tmp", profile)
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def build_report(self, train_profile: dict, test_profile: dict) -> dict:
+        '''Checks both profiles against the schema and scores train-vs-test and
+        run-vs-previous-run drift from their histograms.
+
+        Args:
+            train_profile (dict): Profile of the training data.
+            test_profile (dict): Profile of the test data.
+
+        Returns:
+            dict: Validation report with status, failed checks, drift scores and the profiles.
+        '''
+        try:
+            config = self.data_validation_config
+            errors = profile_checks(train_profile, self.schema_config, config.max_null_rate, "train") + \
+                profile_checks(test_profile, self.schema_config, config.max_null_rate, "test")
+            train_vs_test = drift_scores(train_profile, test_profile)
+            warnings = drift_warnings(train_vs_test, config.psi_threshold, config.ks_threshold, "train vs test")
+            previous_profile = self.load_previous_profile()
+            previous_run = None
+            if previous_profile is not None:
+                previous_run = drift_scores(previous_profile, train_profile)
+                warnings += drift_warnings(previous_run, config.psi_threshold, config.ks_threshold, "previous run vs train")
+            if config.fail_on_drift:
+                errors += warnings
+            for message in errors:
+                logging.info(f"Validation check failed: {message}")
+            for message in warnings:
+                logging.info(f"Drift warning: {message}")
+            return {"validation_status": len(errors) == 0,
+                    "validation_message": "\n".join(errors),
+                    "errors": errors,
+                    "drift_warnings": warnings,
+                    "drift": {"train_vs_test": train_vs_test, "previous_run": previous_run},
+                    "profiles": {"train": train_profile, "test": test_profile}}
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def initiate_data_validation(self, train_profile_artifact: DataProfileArtifact = None,
+                                 test_profile_artifact: DataProfileArtifact = None) -> DataValidationArtifact:
         '''Initiates the data validation process.
 
+        Args:
+            train_profile_artifact (DataProfileArtifact): Profile of the train split written by
+                `initiate_split_profile`; the split is profiled here when None.
+            test_profile_artifact (DataProfileArtifact): Same for the test split.
+
         Returns:
             DataValidationArtifact: Artifact containing the validation results.
         '''
         try:
-            error_msg=''
             logging.info("Starting data validation.")
+            train_profile, test_profile = [
+                read_yaml_file(artifact.profile_file_path) if artifact is not None else self.load_profile(split)
+                for split, artifact in (("train", train_profile_artifact), ("test", test_profile_artifact))]
+            validation_report=self.build_report(train_profile, test_profile)
+
+            validation_status=validation_report["validation_status"]
+            error_msg=validation_report["validation_message"]
+            write_yaml_file(self.data_validation_config.validation_report_file_path, validation_report)
+            logging.info(f"Validation report saved at {self.data_validation_config.validation_report_file_path}")
 
-            # Read training and testing data
-            train_data,test_data=(DataValidation.read_data(file_path=self.data_ingestion_artifact.trained_file_path),
-                                  DataValidation.read_data(file_path=self.data_ingestion_artifact.test_file_path))
-            
-            #validate number of columns
-            status=self.validate_number_of_columns(dataframe=train_data)
-            if not status:
-                error_msg += f"Number of columns in training data does not match schema. Expected: {len(self.schema_config['columns'])}, Found: {len(train_data.columns)}\n"
-            else:
-                logging.info("Number of columns in training data matches schema.")
-
-            #validate if required columns exist
-            status=self.is_column_exists(dataframe=train_data)
-            if not status:
-                error_msg += "Required columns are missing in training data.\n"
-            else:
-                logging.info("All required columns exist in training data.")
-
-            #validate number of columns in test data
-            status=self.validate_number_of_columns(dataframe=test_data)
-            if not status:
-                error_msg += f"Number of columns in test data does not match schema. Expected: {len(self.schema_config['columns'])}, Found: {len(test_data.columns)}\n"
-            else:
-                logging.info("Number of columns in test data matches schema.")
-
-            #validate if required columns exist in test data
-            status=self.is_column_exists(dataframe=test_data)
-            if not status:
-                error_msg += "Required columns are missing in test data.\n"
-            else:
-                logging.info("All required columns exist in test data.")
-
-            if len(error_msg) > 0:
+            if not validation_status:
                 raise Exception(error_msg, sys)
-            
-            validation_status= True if len(error_msg) == 0 else False
+            self.save_profile(train_profile)
 
             data_validation_artifact = DataValidationArtifact(
                 validation_status=validation_status,
@@ -145,22 +198,9 @@ class DataValidation:
                 validation_report_file_path=self.data_validation_config.validation_report_file_path
             
             )
-
-            filepath=os.path.dirname(self.data_validation_config.validation_report_file_path)
-            os.makedirs(filepath,exist_ok=True)
-
-            validation_report={
-                "validation_status":validation_status,
-                "validation_message":error_msg.strip()}
-            
-            with open(self.data_validation_config.validation_report_file_path, 'w') as file:
-                json.dump(validation_report, file)
-
-            logging.info(f"Validation report saved at {self.data_validation_config.validation_report_file_path}")
             logging.info(f"Data validation artifact created: {data_validation_artifact}")
             logging.info(f"Data validation completed. Validation status: {data_validation_artifact.validation_status}")
 
             return data_validation_artifact
         except Exception as e:
             raise MyException(e, sys) from e
-        
\ No newline at end of file
@@ -0,0 +1,244 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+from src.constants import *
+from src.logger import logging
+from src.exception import MyException
+from src.entity.config_entity import ModelEvaluationConfig
+from src.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact, ModelEvaluationArtifact
+from src.entity.estimator import MyModel, PackagedModel, affine_parameters, decide
+from src.entity.s3_estimator import S3Estimator
+from src.utils.main_utils import load_object, write_yaml_file
+
+METRIC_NAMES = ('f1_score', 'precision_score', 'recall_score', 'roc_auc_score')
+
+
+def _predict_proba_transformed(model: object, features: np.ndarray) -> np.ndarray:
+    '''Class probabilities of preprocessed features, for a MyModel or a PackagedModel.'''
+    if isinstance(model, PackagedModel):
+        return model.predict_proba_transformed(features)
+    return model.trained_model_object.predict_proba(features)
+
+
+def _preprocess(model: object, encoded: np.ndarray) -> np.ndarray:
+    '''Runs the model's own preprocessing on encoded records.'''
+    if isinstance(model, PackagedModel):
+        return model.transform_features(encoded)
+    return np.asarray(model.preprocessing_object.transform(
+        pd.DataFrame(encoded, columns=model.feature_encoder.feature_names, copy=False)))
+
+
+def bootstrap_rows(rng: np.random.Generator, n_rows: int, n_resamples: int) -> np.ndarray:
+    '''
+    Draws `n_resamples` bootstrap resamples of `n_rows` rows at once.
+    Returns:
+        np.ndarray: (n_resamples, n_rows) indices of the rows drawn in each resample.
+    '''
+    return rng.integers(0, n_rows, size=(n_resamples, n_rows), dtype=np.int32)
+
+
+class ResampledMetrics:
+    '''
+    Classification metrics of one model's test predictions, computed for many resamples of
+    the test rows at once.
+
+    The scores are sorted once and every row is relabelled with its rank, so that the
+    bincount of a resample's ranks is directly its row weights in score order: the
+    confusion matrices are matrix-vector products of those weights, and the ROC AUC is a
+    cumulative sum over them (summed per tie group first when scores repeat), without
+    sorting per resample. Weights are float32, exact for up to 2**24 test rows.
+    '''
+
+    def __init__(self, y_true: np.ndarray, y_pred: np.ndarray, scores: np.ndarray):
+        order = np.argsort(scores, kind='stable')
+        sorted_scores = scores[order]
+        self.rank = np.empty(len(scores), dtype=np.int32)
+        self.rank[order] = np.arange(len(scores), dtype=np.int32)
+        y_true, y_pred = y_true[order], y_pred[order]
+        self.positive = y_true.astype(np.float32)
+        # columns: true positives, false positives, false negatives
+        self.outcomes = np.stack([y_true & y_pred, ~y_true & y_pred, y_true & ~y_pred], axis=1).astype(np.float32)
+        self.group_starts = np.flatnonzero(np.r_[True, sorted_scores[1:] != sorted_scores[:-1]])
+
+    def __call__(self, rows: np.ndarray) -> dict:
+        '''
+        F1, precision, recall (0 when undefined, as sklearn) and ROC AUC of the positive class,
+        one value per row of `rows` (the test row indices of a resample).
+        '''
+        n_resamples, n_rows = len(rows), len(self.rank)
+        ranks = self.rank[rows]
+        ranks += (np.arange(n_resamples, dtype=np.int32) * n_rows)[:, None]
+        weights = np.bincount(ranks.ravel(), minlength=n_resamples * n_rows).reshape(n_resamples, n_rows).astype(np.float32)
+        true_positives, false_positives, false_negatives = (weights @ self.outcomes).astype(np.float64).T
+
+        def ratio(numerator, denominator):
+            return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+        # the probability that a positive scores above a negative, ties counting one half
+        positives = weights * self.positive
+        negatives = weights
+        negatives -= positives
+        if len(self.group_starts) < n_rows:
+            positives = np.add.reduceat(positives, self.group_starts, axis=1)
+            negatives = np.add.reduceat(negatives, self.group_starts, axis=1)
+        negatives_below = np.cumsum(negatives, axis=1)
+        negatives_below -= 0.5 * negatives
+        pairs = positives.sum(axis=1, dtype=np.float64) * negatives.sum(axis=1, dtype=np.float64)
+        concordant = np.einsum('ij,ij->i', positives, negatives_below, dtype=np.float64)
+        return {'f1_score': ratio(2 * true_positives, 2 * true_positives + false_positives + false_negatives),
+                'precision_score': ratio(true_positives, true_positives + false_positives),
+                'recall_score': ratio(true_positives, true_positives + false_negatives),
+                'roc_auc_score': np.divide(concordant, pairs, out=np.full(n_resamples, np.nan), where=pairs > 0)}
+
+
+class ModelEvaluation:
+    def __init__(self, model_eval_config: ModelEvaluationConfig, data_transformation_artifact: DataTransformationArtifact,
+                 model_trainer_artifact: ModelTrainerArtifact):
+        '''
+        Args:
+            model_eval_config (ModelEvaluationConfig): Production model location, bootstrap settings and decision rule.
+            data_transformation_artifact (DataTransformationArtifact): Transformed test array of the trained model.
+            model_trainer_artifact (ModelTrainerArtifact): Trained model to evaluate.
+        '''
+        try:
+            self.model_eval_config = model_eval_config
+            self.data_transformation_artifact = data_transformation_artifact
+            self.model_trainer_artifact = model_trainer_artifact
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def get_best_model(self) -> object:
+        '''
+        Returns the production model (MyModel or PackagedModel) through the local model cache,
+        or None when no model was pushed yet.
+        '''
+        try:
+            config = self.model_eval_config
+            estimator = S3Estimator(bucket_name=config.bucket_name, model_path=config.s3_model_key_path)
+            if estimator.is_model_present(model_path=config.s3_model_key_path):
+                return estimator.load_model()
+            return None
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def score_models(self, trained_model: MyModel, production_model: object, test: np.ndarray) -> tuple:
+        '''
+        Scores both models on the test array in one pass over blocks of rows.
+        The test array holds the trained model's features; the production model scores the same
+        records, recovered through the trained preprocessing's affine map and run through its
+        own preprocessing. Both models score a block concurrently.
+        Returns:
+            tuple: (y_true, {model: (predictions, positive-class probabilities)})
+        '''
+        try:
+            feature_names = trained_model.feature_encoder.feature_names
+            if production_model is not None:
+                if list(production_model.feature_encoder.feature_names) != list(feature_names):
+                    raise ValueError("The production model was trained on different features")
+                columns, scale, offset = affine_parameters(trained_model.preprocessing_object, feature_names)
+            models = {'trained': trained_model, 'production': production_model}
+            y_true = np.asarray(test[:, -1]).astype(bool)
+            outputs = {name: ([], []) for name, model in models.items() if model is not None}
+
+            def score(name: str, features: np.ndarray) -> None:
+                if name == 'production':
+                    encoded = np.zeros((len(features), len(feature_names)), dtype=np.float32)
+                    encoded[:, columns] = (np.asarray(features, dtype=np.float64) - offset) / scale
+                    features = _preprocess(production_model, encoded)
+                proba = _predict_proba_transformed(models[name], features)
+                # each model's own decision rule: its decision threshold, or the most probable class
+                outputs[name][0].append(decide(np.array([False, True]), proba, getattr(models[name], 'decision_threshold', None)))
+                outputs[name][1].append(np.asarray(proba[:, 1], dtype=np.float64))
+
+            with ThreadPoolExecutor(max_workers=len(outputs)) as executor:
+                for start in range(0, len(test), self.model_eval_config.block_rows):
+                    features = np.asarray(test[start:start + self.model_eval_config.block_rows, :-1])
+                    for future in [executor.submit(score, name, features) for name in outputs]:
+                        future.result()
+            return y_true, {name: (np.concatenate(predictions), np.concatenate(scores))
+                            for name, (predictions, scores) in outputs.items()}
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def bootstrap_improvement(self, y_true: np.ndarray, trained: tuple, production: tuple) -> dict:
+        '''
+        Paired bootstrap of the metric improvements: both models are scored on the same
+        resamples, drawn `bootstrap_batch_size` at a time, so each batch is one bincount and a
+        few vectorised reductions per model.
+        Returns:
+            dict: Per metric, the mean, standard error and confidence interval of trained - production.
+        '''
+        try:
+            config = self.model_eval_config
+            rng = np.random.default_rng(config.random_state)
+            trained_metrics, production_metrics = ResampledMetrics(y_true, *trained), ResampledMetrics(y_true, *production)
+            improvements = {name: [] for name in METRIC_NAMES}
+            for start in range(0, config.n_resamples, config.bootstrap_batch_size):
+                rows = bootstrap_rows(rng, len(y_true), min(config.bootstrap_batch_size, config.n_resamples - start))
+                trained_resampled, production_resampled = trained_metrics(rows), production_metrics(rows)
+                for name in METRIC_NAMES:
+                    improvements[name].append(trained_resampled[name] - production_resampled[name])
+            alpha = 1 - config.confidence_level
+            intervals = {}
+            for name in METRIC_NAMES:
+                values = np.concatenate(improvements[name])
+                values = values[~np.isnan(values)]
+                lower, upper = np.quantile(values, [alpha / 2, 1 - alpha / 2])
+                intervals[name] = {'mean': float(values.mean()), 'std': float(values.std(ddof=1)),
+                                   'lower': float(lower), 'upper': float(upper)}
+            return intervals
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def initiate_model_evaluation(self) -> ModelEvaluationArtifact:
+        '''
+        Compares the trained model with the production model on the test data.
+        The trained model is accepted when no model was pushed yet, or when the lower confidence
+        bound of its f1 improvement exceeds `changed_threshold_score`.
+        Returns:
+            ModelEvaluationArtifact: Decision, f1 improvement and the evaluation report path.
+        '''
+        try:
+            logging.info("Starting model evaluation")
+            config = self.model_eval_config
+            started = time.perf_counter()
+            test = np.load(self.data_transformation_artifact.transformed_test_file_path, mmap_mode='r')
+            trained_model = load_object(self.model_trainer_artifact.trained_model_file_path)
+            production_model = self.get_best_model()
+            y_true, outputs = self.score_models(trained_model, production_model, test)
+            score_seconds = time.perf_counter() - started
+
+            all_rows = np.arange(len(y_true), dtype=np.int32)[None, :]
+            point = {name: {metric: float(value[0]) for metric, value in ResampledMetrics(y_true, *output)(all_rows).items()}
+                     for name, output in outputs.items()}
+            report = {'test_rows': len(y_true), 'production_model': f"s3://{config.bucket_name}/{config.s3_model_key_path}",
+                      'changed_threshold_score': config.changed_threshold_score, 'confidence_level': config.confidence_level,
+                      'n_resamples': config.n_resamples, 'metrics': point, 'score_seconds': score_seconds}
+            if production_model is None:
+                logging.info("No production model found, accepting the trained model")
+                is_model_accepted, changed_accuracy = True, point['trained']['f1_score']
+            else:
+                started = time.perf_counter()
+                intervals = self.bootstrap_improvement(y_true, outputs['trained'], outputs['production'])
+                report.update(improvement=intervals, bootstrap_seconds=time.perf_counter() - started)
+                changed_accuracy = point['trained']['f1_score'] - point['production']['f1_score']
+                is_model_accepted = intervals['f1_score']['lower'] > config.changed_threshold_score
+                logging.info(f"f1 improvement {changed_accuracy:.4f}, {config.confidence_level:.0%} interval "
+                             f"[{intervals['f1_score']['lower']:.4f}, {intervals['f1_score']['upper']:.4f}] "
+                             f"from {config.n_resamples} resamples in {report['bootstrap_seconds']:.2f}s")
+            report['is_model_accepted'] = is_model_accepted
+            write_yaml_file(config.report_file_path, report)
+
+            model_evaluation_artifact = ModelEvaluationArtifact(
+                is_model_accepted=is_model_accepted, changed_accuracy=changed_accuracy,
+                s3_model_path=config.s3_model_key_path,
+                trained_model_path=self.model_trainer_artifact.trained_model_file_path,
+                report_file_path=config.report_file_path,
+                trained_model_package_file_path=self.model_trainer_artifact.trained_model_package_file_path)
+            logging.info(f"Model evaluation artifact: {model_evaluation_artifact}")
+            return model_evaluation_artifact
+        except Exception as e:
+            raise MyException(e, sys)
@@ -0,0 +1,332 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+from botocore.exceptions import ClientError
+
+from src.cloud_storage.aws_storage import SimpleStorageService
+from src.constants import *
+from src.logger import logging
+from src.exception import MyException
+from src.entity.config_entity import ModelPusherConfig
+from src.entity.artifact_entity import ModelEvaluationArtifact, ModelPusherArtifact
+from src.entity.s3_estimator import (registry_pointer_key, registry_version_key, registry_chunk_key, content_digest,
+                                     download_registry_files)
+from src.utils.stage_cache import hash_file
+
+# rolling hash window, and the random value the hash adds for each byte (fixed so that chunk
+# boundaries are the same on every host and in every run)
+CHUNK_WINDOW_SIZE = 64
+CHUNK_GEAR = np.random.default_rng(0x5EED).integers(0, 2**32, size=256, dtype=np.uint64)
+# bytes hashed at a time when looking for chunk boundaries
+CHUNK_SCAN_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def content_defined_chunks(file_path: str, average_size: int, min_size: int, max_size: int) -> List[tuple]:
+    '''
+    Splits a file into chunks whose boundaries depend on the content around them rather than on
+    their offset, so that inserting or removing bytes only changes the chunks around the edit.
+    A boundary is placed after every byte where the sum of the random values of the last
+    CHUNK_WINDOW_SIZE bytes is a multiple of `average_size` (a power of two), past `min_size`
+    bytes from the previous boundary; chunks are cut at `max_size` bytes when no boundary occurs.
+    The window sums are computed with a cumulative sum over blocks of the file.
+    Returns:
+        List[tuple]: (offset, size) of the chunks, in file order.
+    '''
+    if average_size & (average_size - 1):
+        raise ValueError(f"The average chunk size must be a power of two, got {average_size}")
+    mask = np.uint64(average_size - 1)
+    file_size = os.path.getsize(file_path)
+    candidates, tail, offset = [], np.empty(0, dtype=np.uint8), 0
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(CHUNK_SCAN_BLOCK_SIZE), b''):
+            data = np.concatenate([tail, np.frombuffer(block, dtype=np.uint8)])
+            if len(data) >= CHUNK_WINDOW_SIZE:
+                cumulative = np.zeros(len(data) + 1, dtype=np.uint64)
+                np.cumsum(CHUNK_GEAR[data], out=cumulative[1:])
+                window = cumulative[CHUNK_WINDOW_SIZE:] - cumulative[:-CHUNK_WINDOW_SIZE]
+                # a window starting at k ends the chunk after data[k + WINDOW - 1]
+                ends = np.flatnonzero((window & mask) == 0) + (offset - len(tail) + CHUNK_WINDOW_SIZE)
+                candidates.append(ends)
+            offset += len(block)
+            tail = data[-(CHUNK_WINDOW_SIZE - 1):]
+    candidates = np.concatenate(candidates) if candidates else np.empty(0, dtype=np.int64)
+
+    chunks, start = [], 0
+    while start < file_size:
+        index = np.searchsorted(candidates, start + min_size)
+        end = min(start + max_size, file_size)
+        if index < len(candidates) and candidates[index] < end:
+            end = int(candidates[index])
+        chunks.append((start, end - start))
+        start = end
+    return chunks
+
+
+class ModelPusher:
+    '''
+    Publishes accepted model packages to a versioned registry under `s3_model_key_path`:
+    - chunks/<sha256> holds the content-defined chunks of the package files, shared by all versions,
+      so a push only uploads the chunks that no earlier version has;
+    - versions/<version>/version.json lists the chunks of each file of one version and is never overwritten;
+      besides the package served by S3Estimator, a version holds the pickled model (model_file) that
+      retrain mode warm-starts, which is only downloaded by `download_model_file`;
+    - LATEST names the version being served, and the version before it.
+    A version is only visible once all of its chunks and its manifest are uploaded, and LATEST is
+    replaced with a conditional PUT on its ETag, so a reader sees either the previous or the new
+    version and concurrent pushes cannot overwrite each other. Rolling back rewrites LATEST only.
+    '''
+
+    def __init__(self, model_evaluation_artifact: Optional[ModelEvaluationArtifact] = None,
+                 model_pusher_config: ModelPusherConfig = ModelPusherConfig()):
+        try:
+            self.model_evaluation_artifact = model_evaluation_artifact
+            self.model_pusher_config = model_pusher_config
+            self.s3 = SimpleStorageService()
+        except Exception as e:
+            raise MyException(e, sys)
+
+    @property
+    def bucket_name(self) -> str:
+        return self.model_pusher_config.bucket_name
+
+    @property
+    def registry(self) -> str:
+        return self.model_pusher_config.s3_model_key_path
+
+    def _get_json(self, s3_key: str) -> tuple:
+        response = self.s3.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)
+        return json.loads(response['Body'].read()), response['ETag']
+
+    def _put_json(self, s3_key: str, body: dict, **condition) -> None:
+        self.s3.s3_client.put_object(Bucket=self.bucket_name, Key=s3_key, Body=json.dumps(body, indent=1).encode(),
+                                     ContentType='application/json', **condition)
+
+    def current_pointer(self) -> tuple:
+        '''
+        Returns:
+            tuple: The LATEST pointer and its ETag, or (None, None) when nothing was pushed yet.
+        '''
+        try:
+            return self._get_json(registry_pointer_key(self.registry))
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                return None, None
+            raise
+
+    def get_version(self, version: str) -> dict:
+        return self._get_json(registry_version_key(self.registry, version))[0]
+
+    def list_versions(self) -> List[str]:
+        '''Returns the versions in the registry, oldest first.'''
+        try:
+            prefix = f"{self.registry}/{MODEL_PUSHER_VERSIONS_DIR_NAME}/"
+            return sorted(key[len(prefix):].split('/')[0] for key in self.s3.list_keys(self.bucket_name, prefix)
+                          if key.endswith(f"/{MODEL_PUSHER_VERSION_MANIFEST_FILE_NAME}"))
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def describe_file(self, path: str) -> dict:
+        '''Returns the name, size, sha256 and content-defined chunks of a file.'''
+        config = self.model_pusher_config
+        chunks = []
+        with open(path, 'rb') as file:
+            descriptor = file.fileno()
+            for offset, size in content_defined_chunks(path, config.chunk_average_size, config.chunk_min_size,
+                                                       config.chunk_max_size):
+                chunks.append({'sha256': hashlib.sha256(os.pread(descriptor, size, offset)).hexdigest(), 'size': size})
+        return {'name': os.path.basename(path), 'size': os.path.getsize(path), 'sha256': hash_file(path), 'chunks': chunks}
+
+    @staticmethod
+    def version_files(version: dict) -> list:
+        '''All the files of a version: the package files, then the pickled model when it has one.'''
+        return version['files'] + ([version['model_file']] if version.get('model_file') else [])
+
+    def build_version(self, package_file_path: str, model_file_path: Optional[str] = None) -> dict:
+        '''
+        Describes a model package as a registry version: the size, sha256 and chunks of its
+        manifest and arrays files, the digest identifying the package content and, with
+        `model_file_path`, the same description of the pickled model.
+        '''
+        package_dir = os.path.dirname(package_file_path)
+        files = [self.describe_file(os.path.join(package_dir, name))
+                 for name in (os.path.basename(package_file_path), MODEL_PACKAGE_ARRAYS_FILE_NAME)]
+        model_file = self.describe_file(model_file_path) if model_file_path else None
+        digest = content_digest([(file['name'], file['sha256']) for file in files])
+        # the name also tells apart versions that share the package but not the pickled model
+        name_digest = content_digest([(file['name'], file['sha256']) for file in files + [model_file] if file])
+        version = f"{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}-{name_digest[:12]}"
+        return {'version': version, 'digest': digest, 'files': files, 'model_file': model_file}
+
+    def upload_chunks(self, version: dict, local_paths: dict, known: set) -> tuple:
+        '''
+        Uploads the chunks of `version` that are neither in `known` nor already in the registry,
+        reading them from `local_paths` (file name to local path).
+        Returns:
+            tuple: Number of chunks uploaded, number reused and bytes uploaded.
+        '''
+        tasks = {}
+        for file in self.version_files(version):
+            offset = 0
+            for chunk in file['chunks']:
+                if chunk['sha256'] not in known:
+                    tasks.setdefault(chunk['sha256'], (file['name'], offset, chunk['size']))
+                offset += chunk['size']
+
+        def upload_chunk(item: tuple) -> int:
+            sha256, (name, offset, size) = item
+            key = registry_chunk_key(self.registry, sha256)
+            if self.s3.head_object(self.bucket_name, key) is not None:
+                return 0
+            with open(local_paths[name], 'rb') as file:
+                self.s3.s3_client.put_object(Bucket=self.bucket_name, Key=key, Body=os.pread(file.fileno(), size, offset))
+            return size
+
+        with ThreadPoolExecutor(max_workers=self.s3.max_concurrency) as executor:
+            uploaded = list(executor.map(upload_chunk, tasks.items()))
+        n_chunks = len({chunk['sha256'] for file in self.version_files(version) for chunk in file['chunks']})
+        n_uploaded = sum(size > 0 for size in uploaded)
+        return n_uploaded, n_chunks - n_uploaded, sum(uploaded)
+
+    def _set_pointer(self, version: str, previous: Optional[str], etag: Optional[str]) -> None:
+        condition = {'IfMatch': etag} if etag is not None else {'IfNoneMatch': '*'}
+        try:
+            self._put_json(registry_pointer_key(self.registry),
+                           {'version': version, 'previous': previous, 'pushed_at': time.time()}, **condition)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('PreconditionFailed', '412', 'ConditionalRequestConflict'):
+                raise Exception(f"s3://{self.bucket_name}/{registry_pointer_key(self.registry)} changed during the "
+                                f"update, retry once the concurrent push or rollback is done") from e
+            raise
+
+    def push(self, package_file_path: str, model_file_path: Optional[str] = None) -> ModelPusherArtifact:
+        '''
+        Publishes a model package, and the pickled model it was saved from when given, as a new
+        version and points LATEST to it. Nothing is uploaded when LATEST already holds the same content.
+        '''
+        try:
+            pointer, etag = self.current_pointer()
+            current = self.get_version(pointer['version']) if pointer else None
+            version = self.build_version(package_file_path, model_file_path)
+            if current is not None and current['digest'] == version['digest'] and \
+                    (model_file_path is None or (current.get('model_file') or {}).get('sha256') == version['model_file']['sha256']):
+                logging.info(f"Version {current['version']} in the registry already serves this model")
+                return ModelPusherArtifact(bucket_name=self.bucket_name, s3_model_path=self.registry,
+                                           version=current['version'])
+
+            known = {chunk['sha256'] for file in self.version_files(current) for chunk in file['chunks']} if current else set()
+            local_paths = {file['name']: os.path.join(os.path.dirname(package_file_path), file['name'])
+                           for file in version['files']}
+            if model_file_path:
+                local_paths[version['model_file']['name']] = model_file_path
+            uploaded_chunks, reused_chunks, uploaded_bytes = self.upload_chunks(version, local_paths, known)
+            self._put_json(registry_version_key(self.registry, version['version']),
+                           {**version, 'pushed_at': time.time(), 'previous': pointer['version'] if pointer else None},
+                           IfNoneMatch='*')
+            self._set_pointer(version['version'], pointer['version'] if pointer else None, etag)
+            logging.info(f"Pushed version {version['version']} to s3://{self.bucket_name}/{self.registry}: "
+                         f"{uploaded_chunks} chunks ({uploaded_bytes / 2**20:.2f} MiB) uploaded, {reused_chunks} reused")
+            return ModelPusherArtifact(bucket_name=self.bucket_name, s3_model_path=self.registry,
+                                       version=version['version'], uploaded_chunks=uploaded_chunks,
+                                       reused_chunks=reused_chunks, uploaded_bytes=uploaded_bytes)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def rollback(self, version: Optional[str] = None) -> str:
+        '''
+        Points LATEST back to `version`, by default the version served before the current one.
+        No model data is copied: the version's chunks are still in the registry.
+        Returns:
+            str: The version LATEST now points to.
+        '''
+        try:
+            pointer, etag = self.current_pointer()
+            if pointer is None:
+                raise Exception(f"Nothing was pushed to s3://{self.bucket_name}/{self.registry}")
+            target = version or pointer['previous']
+            if target is None:
+                raise Exception(f"Version {pointer['version']} has no previous version to roll back to")
+            if self.s3.head_object(self.bucket_name, registry_version_key(self.registry, target)) is None:
+                raise Exception(f"Version {target} does not exist in s3://{self.bucket_name}/{self.registry}")
+            self._set_pointer(target, pointer['version'], etag)
+            logging.info(f"Rolled s3://{self.bucket_name}/{self.registry} back from {pointer['version']} to {target}")
+            return target
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def download_model_file(self, local_path: str, version: Optional[str] = None) -> str:
+        '''
+        Restores the pickled model of `version`, by default the one LATEST points to, at `local_path`.
+        Nothing is downloaded when the local file already has the same content.
+        Returns:
+            str: The version the model file was restored from.
+        '''
+        try:
+            if version is None:
+                pointer, _ = self.current_pointer()
+                if pointer is None:
+                    raise Exception(f"Nothing was pushed to s3://{self.bucket_name}/{self.registry}")
+                version = pointer['version']
+            model_file = self.get_version(version).get('model_file')
+            if model_file is None:
+                raise Exception(f"Version {version} was pushed without its pickled model")
+            if os.path.exists(local_path) and hash_file(local_path) == model_file['sha256']:
+                logging.info(f"{local_path} already holds the model of version {version}")
+                return version
+            incoming_dir = f"{local_path}.incoming"
+            download_registry_files(self.s3, self.bucket_name, self.registry, [model_file], incoming_dir)
+            os.replace(os.path.join(incoming_dir, model_file['name']), local_path)
+            shutil.rmtree(incoming_dir, ignore_errors=True)
+            logging.info(f"Restored the model of version {version} at {local_path}")
+            return version
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def initiate_model_pusher(self) -> ModelPusherArtifact:
+        '''
+        Pushes the trained model package when the model evaluation accepted it.
+        Returns:
+            ModelPusherArtifact: The version published, None when the model was not accepted.
+        '''
+        try:
+            logging.info("Starting model pusher")
+            artifact = self.model_evaluation_artifact
+            if not artifact.is_model_accepted:
+                logging.info("The trained model was not accepted, nothing to push")
+                return ModelPusherArtifact(bucket_name=self.bucket_name, s3_model_path=self.registry)
+            if artifact.trained_model_package_file_path is None:
+                raise Exception("The model registry only holds model packages, but the trainer saved none")
+            model_pusher_artifact = self.push(artifact.trained_model_package_file_path, artifact.trained_model_path)
+            logging.info(f"Model pusher artifact: {model_pusher_artifact}")
+            return model_pusher_artifact
+        except Exception as e:
+            raise MyException(e, sys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect, push to, roll back or restore from the model registry.")
+    parser.add_argument("command", choices=["list", "push", "rollback", "restore"])
+    parser.add_argument("--package", help="manifest.json of the model package to push")
+    parser.add_argument("--model", default=None, help="pickled model to push with the package, or the path to restore it to")
+    parser.add_argument("--version", default=None, help="version to roll back to or restore, by default the previous "
+                                                        "one for a rollback and the latest one for a restore")
+    args = parser.parse_args()
+
+    pusher = ModelPusher()
+    if args.command == "list":
+        pointer, _ = pusher.current_pointer()
+        for version in pusher.list_versions():
+            print(f"{version}{'  <- LATEST' if pointer and pointer['version'] == version else ''}")
+    elif args.command == "push":
+        print(pusher.push(args.package, args.model))
+    elif args.command == "restore":
+        print(f"{args.model} <- {pusher.download_model_file(args.model, args.version)}")
+    else:
+        print(f"LATEST -> {pusher.rollback(args.version)}")
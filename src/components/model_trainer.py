@@ -0,0 +1,503 @@
+import os
+import sys
+import time
+import math
+import importlib
+import multiprocessing
+import pickle
+import queue
+import signal
+from typing import Optional
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from sklearn.metrics import f1_score, precision_score, recall_score
+from sklearn.model_selection import ParameterGrid
+
+from src.constants import *
+from src.logger import logging
+from src.exception import MyException
+from src.entity.config_entity import ModelTrainerConfig, ModelPusherConfig
+from src.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact, ClassificationMetricArtifact
+from src.entity.estimator import (MyModel, FeatureEncoder, BinnedClassifier, feature_space_mapping, save_model_package,
+                                  decide, optimal_threshold)
+from src.utils.main_utils import read_yaml_file, write_yaml_file, load_object, save_object
+from src.components.model_pusher import ModelPusher
+
+
+# Per-process state of the search workers, set once by _init_search_worker
+_SEARCH_DATA = {}
+
+
+def _split_indices(n_rows: int, validation_fraction: float, random_state: int) -> tuple:
+    '''Shuffles the row indices once and splits them into the fit pool and the holdout.'''
+    order = np.random.default_rng(random_state).permutation(n_rows)
+    n_holdout = max(1, int(n_rows * validation_fraction))
+    return order[n_holdout:], np.sort(order[:n_holdout])
+
+
+def _init_search_worker(worker_pids, train_file_path: str, binned_train_file_path: str, validation_fraction: float,
+                        random_state: int) -> None:
+    '''Reports the worker's pid to `worker_pids` and memory-maps the training arrays once per worker process.'''
+    worker_pids.put(os.getpid())
+    train = np.load(train_file_path, mmap_mode='r')
+    fit_pool, holdout = _split_indices(len(train), validation_fraction, random_state)
+    _SEARCH_DATA.update(train=train, fit_pool=fit_pool, holdout=holdout,
+                        holdout_x=np.asarray(train[holdout, :-1]), holdout_y=np.asarray(train[holdout, -1]))
+    if binned_train_file_path:
+        binned = np.load(binned_train_file_path, mmap_mode='r')
+        _SEARCH_DATA.update(binned=binned, holdout_binned=np.asarray(binned[holdout]))
+
+
+def _terminate_pool(executor: ProcessPoolExecutor, worker_pids) -> None:
+    '''
+    Stops a process pool without waiting for the fits still running in its workers.
+    The workers reported their pids from _init_search_worker; once one of them is killed the
+    pool is broken, and shutdown terminates and joins the rest.
+    '''
+    pids = []
+    while True:
+        try:
+            pids.append(worker_pids.get_nowait())
+        except queue.Empty:
+            break
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _load_estimator_class(class_path: str):
+    module_name, class_name = class_path.rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _fit_candidate(class_path: str, params: dict, n_rows: int, binned: bool = False) -> dict:
+    '''
+    Worker entry point: fits one candidate on the first `n_rows` rows of the fit pool and scores it on the holdout.
+    Binned candidates read the shared uint8 bin indices instead of the float features.
+    '''
+    train = _SEARCH_DATA['train']
+    rows = np.sort(_SEARCH_DATA['fit_pool'][:n_rows])
+    started = time.perf_counter()
+    target = np.asarray(train[rows, -1])
+    features = np.asarray(_SEARCH_DATA['binned'][rows]) if binned else np.asarray(train[rows, :-1])
+    holdout_x = _SEARCH_DATA['holdout_binned'] if binned else _SEARCH_DATA['holdout_x']
+    load_seconds = time.perf_counter() - started
+    model = _load_estimator_class(class_path)(**params)
+    started = time.perf_counter()
+    model.fit(features, target)
+    fit_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    score = f1_score(_SEARCH_DATA['holdout_y'], model.predict(holdout_x))
+    return {'rows': int(n_rows), 'f1_score': float(score), 'load_seconds': load_seconds,
+            'fit_seconds': fit_seconds, 'score_seconds': time.perf_counter() - started,
+            'model_bytes': len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))}
+
+
+class ModelTrainer:
+    def __init__(self, data_transformation_artifact: DataTransformationArtifact,
+                 model_trainer_config: ModelTrainerConfig):
+        '''
+        Args:
+            data_transformation_artifact (DataTransformationArtifact): Transformed train/test arrays and the preprocessing object.
+            model_trainer_config (ModelTrainerConfig): Configuration of the search and the trained model paths.
+        '''
+        try:
+            self.data_transformation_artifact = data_transformation_artifact
+            self.model_trainer_config = model_trainer_config
+            self.model_config = read_yaml_file(model_trainer_config.model_config_file_path)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def get_candidates(self) -> list:
+        '''
+        Expands the search space of config/model.yaml into candidates.
+        Returns:
+            list: One dict per candidate with its family, estimator class path and parameters.
+        '''
+        try:
+            candidates = []
+            binned_available = self.data_transformation_artifact.binned_train_file_path is not None
+            for family, spec in self.model_config['model_selection'].items():
+                binned = spec.get('input', 'features') == 'binned'
+                if binned and not binned_available:
+                    logging.info(f"Skipping {family}: it needs the binned arrays, which the transformation did not write")
+                    continue
+                for params in ParameterGrid(spec.get('grid') or {}):
+                    candidates.append({'family': family, 'class': spec['class'], 'binned': binned,
+                                       'params': {**(spec.get('fixed') or {}), **params}, 'rungs': []})
+            logging.info(f"Search space holds {len(candidates)} candidates")
+            return candidates
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def _n_jobs(self) -> int:
+        n_jobs = self.model_trainer_config.n_jobs
+        return os.cpu_count() if n_jobs is None or n_jobs < 1 else n_jobs
+
+    def successive_halving(self, candidates: list, n_fit_rows: int) -> tuple:
+        '''
+        Runs successive halving over `candidates` on a process pool.
+        Every rung fits the surviving candidates on a larger prefix of the shuffled training
+        rows and keeps the best 1/reduction_factor of them, so weak configurations only ever
+        see small subsamples. The search stops early once the wall-clock or fit budget is spent;
+        the best candidate of the last completed rung then wins. When the wall-clock budget runs
+        out, the workers are terminated rather than left to finish the fits in progress.
+        The holdout is cut from the (possibly resampled) training array, so its scores rank
+        candidates but are not comparable to the test metrics.
+        Args:
+            candidates (list): Candidates from get_candidates, updated in place with their rung results.
+            n_fit_rows (int): Number of training rows available for fitting.
+        Returns:
+            tuple: (best candidate, reason the search stopped)
+        '''
+        try:
+            config = self.model_trainer_config
+            deadline = time.perf_counter() + config.max_seconds if config.max_seconds else None
+            fits = 0
+            survivors = list(candidates)
+            best, stopped = None, 'completed'
+            context = multiprocessing.get_context('spawn')
+            worker_pids = context.Queue()
+            executor = ProcessPoolExecutor(max_workers=self._n_jobs(), mp_context=context,
+                                           initializer=_init_search_worker,
+                                           initargs=(worker_pids, self.data_transformation_artifact.transformed_train_file_path,
+                                                     self.data_transformation_artifact.binned_train_file_path,
+                                                     config.validation_fraction, config.random_state))
+            finished = False
+            try:
+                rung = 0
+                while True:
+                    n_rows = min(n_fit_rows, config.min_resources * config.reduction_factor ** rung)
+                    if config.max_fits and fits + len(survivors) > config.max_fits:
+                        stopped = 'fit budget'
+                        if best is not None or fits >= config.max_fits:
+                            break
+                        # The budget cannot cover the first rung: score what it allows
+                        survivors = survivors[:config.max_fits - fits]
+                    logging.info(f"Rung {rung}: fitting {len(survivors)} candidates on {n_rows} rows")
+                    futures = {executor.submit(_fit_candidate, candidate['class'], candidate['params'], n_rows, candidate['binned']): candidate
+                               for candidate in survivors}
+                    fits += len(futures)
+                    pending = set(futures)
+                    while pending:
+                        timeout = max(deadline - time.perf_counter(), 0) if deadline else None
+                        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            candidate = futures[future]
+                            candidate['rungs'].append(future.result())
+                            logging.info(f"{candidate['family']} {candidate['params']}: f1 {candidate['rungs'][-1]['f1_score']:.4f} "
+                                         f"on {n_rows} rows, fit {candidate['rungs'][-1]['fit_seconds']:.2f}s")
+                        if deadline and time.perf_counter() >= deadline and pending:
+                            stopped = 'time budget'
+                            break
+                    completed = [candidate for candidate in survivors
+                                 if candidate['rungs'] and candidate['rungs'][-1]['rows'] == n_rows]
+                    if completed:
+                        completed.sort(key=lambda candidate: candidate['rungs'][-1]['f1_score'], reverse=True)
+                        best = completed[0]
+                    if stopped != 'completed' or len(completed) <= 1 or n_rows >= n_fit_rows:
+                        break
+                    survivors = completed[:max(1, math.ceil(len(completed) / config.reduction_factor))]
+                    rung += 1
+                finished = True
+            finally:
+                if finished and stopped != 'time budget':
+                    executor.shutdown(wait=True)
+                else:
+                    _terminate_pool(executor, worker_pids)
+            if best is None:
+                raise Exception(f"Search stopped ({stopped}) before any candidate was scored")
+            logging.info(f"Search {stopped} after {fits} fits, best {best['family']} {best['params']}")
+            return best, stopped
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def fit_final_model(self, candidate: dict, train: np.ndarray) -> tuple:
+        '''
+        Refits the selected candidate on every training row, using all cores when the estimator supports it.
+        A binned candidate is fitted on the shared bin indices and wrapped with the binner,
+        so that it scores the same float features as the other families.
+        Returns:
+            tuple: (fitted estimator, fit seconds)
+        '''
+        try:
+            model = _load_estimator_class(candidate['class'])(**candidate['params'])
+            if 'n_jobs' in model.get_params():
+                model.set_params(n_jobs=self.model_trainer_config.n_jobs)
+            features = train[:, :-1]
+            if candidate.get('binned'):
+                features = np.load(self.data_transformation_artifact.binned_train_file_path, mmap_mode='r')
+            started = time.perf_counter()
+            model.fit(features, train[:, -1])
+            fit_seconds = time.perf_counter() - started
+            if candidate.get('binned'):
+                model = BinnedClassifier(load_object(self.data_transformation_artifact.binner_object_file_path), model)
+            return model, fit_seconds
+        except Exception as e:
+            raise MyException(e, sys)
+
+    @staticmethod
+    def classification_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> ClassificationMetricArtifact:
+        return ClassificationMetricArtifact(f1_score=float(f1_score(y_true, y_pred)),
+                                            precision_score=float(precision_score(y_true, y_pred)),
+                                            recall_score=float(recall_score(y_true, y_pred)))
+
+    @staticmethod
+    def evaluate(model: object, test: np.ndarray, decision_threshold: float = None) -> ClassificationMetricArtifact:
+        try:
+            if decision_threshold is None:
+                y_pred = model.predict(test[:, :-1])
+            else:
+                y_pred = decide(model.classes_, model.predict_proba(test[:, :-1]), decision_threshold)
+            return ModelTrainer.classification_metrics(test[:, -1], y_pred)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def tune_threshold(self, model: object, validation: np.ndarray) -> tuple:
+        '''
+        Picks the decision threshold maximising `threshold_objective` in one sorted sweep over
+        every candidate threshold. The training array is resampled, so its class balance is not
+        the one the model will score: the sweep runs on the scores of the validation array, held
+        out of the training split before resampling. The test split is left out of the tuning so
+        that the test metrics, and the evaluation against the production model, stay unbiased.
+        Returns:
+            tuple: (threshold, report)
+        '''
+        try:
+            config = self.model_trainer_config
+            proba = model.predict_proba(validation[:, :-1])
+            scores = proba[:, 1]
+            y_true = np.asarray(validation[:, -1]) == model.classes_[1]
+            started = time.perf_counter()
+            threshold, best, curve = optimal_threshold(y_true, scores, objective=config.threshold_objective,
+                                                       beta=config.threshold_beta,
+                                                       true_positive_value=config.threshold_true_positive_value,
+                                                       false_positive_cost=config.threshold_false_positive_cost)
+            sweep_seconds = time.perf_counter() - started
+
+            default = decide(model.classes_, proba) == model.classes_[1]
+            report = {'objective': config.threshold_objective, 'threshold': threshold,
+                      'validation_rows': int(len(validation)),
+                      'candidate_thresholds': int(len(curve['threshold'])), 'sweep_seconds': sweep_seconds,
+                      'tuned': {name: float(curve[name][best]) for name in ('precision', 'recall', 'f_beta', 'profit')},
+                      'most_probable_class': {'f1_score': float(f1_score(y_true, default)),
+                                              'profit': float(config.threshold_true_positive_value * (default & y_true).sum()
+                                                              - config.threshold_false_positive_cost * (default & ~y_true).sum())}}
+            logging.info(f"Decision threshold {threshold:.4f} maximises {config.threshold_objective} on {len(validation)} "
+                         f"validation rows ({len(curve['threshold'])} thresholds swept in {sweep_seconds * 1000:.1f}ms)")
+            return threshold, report
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def warm_start_production_model(self, production_model: MyModel, train: np.ndarray) -> tuple:
+        '''
+        Adds trees fitted on the current training data to the production forest and drops
+        the oldest trees beyond `retrain_max_estimators`.
+        Args:
+            production_model (MyModel): Current production model; its estimator is updated in place.
+            train (np.ndarray): Training rows already mapped to the production feature space.
+        Returns:
+            tuple: (estimator, fit seconds, number of pruned trees)
+        '''
+        try:
+            config = self.model_trainer_config
+            model = production_model.trained_model_object
+            if not hasattr(model, 'estimators_') or 'warm_start' not in model.get_params():
+                raise ValueError(f"Retrain mode needs a warm-startable forest, production model is {type(model).__name__}")
+            if config.retrain_sample_rows and config.retrain_sample_rows < len(train):
+                rows = np.sort(np.random.default_rng(config.random_state).choice(len(train), config.retrain_sample_rows, replace=False))
+                train = train[rows]
+            model.set_params(warm_start=True, n_estimators=len(model.estimators_) + config.retrain_new_estimators)
+            if 'n_jobs' in model.get_params():
+                model.set_params(n_jobs=config.n_jobs)
+            started = time.perf_counter()
+            model.fit(train[:, :-1], train[:, -1])
+            fit_seconds = time.perf_counter() - started
+            pruned = max(0, len(model.estimators_) - config.retrain_max_estimators)
+            if pruned:
+                # warm start appends, so the oldest trees come first
+                model.estimators_ = model.estimators_[pruned:]
+                model.n_estimators = len(model.estimators_)
+            model.set_params(warm_start=False)
+            logging.info(f"Added {config.retrain_new_estimators} trees in {fit_seconds:.2f}s, pruned {pruned} oldest trees")
+            return model, fit_seconds, pruned
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def restore_production_model(self) -> Optional[str]:
+        '''
+        Downloads the pickled model of the registry's LATEST version to `production_model_file_path`.
+        Returns:
+            Optional[str]: The registry version restored, None when no registry is configured.
+        '''
+        try:
+            config = self.model_trainer_config
+            if config.production_s3_model_key_path is None:
+                logging.info(f"No model registry configured, using {config.production_model_file_path} as is")
+                return None
+            os.makedirs(os.path.dirname(config.production_model_file_path), exist_ok=True)
+            model_pusher = ModelPusher(model_pusher_config=ModelPusherConfig(
+                bucket_name=config.production_bucket_name, s3_model_key_path=config.production_s3_model_key_path))
+            return model_pusher.download_model_file(config.production_model_file_path)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def retrain_production_model(self, train: np.ndarray, test: np.ndarray,
+                                 production_version: Optional[str] = None) -> ModelTrainerArtifact:
+        '''
+        Retrain mode: warm-starts the production forest instead of searching from scratch.
+        The production trees split on the features of the production preprocessing object, so
+        the current arrays are mapped onto that feature space with a per-column affine map
+        and the production preprocessing object is kept. Optionally a forest with the same
+        parameters is fitted from scratch to report the f1 gap and the speedup; it replaces
+        the warm-started model when the gap exceeds `retrain_max_f1_gap`.
+        Args:
+            production_version (Optional[str]): Registry version already restored at `production_model_file_path`
+                by `restore_production_model`; restored here when None.
+        Returns:
+            ModelTrainerArtifact: Trained model path, test metrics and the retrain report path.
+        '''
+        try:
+            config = self.model_trainer_config
+            if production_version is None:
+                production_version = self.restore_production_model()
+            logging.info(f"Retraining the production model at {config.production_model_file_path}")
+            production_model = load_object(config.production_model_file_path)
+            preprocessing_object = load_object(self.data_transformation_artifact.preprocessing_object_file_path)
+            feature_encoder = production_model.feature_encoder
+            scale, offset = feature_space_mapping(preprocessing_object, production_model.preprocessing_object,
+                                                  feature_encoder.feature_names)
+
+            def to_production_space(array: np.ndarray) -> np.ndarray:
+                mapped = np.array(array, dtype=np.float32)
+                mapped[:, :-1] = mapped[:, :-1] * scale + offset
+                return mapped
+
+            production_train, production_test = to_production_space(train), to_production_space(test)
+            decision_threshold = getattr(production_model, 'decision_threshold', None)
+            trees_before = len(production_model.trained_model_object.estimators_)
+            model, warm_seconds, pruned = self.warm_start_production_model(production_model, production_train)
+            metric_artifact = self.evaluate(model, production_test, decision_threshold)
+            logging.info(f"Warm-started model test metrics: {metric_artifact}")
+            report = {'mode': 'warm_start', 'production_model': config.production_model_file_path,
+                      'production_version': production_version,
+                      'trees_before': trees_before, 'trees_added': config.retrain_new_estimators,
+                      'trees_pruned': pruned, 'trees_after': len(model.estimators_),
+                      'warm_start_fit_seconds': warm_seconds, 'warm_start_metrics': vars(metric_artifact),
+                      'decision_threshold': decision_threshold, 'kept': 'warm_start'}
+            saved = MyModel(preprocessing_object=production_model.preprocessing_object,
+                            trained_model_object=model, feature_encoder=feature_encoder,
+                            decision_threshold=decision_threshold)
+
+            if config.retrain_compare_full_refit:
+                params = {**model.get_params(), 'warm_start': False, 'n_estimators': len(model.estimators_)}
+                full_model = type(model)(**params)
+                started = time.perf_counter()
+                full_model.fit(train[:, :-1], train[:, -1])
+                full_seconds = time.perf_counter() - started
+                full_metrics = self.evaluate(full_model, test, decision_threshold)
+                report.update({'full_refit_fit_seconds': full_seconds, 'full_refit_metrics': vars(full_metrics),
+                               'f1_gap': full_metrics.f1_score - metric_artifact.f1_score,
+                               'speedup': full_seconds / warm_seconds if warm_seconds else None})
+                logging.info(f"Full refit took {full_seconds:.2f}s (speedup {report['speedup']:.1f}x), "
+                             f"f1 gap {report['f1_gap']:.4f}")
+                if report['f1_gap'] > config.retrain_max_f1_gap:
+                    report['kept'] = 'full_refit'
+                    metric_artifact = full_metrics
+                    saved = MyModel(preprocessing_object=preprocessing_object,
+                                    trained_model_object=full_model, feature_encoder=feature_encoder,
+                                    decision_threshold=decision_threshold)
+
+            write_yaml_file(config.search_report_file_path, report)
+            if metric_artifact.f1_score < config.expected_accuracy:
+                raise Exception(f"Retrained model did not reach the expected score {config.expected_accuracy}: "
+                                f"f1 score is {metric_artifact.f1_score:.4f}")
+            self.save_model(saved)
+            return ModelTrainerArtifact(trained_model_file_path=config.trained_model_file_path,
+                                        metric_artifact=metric_artifact,
+                                        search_report_file_path=config.search_report_file_path,
+                                        trained_model_package_file_path=config.trained_model_package_file_path)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def save_model(self, model: MyModel) -> None:
+        '''
+        Saves the model with dill and as a model package.
+        Args:
+            model (MyModel): Model to save.
+        '''
+        try:
+            config = self.model_trainer_config
+            os.makedirs(os.path.dirname(config.trained_model_file_path), exist_ok=True)
+            save_object(config.trained_model_file_path, model)
+            save_model_package(model, config.trained_model_package_file_path)
+            logging.info(f"Saved model package {config.trained_model_package_file_path}")
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def initiate_model_trainer(self, production_version: Optional[str] = None) -> ModelTrainerArtifact:
+        '''
+        Searches the model space, refits the best candidate on the full training data and
+        saves it with the preprocessing object.
+        Args:
+            production_version (Optional[str]): In retrain mode, the registry version already restored.
+        Returns:
+            ModelTrainerArtifact: Trained model path, test metrics and the search report path.
+        '''
+        try:
+            logging.info("Starting model training")
+            config = self.model_trainer_config
+            # Memory-mapped: the search workers and the final fit page the arrays in from the same files
+            train = np.load(self.data_transformation_artifact.transformed_train_file_path, mmap_mode='r')
+            test = np.load(self.data_transformation_artifact.transformed_test_file_path, mmap_mode='r')
+            if config.retrain:
+                return self.retrain_production_model(train, test, production_version)
+            fit_pool, _ = _split_indices(len(train), config.validation_fraction, config.random_state)
+
+            search_started = time.perf_counter()
+            candidates = self.get_candidates()
+            best, stopped = self.successive_halving(candidates, len(fit_pool))
+            search_seconds = time.perf_counter() - search_started
+
+            model, final_fit_seconds = self.fit_final_model(best, train)
+            decision_threshold, threshold_report = None, None
+            validation_file_path = self.data_transformation_artifact.transformed_validation_file_path
+            if config.threshold_objective and validation_file_path:
+                validation = np.load(validation_file_path, mmap_mode='r')
+                decision_threshold, threshold_report = self.tune_threshold(model, validation)
+            elif config.threshold_objective:
+                logging.info("No validation array to tune the decision threshold on, keeping the most probable class")
+            metric_artifact = self.evaluate(model, test, decision_threshold)
+            logging.info(f"Final model fitted in {final_fit_seconds:.2f}s, test metrics: {metric_artifact}")
+
+            write_yaml_file(config.search_report_file_path, {
+                'stopped': stopped,
+                'search_seconds': search_seconds,
+                'fits': sum(len(candidate['rungs']) for candidate in candidates),
+                'best': {'family': best['family'], 'params': dict(best['params'])},
+                'final_fit_seconds': final_fit_seconds,
+                'metrics': vars(metric_artifact),
+                'decision_threshold': threshold_report,
+                'model_bytes': len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+                'candidates': candidates,
+            })
+            if metric_artifact.f1_score < config.expected_accuracy:
+                raise Exception(f"No model reached the expected score {config.expected_accuracy}: "
+                                f"best f1 score is {metric_artifact.f1_score:.4f}")
+
+            preprocessing_object = load_object(self.data_transformation_artifact.preprocessing_object_file_path)
+            feature_encoder = FeatureEncoder(read_yaml_file(SCHEMA_FILE_PATH))
+            self.save_model(MyModel(preprocessing_object=preprocessing_object, trained_model_object=model,
+                                    feature_encoder=feature_encoder, decision_threshold=decision_threshold))
+            model_trainer_artifact = ModelTrainerArtifact(trained_model_file_path=config.trained_model_file_path,
+                                                          metric_artifact=metric_artifact,
+                                                          search_report_file_path=config.search_report_file_path,
+                                                          trained_model_package_file_path=config.trained_model_package_file_path)
+            logging.info(f"Model trainer artifact: {model_trainer_artifact}")
+            return model_trainer_artifact
+        except Exception as e:
+            raise MyException(e, sys)
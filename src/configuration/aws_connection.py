@@ -0,0 +1,45 @@
+import os
+import sys
+
+import boto3
+from botocore.config import Config
+
+from src.constants import (AWS_ACCESS_KEY_ID_ENV_KEY, AWS_SECRET_ACCESS_KEY_ENV_KEY, AWS_ENDPOINT_URL_ENV_KEY,
+                           REGION_NAME, S3_MAX_CONCURRENCY)
+from src.exception import MyException
+from src.logger import logging
+
+#this is used to setup connection with S3 or an S3-compatible endpoint
+
+
+class S3Client:
+    s3_client = None
+    s3_resource = None
+
+    def __init__(self, region_name: str = REGION_NAME, endpoint_url: str = None):
+        """
+        Creates the S3 client and resource shared by every instance, from the credentials
+        in the environment. `endpoint_url` (or the AWS_ENDPOINT_URL variable) points them
+        at an S3-compatible server instead of AWS, e.g. a local moto server.
+        """
+        try:
+            if S3Client.s3_client is None or S3Client.s3_resource is None:
+                access_key_id = os.getenv(AWS_ACCESS_KEY_ID_ENV_KEY)
+                secret_access_key = os.getenv(AWS_SECRET_ACCESS_KEY_ENV_KEY)
+                if access_key_id is None:
+                    raise Exception(f"Environment variable: {AWS_ACCESS_KEY_ID_ENV_KEY} is not set.")
+                if secret_access_key is None:
+                    raise Exception(f"Environment variable: {AWS_SECRET_ACCESS_KEY_ENV_KEY} is not set.")
+                endpoint_url = endpoint_url or os.getenv(AWS_ENDPOINT_URL_ENV_KEY)
+                options = dict(aws_access_key_id=access_key_id, aws_secret_access_key=secret_access_key,
+                               region_name=region_name, endpoint_url=endpoint_url,
+                               # one pooled connection per concurrent part transfer
+                               config=Config(max_pool_connections=max(S3_MAX_CONCURRENCY, 10),
+                                             retries={"max_attempts": 5, "mode": "standard"}))
+                S3Client.s3_resource = boto3.resource("s3", **options)
+                S3Client.s3_client = boto3.client("s3", **options)
+                logging.info(f"S3 client created for {endpoint_url or 'AWS'} in {region_name}")
+            self.s3_resource = S3Client.s3_resource
+            self.s3_client = S3Client.s3_client
+        except Exception as e:
+            raise MyException(e, sys)
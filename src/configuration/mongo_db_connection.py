@@ -14,21 +14,22 @@ ca=certifi.where()
 class MongoDBConnection:
     client=None
 
-    def __init__(self,database_name:str=DATABASE_NAME):
+    def __init__(self,database_name:str=DATABASE_NAME,dedicated_client:bool=False):
+            """
+            dedicated_client: create a private MongoClient for this instance instead of
+            the shared class-level one (used by parallel export workers).
+            """
             try:
-                if MongoDBConnection.client is None:
-                    try:
-                        mongodb_url = MONGODB_URL_KEY
-                        if not mongodb_url:
-                            raise ValueError(f"Environment variable '{MONGODB_URL_KEY}' is not set.")
-                        
-                        MongoDBConnection.client = pymongo.MongoClient(mongodb_url, tlsCAFile=ca)
+                if dedicated_client:
+                    self.client = MongoDBConnection._create_client()
+                    logging.info(f"Dedicated MongoDB client created with database: {database_name}")
+                else:
+                    if MongoDBConnection.client is None:
+                        MongoDBConnection.client = MongoDBConnection._create_client()
                         logging.info(f"MongoDB client created with database: {database_name}")
-                    except Exception as e:
-                        raise MyException(e, sys) from e
 
-                # Ensure every instance has proper attribute setup
-                self.client = MongoDBConnection.client
+                    # Ensure every instance has proper attribute setup
+                    self.client = MongoDBConnection.client
                 self.database = self.client[database_name]  # Connect to the specified database
                 self.database_name = database_name
                 logging.info("MongoDB connection successful.")
@@ -36,3 +37,13 @@ class MongoDBConnection:
             except Exception as e:
                     logging.info(f"Error while connecting to MongoDB: {e}")
                     raise MyException(e, sys) from e
+
+    @staticmethod
+    def _create_client() -> pymongo.MongoClient:
+        try:
+            mongodb_url = MONGODB_URL_KEY
+            if not mongodb_url:
+                raise ValueError(f"Environment variable '{MONGODB_URL_KEY}' is not set.")
+            return pymongo.MongoClient(mongodb_url, tlsCAFile=ca)
+        except Exception as e:
+            raise MyException(e, sys) from e
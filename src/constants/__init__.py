@@ -11,23 +11,50 @@ MONGODB_URL_KEY = os.getenv('mongo_url')
 
 PIPELINE_NAME: str = ""
 ARTIFACT_DIR: str = "artifact"
+STAGE_CACHE_DIR: str = os.path.join(ARTIFACT_DIR, "stage_cache")
+STAGE_CACHE_ENTRY_FILE_NAME: str = "entry.yaml"
+
+"""
+Training pipeline graph related constant
+"""
+PIPELINE_MAX_WORKERS: int = 4
 
 MODEL_FILE_NAME = "model.pkl"
+MODEL_PACKAGE_DIR_NAME = "model_package"
+MODEL_PACKAGE_MANIFEST_FILE_NAME = "manifest.json"
+MODEL_PACKAGE_ARRAYS_FILE_NAME = "arrays.bin"
 
 TARGET_COLUMN = "Response"
 CURRENT_YEAR = date.today().year
 PREPROCSSING_OBJECT_FILE_NAME = "preprocessing.pkl"
 
-FILE_NAME: str = "data.csv"
-TRAIN_FILE_NAME: str = "train.csv"
-TEST_FILE_NAME: str = "test.csv"
+# Format of the feature store and train/test splits: "parquet", "feather" or "csv"
+FEATURE_STORE_FILE_FORMAT: str = "parquet"
+# base names of the feature store and split files, given the extension of the configured format
+FILE_NAME: str = "data"
+TRAIN_FILE_NAME: str = "train"
+TEST_FILE_NAME: str = "test"
 SCHEMA_FILE_PATH = os.path.join("config", "schema.yaml")
 
 
 AWS_ACCESS_KEY_ID_ENV_KEY = "AWS_ACCESS_KEY_ID"
 AWS_SECRET_ACCESS_KEY_ENV_KEY = "AWS_SECRET_ACCESS_KEY"
+# S3-compatible endpoint (a moto server, MinIO...) used instead of AWS when set
+AWS_ENDPOINT_URL_ENV_KEY = "AWS_ENDPOINT_URL"
 REGION_NAME = "us-east-1"
 
+"""
+S3 transfer related constant start with S3 VAR NAME
+"""
+# objects larger than the threshold are transferred in parts of S3_PART_SIZE bytes, S3_MAX_CONCURRENCY at a time
+S3_MULTIPART_THRESHOLD: int = 64 * 1024 * 1024
+S3_PART_SIZE: int = 16 * 1024 * 1024
+S3_MAX_CONCURRENCY: int = 8
+# user metadata holding the sha256 of an object's content
+S3_SHA256_METADATA_KEY: str = "sha256"
+# progress of interrupted transfers, resumed part by part
+S3_TRANSFER_STATE_DIR: str = os.path.join(ARTIFACT_DIR, "s3_transfers")
+
 
 """
 Data Ingestion related constant start with DATA_INGESTION VAR NAME
@@ -37,12 +64,33 @@ DATA_INGESTION_DIR_NAME: str = "data_ingestion"
 DATA_INGESTION_FEATURE_STORE_DIR: str = "feature_store"
 DATA_INGESTION_INGESTED_DIR: str = "ingested"
 DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO: float = 0.25
+DATA_INGESTION_BATCH_SIZE: int = 10000
+DATA_INGESTION_EXPORT_WORKERS: int = 1
+DATA_INGESTION_EXPORT_PARTITIONS: int = 8
+DATA_INGESTION_EXPORT_PARTITION_KEY: str = "_id"
+DATA_INGESTION_STORE_DIR: str = os.path.join(ARTIFACT_DIR, "feature_store")
+DATA_INGESTION_WATERMARK_FILE_NAME: str = "watermark.yaml"
+DATA_INGESTION_WATERMARK_FIELD: str = "_id"
+DATA_INGESTION_INCREMENTAL: bool = True
+# profiles of the split files computed in memory, trusted by data validation
+DATA_INGESTION_PROFILE_FILE_NAME: str = "profile.yaml"
 
 """
 Data Validation realted contant start with DATA_VALIDATION VAR NAME
 """
 DATA_VALIDATION_DIR_NAME: str = "data_validation"
 DATA_VALIDATION_REPORT_FILE_NAME: str = "report.yaml"
+DATA_VALIDATION_CHUNK_SIZE: int = 50000
+DATA_VALIDATION_HISTOGRAM_BINS: int = 64
+DATA_VALIDATION_MAX_NULL_RATE: float = 0.0
+DATA_VALIDATION_PSI_THRESHOLD: float = 0.2
+DATA_VALIDATION_KS_THRESHOLD: float = 0.1
+DATA_VALIDATION_FAIL_ON_DRIFT: bool = False
+# profiles of the train and test splits, written by their own stages and joined into the report
+DATA_VALIDATION_TRAIN_PROFILE_FILE_NAME: str = "train_profile.yaml"
+DATA_VALIDATION_TEST_PROFILE_FILE_NAME: str = "test_profile.yaml"
+# profile of the last validated training data, shared between runs for run-over-run drift
+DATA_VALIDATION_PROFILE_FILE_PATH: str = os.path.join(ARTIFACT_DIR, "data_profile", "latest_profile.yaml")
 
 """
 Data Transformation ralated constant start with DATA_TRANSFORMATION VAR NAME
@@ -50,6 +98,26 @@ Data Transformation ralated constant start with DATA_TRANSFORMATION VAR NAME
 DATA_TRANSFORMATION_DIR_NAME: str = "data_transformation"
 DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR: str = "transformed"
 DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR: str = "transformed_object"
+DATA_TRANSFORMATION_CHUNK_SIZE: int = 10000
+DATA_TRANSFORMATION_OUT_OF_CORE: bool = False
+# one of "none", "smote", "smoteenn", "undersample"; only applied to the training data
+DATA_TRANSFORMATION_RESAMPLING_STRATEGY: str = "smoteenn"
+DATA_TRANSFORMATION_RESAMPLING_RATIO: float = 0.5
+DATA_TRANSFORMATION_RESAMPLING_N_JOBS: int = -1
+DATA_TRANSFORMATION_RESAMPLING_MAX_ROWS: int = 0
+# out of core, the training rows are resampled in memory on a stratified subsample of at most
+# this many rows: the resampled training set is bounded by it, not by the size of the split
+DATA_TRANSFORMATION_OUT_OF_CORE_RESAMPLING_MAX_ROWS: int = 250000
+# fraction of the training split set aside, before resampling, as the validation array the
+# decision threshold is tuned on; 0 writes no validation array
+DATA_TRANSFORMATION_VALIDATION_SPLIT_RATIO: float = 0.1
+DATA_TRANSFORMATION_VALIDATION_FILE_NAME: str = "validation.npy"
+# transformed training rows before resampling, written when the scalers are fitted
+DATA_TRANSFORMATION_UNRESAMPLED_TRAIN_FILE_NAME: str = "train_unresampled.npy"
+# uint8 bin indices of the transformed arrays, shared by the histogram-based model candidates
+DATA_TRANSFORMATION_WRITE_BINNED: bool = True
+DATA_TRANSFORMATION_MAX_BINS: int = 255
+DATA_TRANSFORMATION_BINNER_FILE_NAME: str = "binner.pkl"
 
 """
 MODEL TRAINER related constant start with MODEL_TRAINER var name
@@ -65,14 +133,108 @@ MODEL_TRAINER_MIN_SAMPLES_LEAF: int = 6
 MIN_SAMPLES_SPLIT_MAX_DEPTH: int = 10
 MIN_SAMPLES_SPLIT_CRITERION: str = 'entropy'
 MIN_SAMPLES_SPLIT_RANDOM_STATE: int = 101
+MODEL_TRAINER_SEARCH_REPORT_FILE_NAME: str = "search_report.yaml"
+# successive halving: the first rung fits every candidate on MIN_RESOURCES rows, each next
+# rung keeps 1/REDUCTION_FACTOR of the candidates and multiplies the rows by REDUCTION_FACTOR
+MODEL_TRAINER_MIN_RESOURCES: int = 10000
+MODEL_TRAINER_REDUCTION_FACTOR: int = 3
+MODEL_TRAINER_VALIDATION_FRACTION: float = 0.2
+# search budget, 0 means unlimited
+MODEL_TRAINER_MAX_SECONDS: float = 1800
+MODEL_TRAINER_MAX_FITS: int = 0
+MODEL_TRAINER_N_JOBS: int = -1
+# retrain mode: warm-start the production forest with new trees instead of searching from scratch
+MODEL_TRAINER_RETRAIN: bool = False
+# local copy of the pickled production model, restored from the model registry (MODEL_PUSHER_S3_KEY) by retrain mode
+MODEL_TRAINER_PRODUCTION_MODEL_FILE_PATH: str = os.path.join(ARTIFACT_DIR, "production_model", MODEL_FILE_NAME)
+MODEL_TRAINER_RETRAIN_NEW_ESTIMATORS: int = 50
+MODEL_TRAINER_RETRAIN_MAX_ESTIMATORS: int = 300
+# rows sampled for the new trees, 0 uses every training row
+MODEL_TRAINER_RETRAIN_SAMPLE_ROWS: int = 0
+# also fit from scratch to report the f1 gap and speedup; the refit is kept when warm start loses more than MAX_F1_GAP
+MODEL_TRAINER_RETRAIN_COMPARE_FULL_REFIT: bool = True
+MODEL_TRAINER_RETRAIN_MAX_F1_GAP: float = 0.01
+# decision threshold of the trained model, tuned on its scores of the validation array to maximise
+# "f_beta" or "profit" ("" keeps the most probable class); retraining keeps the production threshold
+MODEL_TRAINER_THRESHOLD_OBJECTIVE: str = "f_beta"
+MODEL_TRAINER_THRESHOLD_BETA: float = 1.0
+# expected profit of contacting a customer predicted to respond: value when they do, cost when they do not
+MODEL_TRAINER_THRESHOLD_TRUE_POSITIVE_VALUE: float = 5.0
+MODEL_TRAINER_THRESHOLD_FALSE_POSITIVE_COST: float = 1.0
 
 """
 MODEL Evaluation related constants
 """
+# the candidate replaces the production model when the lower confidence bound of its
+# f1 improvement is above this score
 MODEL_EVALUATION_CHANGED_THRESHOLD_SCORE: float = 0.02
 MODEL_BUCKET_NAME = "my-model-mlopsproj"
 MODEL_PUSHER_S3_KEY = "model-registry"
+MODEL_EVALUATION_DIR_NAME: str = "model_evaluation"
+MODEL_EVALUATION_REPORT_FILE_NAME: str = "report.yaml"
+# the production model in MODEL_BUCKET_NAME: the registry MODEL_PUSHER_S3_KEY (its LATEST version),
+# or the key of a dill model.pkl or of the manifest.json of a model package
+MODEL_EVALUATION_S3_MODEL_KEY_PATH: str = MODEL_PUSHER_S3_KEY
+MODEL_EVALUATION_BOOTSTRAP_RESAMPLES: int = 1000
+# resamples drawn at once; bounds the (resamples, test rows) weight matrices
+MODEL_EVALUATION_BOOTSTRAP_BATCH_SIZE: int = 20
+MODEL_EVALUATION_CONFIDENCE_LEVEL: float = 0.95
+# test rows scored at a time by both models
+MODEL_EVALUATION_BLOCK_ROWS: int = 100000
+
+"""
+MODEL Pusher related constant start with MODEL_PUSHER VAR NAME
+"""
+# registry layout under MODEL_PUSHER_S3_KEY: chunks/<sha256> holds content-addressed chunks shared by
+# every version, versions/<version>/version.json the immutable version manifests, and LATEST points
+# to the version being served
+MODEL_PUSHER_POINTER_NAME: str = "LATEST"
+MODEL_PUSHER_VERSIONS_DIR_NAME: str = "versions"
+MODEL_PUSHER_CHUNKS_DIR_NAME: str = "chunks"
+MODEL_PUSHER_VERSION_MANIFEST_FILE_NAME: str = "version.json"
+# the model LATEST points to, as read by S3Estimator
+MODEL_REGISTRY_URI: str = f"s3://{MODEL_BUCKET_NAME}/{MODEL_PUSHER_S3_KEY}"
+# content-defined chunk sizes of the package files: chunks end on average AVERAGE_SIZE (a power of two)
+# bytes past MIN_SIZE, and at MAX_SIZE at most
+MODEL_PUSHER_CHUNK_AVERAGE_SIZE: int = 1024 * 1024
+MODEL_PUSHER_CHUNK_MIN_SIZE: int = 256 * 1024
+MODEL_PUSHER_CHUNK_MAX_SIZE: int = 4 * 1024 * 1024
+
+"""
+Model cache related constant start with MODEL_CACHE VAR NAME
+"""
+# models downloaded from the registry, shared by every process on the host
+MODEL_CACHE_DIR: str = os.path.join(ARTIFACT_DIR, "model_cache")
+# least recently used models are removed once the cache is larger than this
+MODEL_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+# how often a running process checks the registry for a newly pushed model
+MODEL_CACHE_REFRESH_SECONDS: float = 60.0
+
+"""
+Batch prediction related constant start with BATCH_PREDICTION VAR NAME
+"""
+BATCH_PREDICTION_DIR_NAME: str = "batch_prediction"
+# a dill model.pkl or the manifest.json of a model package, local or s3://bucket/key, or the registry
+BATCH_PREDICTION_MODEL_FILE_PATH: str = MODEL_REGISTRY_URI
+BATCH_PREDICTION_OUTPUT_COLLECTION_NAME: str = "vehicle_predictions"
+BATCH_PREDICTION_OUTPUT_FILE_NAME: str = "predictions.parquet"
+# records that cannot be scored (a missing or non-numeric value, an unknown category), with the reason
+BATCH_PREDICTION_REJECT_FILE_NAME: str = "rejected.parquet"
+BATCH_PREDICTION_CHUNK_SIZE: int = 50000
+# 0 uses every core, 1 scores in the calling process
+BATCH_PREDICTION_WORKERS: int = 0
+# chunks read ahead of the writer per worker; bounds memory whatever the input size
+BATCH_PREDICTION_CHUNKS_IN_FLIGHT_PER_WORKER: int = 2
 
 
 APP_HOST = "0.0.0.0"
-APP_PORT = 5000
\ No newline at end of file
+APP_PORT = 5000
+# a dill model.pkl or the manifest.json of a model package, local or s3://bucket/key, or the registry
+# (read through the model cache and swapped when a new model is pushed)
+APP_MODEL_FILE_PATH: str = MODEL_REGISTRY_URI
+# concurrent single-record requests are scored together in micro-batches of at most
+# MAX_BATCH_SIZE records, waiting at most MAX_WAIT_MS for a batch to fill; 1 disables batching
+APP_MAX_BATCH_SIZE: int = 64
+APP_MAX_WAIT_MS: float = 2.0
+# inference processes (0 scores on a thread of the server process)
+APP_INFERENCE_WORKERS: int = 1
\ No newline at end of file
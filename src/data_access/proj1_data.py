@@ -1,57 +1,309 @@
 import sys
+import multiprocessing
 import pandas as pd
 import numpy as np
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterator, List, Optional
+
+from bson import ObjectId
 
 from src.configuration.mongo_db_connection import MongoDBConnection
-from src.constants import DATABASE_NAME
+from src.constants import DATABASE_NAME, DATA_INGESTION_BATCH_SIZE
 from src.exception import MyException
 
+# Fields that are never exported: the MongoDB key and the dataset row id.
+EXCLUDED_FIELDS = {"_id": 0, "id": 0}
+
+
+def _fill_missing(values: np.ndarray, start: int, end: int) -> np.ndarray:
+    """
+    Marks rows [start, end) of a column as missing, widening integer and bool
+    columns to float so that they can hold NaN. Returns the (possibly new) array.
+    """
+    if values.dtype.kind in "iub":
+        values = values.astype(np.result_type(values.dtype, np.float32))
+    values[start:end] = np.datetime64("NaT") if values.dtype.kind in "mM" else np.nan
+    return values
+
+
 class Proj1Data:
     """
     A class to export MongoDB records as a pandas DataFrame.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, dedicated_client: bool = False) -> None:
         """
         Initializes the MongoDB client connection.
+
+        dedicated_client : bool
+            Open a private MongoClient instead of reusing the shared one.
+        """
+        try:
+            self.mongo_client = MongoDBConnection(database_name=DATABASE_NAME, dedicated_client=dedicated_client)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def _get_collection(self, collection_name: str, database_name: Optional[str] = None):
+        """
+        Returns the collection from the default or specified database.
+        """
+        if database_name is None:
+            return self.mongo_client.database[collection_name]
+        return self.mongo_client.client[database_name][collection_name]
+
+    @staticmethod
+    def _records_to_frame(records: list) -> pd.DataFrame:
+        """
+        Converts a batch of documents into a DataFrame column by column.
+
+        Each field is collected into its own list and handed to pandas as a
+        column, so no intermediate list of row dicts is kept per batch and
+        every column gets a single inferred dtype.
+        """
+        columns = {}
+        for position, record in enumerate(records):
+            for key, value in record.items():
+                if key not in columns:
+                    columns[key] = [np.nan] * position
+                columns[key].append(value)
+            for key, values in columns.items():
+                if len(values) == position:
+                    values.append(np.nan)
+        df = pd.DataFrame(columns)
+        df = df.replace({"na": np.nan}).infer_objects()
+        return df
+
+    def export_collection_as_batches(self, collection_name: str, database_name: Optional[str] = None,
+                                     batch_size: int = DATA_INGESTION_BATCH_SIZE, query: Optional[dict] = None,
+                                     projection: Optional[dict] = None, sort: Optional[list] = None) -> Iterator[pd.DataFrame]:
+        """
+        Streams a MongoDB collection as a sequence of DataFrames.
+
+        Parameters:
+        ----------
+        collection_name : str
+            The name of the MongoDB collection to export.
+        database_name : Optional[str]
+            Name of the database (optional). Defaults to DATABASE_NAME.
+        batch_size : int
+            Number of documents fetched per cursor round trip and per yielded DataFrame.
+        query : Optional[dict]
+            Filter applied to the cursor. Defaults to the whole collection.
+        projection : Optional[dict]
+            Projection applied to the cursor. Defaults to leaving out '_id' and 'id'.
+        sort : Optional[list]
+            (key, direction) pairs the cursor is sorted by. Defaults to natural order.
+
+        Yields:
+        -------
+        pd.DataFrame
+            One DataFrame of at most `batch_size` rows, with 'na' values replaced with NaN.
         """
         try:
-            self.mongo_client = MongoDBConnection(database_name=DATABASE_NAME)
+            collection = self._get_collection(collection_name, database_name)
+            cursor = collection.find(query or {}, dict(projection or EXCLUDED_FIELDS), batch_size=batch_size)
+            if sort:
+                cursor = cursor.sort(sort)
+            records = []
+            for record in cursor:
+                records.append(record)
+                if len(records) == batch_size:
+                    yield self._records_to_frame(records)
+                    records = []
+            if records:
+                yield self._records_to_frame(records)
         except Exception as e:
             raise MyException(e, sys)
 
-    def export_collection_as_dataframe(self, collection_name: str, database_name: Optional[str] = None) -> pd.DataFrame:
+    def export_collection_as_dataframe(self, collection_name: str, database_name: Optional[str] = None,
+                                       batch_size: int = DATA_INGESTION_BATCH_SIZE, query: Optional[dict] = None,
+                                       sort: Optional[list] = None, projection: Optional[dict] = None) -> pd.DataFrame:
         """
         Exports an entire MongoDB collection as a pandas DataFrame.
 
-        Parameters: 
+        The collection is streamed in batches and copied into column arrays that are
+        preallocated from the document count, so peak memory is the final frame plus
+        one batch rather than a full list of documents. Rows whose document lacks a
+        field are NaN in that column, and the frame is built on the column arrays
+        without copying them.
+
+        Parameters:
         ----------
         collection_name : str
             The name of the MongoDB collection to export.
         database_name : Optional[str]
             Name of the database (optional). Defaults to DATABASE_NAME.
+        batch_size : int
+            Number of documents fetched per cursor round trip.
+        query : Optional[dict]
+            Filter applied to the cursor. Defaults to the whole collection.
+        sort : Optional[list]
+            (key, direction) pairs the cursor is sorted by. Defaults to natural order.
+        projection : Optional[dict]
+            Projection applied to the cursor. Defaults to leaving out '_id' and 'id'.
 
         Returns:
         -------
         pd.DataFrame
-            DataFrame containing the collection data, with '_id' column removed and 'na' values replaced with NaN.
+            DataFrame containing the collection data, without '_id'/'id' columns and 'na' values replaced with NaN.
         """
         try:
-            # Access specified collection from the default or specified database
-            if database_name is None:
-                collection = self.mongo_client.database[collection_name]
-            else:
-                collection = self.mongo_client[database_name][collection_name]
-
-            # Convert collection data to DataFrame and preprocess
+            collection = self._get_collection(collection_name, database_name)
             print("Fetching data from mongoDB")
-            df = pd.DataFrame(list(collection.find()))
+            total_rows = collection.count_documents(query or {})
+
+            arrays = {}
+            filled = 0
+            for chunk in self.export_collection_as_batches(collection_name, database_name,
+                                                           batch_size=batch_size, query=query, sort=sort,
+                                                           projection=projection):
+                end = filled + len(chunk)
+                if end > total_rows:
+                    # Documents inserted while exporting: grow instead of failing.
+                    total_rows = max(end, 2 * total_rows)
+                    for col in arrays:
+                        arrays[col] = np.resize(arrays[col], total_rows)
+                for col in chunk.columns:
+                    values = chunk[col].to_numpy()
+                    if col not in arrays:
+                        # rows of earlier chunks are filled as missing below
+                        arrays[col] = np.empty(total_rows, dtype=values.dtype)
+                        if filled:
+                            arrays[col] = _fill_missing(arrays[col], 0, filled)
+                    elif not np.can_cast(values.dtype, arrays[col].dtype, casting="same_kind"):
+                        arrays[col] = arrays[col].astype(np.result_type(arrays[col].dtype, values.dtype))
+                    arrays[col][filled:end] = values
+                for col in arrays.keys() - set(chunk.columns):
+                    # sparse documents: this chunk has no value for the column
+                    arrays[col] = _fill_missing(arrays[col], filled, end)
+                filled = end
+
+            # one block per column, sharing memory with the arrays
+            df = pd.DataFrame({col: values[:filled] for col, values in arrays.items()}, copy=False)
             print(f"Data fecthed with len: {len(df)}")
-            if "id" in df.columns.to_list():
-                df = df.drop(columns=["id"], axis=1)
-            df.replace({"na":np.nan},inplace=True)
             return df
 
         except Exception as e:
-            raise MyException(e, sys)
\ No newline at end of file
+            raise MyException(e, sys)
+
+    def get_max_value(self, collection_name: str, field: str, database_name: Optional[str] = None,
+                      query: Optional[dict] = None):
+        """
+        Returns the largest value of `field` among documents matching `query`, or None.
+        """
+        try:
+            collection = self._get_collection(collection_name, database_name)
+            highest = list(collection.find(query or {}, {field: 1}).sort(field, -1).limit(1))
+            return highest[0].get(field) if highest else None
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def get_partition_queries(self, collection_name: str, database_name: Optional[str] = None,
+                              partition_key: str = "_id", num_partitions: int = 8,
+                              query: Optional[dict] = None) -> List[dict]:
+        """
+        Splits the documents matching `query` into contiguous ranges of `partition_key`.
+
+        The key range between the smallest and largest value is divided evenly;
+        ObjectIds are interpolated on their integer value.
+
+        Returns:
+        -------
+        List[dict]
+            One MongoDB filter per partition, ordered by key, together covering the matching documents.
+        """
+        try:
+            collection = self._get_collection(collection_name, database_name)
+            lowest = list(collection.find(query or {}, {partition_key: 1}).sort(partition_key, 1).limit(1))
+            highest = list(collection.find(query or {}, {partition_key: 1}).sort(partition_key, -1).limit(1))
+            if not lowest:
+                return []
+            low, high = lowest[0][partition_key], highest[0][partition_key]
+
+            if isinstance(low, ObjectId):
+                # Interpolate on the full 96-bit value: bulk loads share a timestamp
+                # and only differ in the trailing counter bytes.
+                low_value, high_value = int(str(low), 16), int(str(high), 16)
+                bounds = [ObjectId(format(low_value + (high_value - low_value) * i // num_partitions, "024x"))
+                          for i in range(num_partitions + 1)]
+            else:
+                bounds = np.linspace(low, high, num_partitions + 1).tolist()
+                bounds[0], bounds[-1] = low, high
+
+            queries = []
+            for i in range(num_partitions):
+                upper = "$lte" if i == num_partitions - 1 else "$lt"
+                partition = {partition_key: {"$gte": bounds[i], upper: bounds[i + 1]}}
+                queries.append({"$and": [query, partition]} if query else partition)
+            return queries
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def export_collection_parallel(self, collection_name: str, database_name: Optional[str] = None,
+                                   partition_key: str = "_id", num_partitions: int = 8, max_workers: int = 4,
+                                   use_processes: bool = True, batch_size: int = DATA_INGESTION_BATCH_SIZE,
+                                   projection: Optional[dict] = None, query: Optional[dict] = None) -> pd.DataFrame:
+        """
+        Exports a collection by reading key ranges concurrently.
+
+        Each partition is read by a worker holding its own MongoClient; the partial
+        frames are concatenated in key order, so the result does not depend on
+        which worker finishes first.
+
+        Parameters:
+        ----------
+        collection_name : str
+            The name of the MongoDB collection to export.
+        database_name : Optional[str]
+            Name of the database (optional). Defaults to DATABASE_NAME.
+        partition_key : str
+            Indexed field used to split the collection ('_id' or 'id').
+        num_partitions : int
+            Number of key ranges. Use more partitions than workers to balance skewed ranges.
+        max_workers : int
+            Number of concurrent readers.
+        use_processes : bool
+            Read on a process pool (decoding runs on several cores) instead of a thread pool.
+        batch_size : int
+            Number of documents fetched per cursor round trip.
+        projection : Optional[dict]
+            Projection applied to the cursor. Defaults to leaving out '_id' and 'id'.
+        query : Optional[dict]
+            Filter applied to every partition. Defaults to the whole collection.
+
+        Returns:
+        -------
+        pd.DataFrame
+            DataFrame containing the matching documents, in partition-key order.
+        """
+        try:
+            queries = self.get_partition_queries(collection_name, database_name, partition_key, num_partitions, query)
+            print(f"Fetching data from mongoDB in {len(queries)} partitions with {max_workers} workers")
+            if use_processes:
+                executor = ProcessPoolExecutor(max_workers=max_workers,
+                                               mp_context=multiprocessing.get_context("spawn"))
+            else:
+                executor = ThreadPoolExecutor(max_workers=max_workers)
+            with executor:
+                frames = list(executor.map(_export_partition,
+                                           [(collection_name, database_name, query, [(partition_key, 1)], batch_size, projection)
+                                            for query in queries]))
+            frames = [frame for frame in frames if len(frame)]
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            print(f"Data fecthed with len: {len(df)}")
+            return df
+        except Exception as e:
+            raise MyException(e, sys)
+
+
+def _export_partition(task: tuple) -> pd.DataFrame:
+    """
+    Worker entry point: exports one key range with a dedicated MongoClient.
+    """
+    collection_name, database_name, query, sort, batch_size, projection = task
+    proj1_data = Proj1Data(dedicated_client=True)
+    try:
+        return proj1_data.export_collection_as_dataframe(collection_name, database_name, batch_size=batch_size,
+                                                         query=query, sort=sort, projection=projection)
+    finally:
+        proj1_data.mongo_client.client.close()
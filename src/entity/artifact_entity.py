@@ -1,4 +1,6 @@
 from dataclasses import dataclass
+from typing import Optional
+from src.constants import FEATURE_STORE_FILE_FORMAT
 
 @dataclass
 class DataIngestionArtifact:
@@ -10,9 +12,15 @@ including the training and testing datasets.
 Attributes:
     trained_file_path (str): Path to the file containing the training dataset.
     test_file_path (str): Path to the file containing the testing dataset.
+    file_format (str): Format of both files ('parquet', 'feather' or 'csv').
+    profile_file_path (Optional[str]): Profiles of both files computed during ingestion.
+    schema_fingerprint (Optional[str]): Fingerprint of the schema the profiles were computed against.
     '''
     trained_file_path:str 
     test_file_path:str
+    file_format:str = FEATURE_STORE_FILE_FORMAT
+    profile_file_path:Optional[str] = None
+    schema_fingerprint:Optional[str] = None
 
 @dataclass
 class DataValidationArtifact:
@@ -31,6 +39,47 @@ class DataValidationArtifact:
     validation_report_file_path: str
     message:str
 
+@dataclass
+class DataProfileArtifact:
+    """
+    A class to represent the profile of one split, computed by its own validation stage.
+
+    Attributes:
+        split (str): 'train' or 'test'.
+        profile_file_path (str): Path to the profile (DataProfiler.to_dict) of the split.
+    """
+    split: str
+    profile_file_path: str
+
+@dataclass
+class FittedTransformationArtifact:
+    """
+    A class to represent the preprocessing fitted on the training split, before the
+    train and test splits are transformed by their own stages.
+
+    Attributes:
+        preprocessing_object_file_path (str): Path to the file containing the fitted preprocessing object.
+        unresampled_train_file_path (str): Transformed training rows, before resampling.
+        transformed_validation_file_path (Optional[str]): Transformed training rows held out before resampling.
+        binner_object_file_path (Optional[str]): Path to the FeatureBinner fitted on the transformed training rows.
+    """
+    preprocessing_object_file_path: str
+    unresampled_train_file_path: str
+    transformed_validation_file_path: Optional[str] = None
+    binner_object_file_path: Optional[str] = None
+
+@dataclass
+class TransformedSplitArtifact:
+    """
+    A class to represent one transformed split.
+
+    Attributes:
+        transformed_file_path (str): Path to the transformed split (features then target).
+        binned_file_path (Optional[str]): Its features as uint8 bin indices.
+    """
+    transformed_file_path: str
+    binned_file_path: Optional[str] = None
+
 @dataclass
 class DataTransformationArtifact:
     """
@@ -43,8 +92,108 @@ class DataTransformationArtifact:
         transformed_train_file_path (str): Path to the transformed training dataset.
         transformed_test_file_path (str): Path to the transformed testing dataset.
         preprocessing_object_file_path (str): Path to the file containing the preprocessing object.
+        transformed_validation_file_path (Optional[str]): Transformed training rows held out before resampling.
+        binned_train_file_path (Optional[str]): Training features as uint8 bin indices.
+        binned_test_file_path (Optional[str]): Test features as uint8 bin indices.
+        binner_object_file_path (Optional[str]): Path to the FeatureBinner that produced them.
     """
     transformed_train_file_path: str
     transformed_test_file_path: str
-    preprocessing_object_file_path: str 
-    
\ No newline at end of file
+    preprocessing_object_file_path: str
+    transformed_validation_file_path: Optional[str] = None
+    binned_train_file_path: Optional[str] = None
+    binned_test_file_path: Optional[str] = None
+    binner_object_file_path: Optional[str] = None
+
+@dataclass
+class ClassificationMetricArtifact:
+    """
+    A class to represent the classification metrics of a model on the test data.
+
+    Attributes:
+        f1_score (float): F1 score of the positive class.
+        precision_score (float): Precision of the positive class.
+        recall_score (float): Recall of the positive class.
+    """
+    f1_score: float
+    precision_score: float
+    recall_score: float
+
+@dataclass
+class ModelTrainerArtifact:
+    """
+    A class to represent the artifact of model training.
+
+    Attributes:
+        trained_model_file_path (str): Path to the trained model (preprocessing and estimator).
+        metric_artifact (ClassificationMetricArtifact): Metrics of the trained model on the test data.
+        search_report_file_path (str): Path to the report of the hyperparameter search with per-candidate timings,
+            or of the warm-start retrain in retrain mode.
+        trained_model_package_file_path (Optional[str]): Manifest of the same model as a memory-mappable model package.
+    """
+    trained_model_file_path: str
+    metric_artifact: ClassificationMetricArtifact
+    search_report_file_path: str
+    trained_model_package_file_path: Optional[str] = None
+
+@dataclass
+class ModelEvaluationArtifact:
+    """
+    A class to represent the artifact of model evaluation.
+
+    Attributes:
+        is_model_accepted (bool): Whether the trained model should replace the production model.
+        changed_accuracy (float): Improvement of the f1 score over the production model (point estimate).
+        s3_model_path (str): Key of the production model in the model bucket.
+        trained_model_path (str): Path to the evaluated trained model.
+        report_file_path (str): Path to the report with both models' metrics and the bootstrap intervals.
+        trained_model_package_file_path (Optional[str]): Manifest of the trained model package, pushed when accepted.
+    """
+    is_model_accepted: bool
+    changed_accuracy: float
+    s3_model_path: str
+    trained_model_path: str
+    report_file_path: str
+    trained_model_package_file_path: Optional[str] = None
+
+@dataclass
+class ModelPusherArtifact:
+    """
+    A class to represent the artifact of the model pusher.
+
+    Attributes:
+        bucket_name (str): Bucket of the model registry.
+        s3_model_path (str): Key prefix of the model registry.
+        version (Optional[str]): Version the registry points to after the push, None when the model was not accepted.
+        uploaded_chunks (int): Number of package chunks uploaded.
+        reused_chunks (int): Number of package chunks already in the registry.
+        uploaded_bytes (int): Size of the uploaded chunks.
+    """
+    bucket_name: str
+    s3_model_path: str
+    version: Optional[str] = None
+    uploaded_chunks: int = 0
+    reused_chunks: int = 0
+    uploaded_bytes: int = 0
+
+@dataclass
+class BatchPredictionArtifact:
+    """
+    A class to represent the artifact of a batch prediction run.
+
+    Attributes:
+        output (str): MongoDB collection or Parquet file holding the predictions.
+        rows (int): Number of scored records.
+        positive_rows (int): Number of records predicted to respond.
+        seconds (float): Wall-clock duration of the run.
+        rows_per_second (float): Throughput of the run.
+        rejected_rows (int): Number of records that could not be scored.
+        reject_output (str): Parquet file holding the rejected records and why, None when they were only logged.
+    """
+    output: str
+    rows: int
+    positive_rows: int
+    seconds: float
+    rows_per_second: float
+    rejected_rows: int = 0
+    reject_output: Optional[str] = None
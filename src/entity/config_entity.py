@@ -2,6 +2,7 @@ import os
 from src.constants import *
 from datetime import datetime
 from dataclasses import dataclass
+from typing import Optional
 
 TIMESTAMP: str = datetime.now().strftime("%m_%d_%Y_%H_%M_%S")
 
@@ -20,28 +21,186 @@ training_pipeline_config: TrainingPipelineConfig = TrainingPipelineConfig()
 class DataIngestionConfig:
     '''A class to represent the configuration of data ingestion process.
     This class contains the directory paths for data ingestion, feature store,
-    training and testing datasets, and the train-test split ratio.'''
+    training and testing datasets, their file format, the train-test split ratio and how the collection is exported
+    (batch size, and number of workers/partitions for a parallel export).
+    With `incremental` set, only documents past the watermark stored in `store_dir`
+    are fetched and appended to that shared store; `full_refresh` rebuilds it.
+    The split files are profiled while still in memory and the profile is written to `profile_file_path`.
+    The feature store and split paths left unset are named after `file_format`.'''
 
     data_ingestion_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_INGESTION_DIR_NAME)
-    feature_store_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_FEATURE_STORE_DIR, FILE_NAME)
-    training_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TRAIN_FILE_NAME)
-    testing_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TEST_FILE_NAME)
+    feature_store_file_path: Optional[str] = None
+    training_file_path: Optional[str] = None
+    testing_file_path: Optional[str] = None
     train_test_split_ratio: float = DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO
+    file_format: str = FEATURE_STORE_FILE_FORMAT
     collection_name:str = COLLECTION_NAME
+    export_batch_size: int = DATA_INGESTION_BATCH_SIZE
+    export_workers: int = DATA_INGESTION_EXPORT_WORKERS
+    export_partitions: int = DATA_INGESTION_EXPORT_PARTITIONS
+    export_partition_key: str = DATA_INGESTION_EXPORT_PARTITION_KEY
+    export_use_processes: bool = True
+    incremental: bool = DATA_INGESTION_INCREMENTAL
+    full_refresh: bool = False
+    watermark_field: str = DATA_INGESTION_WATERMARK_FIELD
+    store_dir: str = os.path.join(DATA_INGESTION_STORE_DIR, COLLECTION_NAME)
+    profile_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, DATA_INGESTION_PROFILE_FILE_NAME)
+    histogram_bins: int = DATA_VALIDATION_HISTOGRAM_BINS
+
+    def __post_init__(self):
+        if self.feature_store_file_path is None:
+            self.feature_store_file_path = os.path.join(self.data_ingestion_dir, DATA_INGESTION_FEATURE_STORE_DIR,
+                                                        f"{FILE_NAME}.{self.file_format}")
+        if self.training_file_path is None:
+            self.training_file_path = os.path.join(self.data_ingestion_dir, DATA_INGESTION_INGESTED_DIR,
+                                                   f"{TRAIN_FILE_NAME}.{self.file_format}")
+        if self.testing_file_path is None:
+            self.testing_file_path = os.path.join(self.data_ingestion_dir, DATA_INGESTION_INGESTED_DIR,
+                                                  f"{TEST_FILE_NAME}.{self.file_format}")
 
 @dataclass
 class DataValidationConfig:
     '''A class to represent the configuration of data validation process.
-    This class contains the directory paths for data validation and the report file.'''
+    This class contains the directory paths for data validation, the report file and the
+    profiles of the train and test splits the report is built from.'''
 
     data_validation_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_VALIDATION_DIR_NAME)
     validation_report_file_path: str = os.path.join(data_validation_dir, DATA_VALIDATION_REPORT_FILE_NAME)
+    train_profile_file_path: str = os.path.join(data_validation_dir, DATA_VALIDATION_TRAIN_PROFILE_FILE_NAME)
+    test_profile_file_path: str = os.path.join(data_validation_dir, DATA_VALIDATION_TEST_PROFILE_FILE_NAME)
+    chunk_size: int = DATA_VALIDATION_CHUNK_SIZE
+    histogram_bins: int = DATA_VALIDATION_HISTOGRAM_BINS
+    max_null_rate: float = DATA_VALIDATION_MAX_NULL_RATE
+    psi_threshold: float = DATA_VALIDATION_PSI_THRESHOLD
+    ks_threshold: float = DATA_VALIDATION_KS_THRESHOLD
+    fail_on_drift: bool = DATA_VALIDATION_FAIL_ON_DRIFT
+    previous_profile_file_path: str = DATA_VALIDATION_PROFILE_FILE_PATH
 
 @dataclass
 class DataTransformationConfig:
     '''A class to represent the configuration of data transformation process.
-    This class contains the directory paths for data transformation and the transformed file.'''
+    This class contains the directory paths for data transformation and the transformed file,
+    the number of rows encoded per chunk (0 encodes each file in a single pass) and whether
+    the scalers are fitted and applied out of core, streaming chunks into memory-mapped outputs.
+    The resampling fields select how the training data is rebalanced (0 max rows: no subsample);
+    out of core, at most `out_of_core_resampling_max_rows` rows are resampled, in memory.
+    A `validation_split_ratio` share of the training rows is written, transformed but never resampled,
+    to `transformed_file_path_validation` and left out of the training array; the other training rows
+    are written to `transformed_file_path_train_unresampled` before they are resampled.
+    With `write_binned` set the transformed features are also written as uint8 bin indices.'''
     data_transformation_dir:str=os.path.join(training_pipeline_config.artifact_dir, DATA_TRANSFORMATION_DIR_NAME)
-    transformed_file_path_train: str = os.path.join(data_transformation_dir,DATA_TRANSFORMATION_DIR_NAME,TRAIN_FILE_NAME.replace('csv','npy'))
-    transformed_file_path_test: str = os.path.join(data_transformation_dir,DATA_TRANSFORMATION_DIR_NAME,TEST_FILE_NAME.replace('csv','npy'))
-    transformed_object_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,PREPROCSSING_OBJECT_FILE_NAME)
\ No newline at end of file
+    transformed_file_path_train: str = os.path.join(data_transformation_dir,DATA_TRANSFORMATION_DIR_NAME,TRAIN_FILE_NAME+'.npy')
+    transformed_file_path_test: str = os.path.join(data_transformation_dir,DATA_TRANSFORMATION_DIR_NAME,TEST_FILE_NAME+'.npy')
+    transformed_file_path_validation: str = os.path.join(data_transformation_dir,DATA_TRANSFORMATION_DIR_NAME,DATA_TRANSFORMATION_VALIDATION_FILE_NAME)
+    transformed_file_path_train_unresampled: str = os.path.join(data_transformation_dir,DATA_TRANSFORMATION_DIR_NAME,DATA_TRANSFORMATION_UNRESAMPLED_TRAIN_FILE_NAME)
+    transformed_object_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,PREPROCSSING_OBJECT_FILE_NAME)
+    chunk_size: int = DATA_TRANSFORMATION_CHUNK_SIZE
+    out_of_core: bool = DATA_TRANSFORMATION_OUT_OF_CORE
+    resampling_strategy: str = DATA_TRANSFORMATION_RESAMPLING_STRATEGY
+    resampling_ratio: float = DATA_TRANSFORMATION_RESAMPLING_RATIO
+    resampling_n_jobs: int = DATA_TRANSFORMATION_RESAMPLING_N_JOBS
+    resampling_max_rows: int = DATA_TRANSFORMATION_RESAMPLING_MAX_ROWS
+    out_of_core_resampling_max_rows: int = DATA_TRANSFORMATION_OUT_OF_CORE_RESAMPLING_MAX_ROWS
+    validation_split_ratio: float = DATA_TRANSFORMATION_VALIDATION_SPLIT_RATIO
+    write_binned: bool = DATA_TRANSFORMATION_WRITE_BINNED
+    max_bins: int = DATA_TRANSFORMATION_MAX_BINS
+    binned_file_path_train: str = os.path.join(data_transformation_dir,DATA_TRANSFORMATION_DIR_NAME,TRAIN_FILE_NAME+'_binned.npy')
+    binned_file_path_test: str = os.path.join(data_transformation_dir,DATA_TRANSFORMATION_DIR_NAME,TEST_FILE_NAME+'_binned.npy')
+    binner_object_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR, DATA_TRANSFORMATION_BINNER_FILE_NAME)
+
+@dataclass
+class ModelTrainerConfig:
+    '''A class to represent the configuration of model training.
+    This class contains the paths of the trained model, its memory-mappable model package and the search report, the expected score,
+    the search space file and the successive halving search settings and budget
+    (`max_seconds` of wall clock and `max_fits` fits, 0 for no limit).
+    With `retrain` set, the production forest is restored from the LATEST version of the registry
+    `production_s3_model_key_path` in `production_bucket_name` to `production_model_file_path` (used as is when
+    the key path is None), warm-started with `retrain_new_estimators` trees and pruned to its newest
+    `retrain_max_estimators` trees.
+    With a `threshold_objective` ('f_beta' or 'profit'), the decision threshold maximising it on the
+    scores of the validation array is saved with the model.'''
+    model_trainer_dir: str = os.path.join(training_pipeline_config.artifact_dir, MODEL_TRAINER_DIR_NAME)
+    trained_model_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR, MODEL_FILE_NAME)
+    trained_model_package_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR,
+                                                        MODEL_PACKAGE_DIR_NAME, MODEL_PACKAGE_MANIFEST_FILE_NAME)
+    search_report_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_SEARCH_REPORT_FILE_NAME)
+    expected_accuracy: float = MODEL_TRAINER_EXPECTED_SCORE
+    model_config_file_path: str = MODEL_TRAINER_MODEL_CONFIG_FILE_PATH
+    min_resources: int = MODEL_TRAINER_MIN_RESOURCES
+    reduction_factor: int = MODEL_TRAINER_REDUCTION_FACTOR
+    validation_fraction: float = MODEL_TRAINER_VALIDATION_FRACTION
+    max_seconds: float = MODEL_TRAINER_MAX_SECONDS
+    max_fits: int = MODEL_TRAINER_MAX_FITS
+    n_jobs: int = MODEL_TRAINER_N_JOBS
+    random_state: int = MIN_SAMPLES_SPLIT_RANDOM_STATE
+    retrain: bool = MODEL_TRAINER_RETRAIN
+    production_model_file_path: str = MODEL_TRAINER_PRODUCTION_MODEL_FILE_PATH
+    production_bucket_name: str = MODEL_BUCKET_NAME
+    production_s3_model_key_path: Optional[str] = MODEL_PUSHER_S3_KEY
+    retrain_new_estimators: int = MODEL_TRAINER_RETRAIN_NEW_ESTIMATORS
+    retrain_max_estimators: int = MODEL_TRAINER_RETRAIN_MAX_ESTIMATORS
+    retrain_sample_rows: int = MODEL_TRAINER_RETRAIN_SAMPLE_ROWS
+    retrain_compare_full_refit: bool = MODEL_TRAINER_RETRAIN_COMPARE_FULL_REFIT
+    retrain_max_f1_gap: float = MODEL_TRAINER_RETRAIN_MAX_F1_GAP
+    threshold_objective: str = MODEL_TRAINER_THRESHOLD_OBJECTIVE
+    threshold_beta: float = MODEL_TRAINER_THRESHOLD_BETA
+    threshold_true_positive_value: float = MODEL_TRAINER_THRESHOLD_TRUE_POSITIVE_VALUE
+    threshold_false_positive_cost: float = MODEL_TRAINER_THRESHOLD_FALSE_POSITIVE_COST
+
+
+
+@dataclass
+class ModelEvaluationConfig:
+    '''A class to represent the configuration of model evaluation.
+    The trained model is compared with the production model at `s3_model_key_path` in `bucket_name`
+    on the test array, read in blocks of `block_rows` rows. `n_resamples` bootstrap resamples, drawn
+    `bootstrap_batch_size` at a time, give `confidence_level` intervals on the metric improvements;
+    the model is accepted when the lower bound of the f1 improvement exceeds `changed_threshold_score`.'''
+    model_evaluation_dir: str = os.path.join(training_pipeline_config.artifact_dir, MODEL_EVALUATION_DIR_NAME)
+    report_file_path: str = os.path.join(model_evaluation_dir, MODEL_EVALUATION_REPORT_FILE_NAME)
+    changed_threshold_score: float = MODEL_EVALUATION_CHANGED_THRESHOLD_SCORE
+    bucket_name: str = MODEL_BUCKET_NAME
+    s3_model_key_path: str = MODEL_EVALUATION_S3_MODEL_KEY_PATH
+    n_resamples: int = MODEL_EVALUATION_BOOTSTRAP_RESAMPLES
+    bootstrap_batch_size: int = MODEL_EVALUATION_BOOTSTRAP_BATCH_SIZE
+    confidence_level: float = MODEL_EVALUATION_CONFIDENCE_LEVEL
+    block_rows: int = MODEL_EVALUATION_BLOCK_ROWS
+    random_state: int = MIN_SAMPLES_SPLIT_RANDOM_STATE
+
+
+
+@dataclass
+class ModelPusherConfig:
+    '''A class to represent the configuration of the model pusher.
+    Accepted model packages are published to the registry `s3_model_key_path` in `bucket_name`, split into
+    content-defined chunks of `chunk_min_size` to `chunk_max_size` bytes, cut on average `chunk_average_size`
+    bytes past the minimum.'''
+    bucket_name: str = MODEL_BUCKET_NAME
+    s3_model_key_path: str = MODEL_PUSHER_S3_KEY
+    chunk_average_size: int = MODEL_PUSHER_CHUNK_AVERAGE_SIZE
+    chunk_min_size: int = MODEL_PUSHER_CHUNK_MIN_SIZE
+    chunk_max_size: int = MODEL_PUSHER_CHUNK_MAX_SIZE
+
+
+@dataclass
+class BatchPredictionConfig:
+    '''A class to represent the configuration of batch prediction.
+    Records are read in chunks of `chunk_size` from `input_file_path` when set (in `input_file_format`),
+    otherwise from the MongoDB collection `input_collection_name`, and scored on `workers` processes.
+    Predictions go to the MongoDB collection `output_collection_name` when set, otherwise to the
+    Parquet file `output_file_path`. Records that cannot be scored are skipped and written with the
+    reason to the Parquet file `reject_file_path`, or only logged when it is None. At most
+    `chunks_in_flight_per_worker` chunks per worker are read ahead of the writer.'''
+    model_file_path: str = BATCH_PREDICTION_MODEL_FILE_PATH
+    input_collection_name: str = COLLECTION_NAME
+    input_file_path: Optional[str] = None
+    input_file_format: str = FEATURE_STORE_FILE_FORMAT
+    output_collection_name: Optional[str] = None
+    output_file_path: str = os.path.join(training_pipeline_config.artifact_dir, BATCH_PREDICTION_DIR_NAME,
+                                         BATCH_PREDICTION_OUTPUT_FILE_NAME)
+    reject_file_path: Optional[str] = os.path.join(training_pipeline_config.artifact_dir, BATCH_PREDICTION_DIR_NAME,
+                                                   BATCH_PREDICTION_REJECT_FILE_NAME)
+    chunk_size: int = BATCH_PREDICTION_CHUNK_SIZE
+    workers: int = BATCH_PREDICTION_WORKERS
+    chunks_in_flight_per_worker: int = BATCH_PREDICTION_CHUNKS_IN_FLIGHT_PER_WORKER
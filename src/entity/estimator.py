@@ -0,0 +1,930 @@
+import json
+import mmap
+import os
+import sys
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from scipy.special import expit
+
+from src.constants import MODEL_PACKAGE_ARRAYS_FILE_NAME, TARGET_COLUMN
+from src.exception import MyException
+
+
+class FeatureEncoder:
+    """
+    Encodes raw vehicle records into the model feature matrix in one vectorised pass.
+
+    The plan is derived from config/schema.yaml: numeric columns are copied, `binary_columns`
+    are mapped to 0/1 in place and `one_hot_columns` are expanded to indicator features that
+    are appended after the other columns. Categories are looked up through the codes of the
+    fixed `category_values` vocabulary, so every chunk, train and test get the same columns.
+    """
+
+    def __init__(self, schema_config: dict):
+        try:
+            vocabulary = schema_config["category_values"]
+            binary_columns = schema_config.get("binary_columns", {})
+            one_hot_columns = schema_config.get("one_hot_columns", {})
+            drop_columns = schema_config.get("drop_columns", [])
+            drop_columns = [drop_columns] if isinstance(drop_columns, str) else list(drop_columns)
+            excluded = set(drop_columns) | {TARGET_COLUMN, "id"}
+            # the sections the encoding is derived from, enough to rebuild the encoder
+            self.schema_config = {name: schema_config.get(name) for name in
+                                  ("columns", "category_values", "binary_columns", "one_hot_columns", "drop_columns")}
+
+            self.feature_names = []
+            self.source_columns = []
+            self.category_values = {}
+            self._numeric = []   # (source column, output index)
+            self._lookups = []   # (source column, first output index, table of shape (n_categories, width))
+            one_hot_plan = []
+            for column in schema_config["columns"]:
+                for name, kind in column.items():
+                    if name in excluded:
+                        continue
+                    self.source_columns.append(name)
+                    if name in binary_columns:
+                        categories = list(vocabulary[name])
+                        table = np.array([[category == binary_columns[name]] for category in categories], dtype=np.float32)
+                        self._lookups.append((name, len(self.feature_names), table))
+                        self.category_values[name] = categories
+                        self.feature_names.append(name)
+                    elif name in one_hot_columns:
+                        one_hot_plan.append(name)
+                    else:
+                        self._numeric.append((name, len(self.feature_names)))
+                        self.feature_names.append(name)
+            for name in one_hot_plan:
+                categories = list(vocabulary[name])
+                outputs = one_hot_columns[name]
+                table = np.array([[category == value for value in outputs] for category in categories], dtype=np.float32)
+                self._lookups.append((name, len(self.feature_names), table))
+                self.category_values[name] = categories
+                self.feature_names.extend(outputs.values())
+        except Exception as e:
+            raise MyException(e, sys)
+
+    @property
+    def n_features(self) -> int:
+        return len(self.feature_names)
+
+    def category_codes(self, name: str, values) -> np.ndarray:
+        """
+        Returns the vocabulary codes of `values` for column `name`, raising on unknown categories.
+        """
+        if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype) \
+                and list(values.cat.categories) == self.category_values[name]:
+            codes = values.cat.codes.to_numpy()
+        else:
+            codes = pd.Categorical(values, categories=self.category_values[name]).codes
+        if (codes < 0).any():
+            raise ValueError(f"Column {name} has values outside {self.category_values[name]}")
+        return codes
+
+    def encode(self, dataframe: pd.DataFrame, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Encodes `dataframe` into a float32 matrix of shape (rows, n_features).
+
+        Args:
+            dataframe (pd.DataFrame): Raw records holding at least the source columns.
+            out (Optional[np.ndarray]): Preallocated float32 array (or slice of one) to write into.
+        Returns:
+            np.ndarray: The encoded feature matrix (`out` when given).
+        """
+        try:
+            if out is None:
+                out = np.empty((len(dataframe), self.n_features), dtype=np.float32)
+            for name, index in self._numeric:
+                out[:, index] = dataframe[name].to_numpy()
+            for name, index, table in self._lookups:
+                out[:, index:index + table.shape[1]] = table[self.category_codes(name, dataframe[name])]
+            return out
+        except Exception as e:
+            raise MyException(e, sys)
+
+
+class FeatureBinner:
+    """
+    Maps a float feature matrix to uint8 bin indices with per-column thresholds.
+
+    Thresholds are the midpoints between distinct values for columns with at most
+    `max_bins` values and training quantiles otherwise, as histogram-based boosting does.
+    A value x of column j falls into bin searchsorted(thresholds[j], x, 'left').
+    """
+
+    def __init__(self, thresholds: list):
+        self.thresholds = [np.asarray(column, dtype=np.float64) for column in thresholds]
+
+    @classmethod
+    def fit(cls, features: np.ndarray, max_bins: int = 255, sample_rows: int = 200000, random_state: int = 42) -> "FeatureBinner":
+        try:
+            if len(features) > sample_rows:
+                rows = np.sort(np.random.default_rng(random_state).choice(len(features), sample_rows, replace=False))
+                features = features[rows]
+            thresholds = []
+            for column in np.asarray(features, dtype=np.float64).T:
+                distinct = np.unique(column)
+                if len(distinct) <= max_bins:
+                    thresholds.append((distinct[:-1] + distinct[1:]) / 2)
+                else:
+                    quantiles = np.percentile(column, np.linspace(0, 100, max_bins + 1)[1:-1], method='midpoint')
+                    thresholds.append(np.unique(quantiles))
+            return cls(thresholds)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    @property
+    def n_bins(self) -> list:
+        return [len(column) + 1 for column in self.thresholds]
+
+    def transform(self, features: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        try:
+            if out is None:
+                out = np.empty((len(features), len(self.thresholds)), dtype=np.uint8)
+            for index, thresholds in enumerate(self.thresholds):
+                out[:, index] = np.searchsorted(thresholds, features[:, index], side='left')
+            return out
+        except Exception as e:
+            raise MyException(e, sys)
+
+
+class BinnedClassifier:
+    """
+    A classifier fitted on binned features, scoring float features through its binner.
+    """
+
+    def __init__(self, binner: FeatureBinner, estimator: object):
+        self.binner = binner
+        self.estimator = estimator
+        self.classes_ = estimator.classes_
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        return self.estimator.predict(self.binner.transform(features))
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        return self.estimator.predict_proba(self.binner.transform(features))
+
+    def __repr__(self):
+        return f"Binned{type(self.estimator).__name__}()"
+
+
+def affine_parameters(preprocessing_object: object, feature_names: list) -> tuple:
+    """
+    Returns (columns, scale, offset) of a preprocessing object made of affine scalers and
+    passthrough columns: output column j is X[:, columns[j]] * scale[j] + offset[j].
+    The parameters are probed by transforming an all-zeros row and one unit row per feature.
+    """
+    try:
+        probes = np.vstack([np.zeros(len(feature_names)), np.eye(len(feature_names))])
+        outputs = np.asarray(preprocessing_object.transform(pd.DataFrame(probes, columns=feature_names)), dtype=np.float64)
+        offset = outputs[0]
+        deltas = outputs[1:] - offset
+        columns = np.argmax(deltas != 0, axis=0)
+        scale = deltas[columns, np.arange(len(offset))]
+        return columns, scale, offset
+    except Exception as e:
+        raise MyException(e, sys)
+
+
+def feature_space_mapping(source_preprocessing: object, target_preprocessing: object, feature_names: list) -> tuple:
+    """
+    Returns (scale, offset) mapping features produced by `source_preprocessing` onto the
+    features `target_preprocessing` produces for the same records: target = source * scale + offset.
+    Both objects must emit the input columns in the same order.
+    """
+    try:
+        source_columns, source_scale, source_offset = affine_parameters(source_preprocessing, feature_names)
+        target_columns, target_scale, target_offset = affine_parameters(target_preprocessing, feature_names)
+        if not np.array_equal(source_columns, target_columns):
+            raise ValueError("Preprocessing objects emit their columns in different orders")
+        scale = target_scale / source_scale
+        return scale, target_offset - source_offset * scale
+    except Exception as e:
+        raise MyException(e, sys)
+
+
+def decide(classes: np.ndarray, proba: np.ndarray, decision_threshold: Optional[float] = None) -> np.ndarray:
+    """
+    Turns class probabilities into predictions: the positive class (classes[1]) when its
+    probability reaches `decision_threshold`, or without a threshold the most probable
+    class, ties going to the first one as in scikit-learn.
+    """
+    if decision_threshold is None:
+        return classes.take(np.argmax(proba, axis=1), axis=0)
+    return classes.take((proba[:, 1] >= decision_threshold).astype(np.intp), axis=0)
+
+
+def threshold_curve(y_true: np.ndarray, scores: np.ndarray, beta: float = 1.0,
+                    true_positive_value: float = 1.0, false_positive_cost: float = 0.0) -> dict:
+    """
+    Sweeps every decision threshold of `scores` at once.
+
+    The scores are sorted once in decreasing order. Predicting positive for the k highest
+    scores then has cumsum(y_true)[k - 1] true positives, so each candidate threshold (one
+    per distinct score, predicting positive when score >= threshold) costs O(1) after the
+    O(n log n) sort, instead of a metric call over all rows per threshold.
+
+    Parameters:
+    ----------
+    y_true : np.ndarray
+        Whether each row is positive.
+    scores : np.ndarray
+        Positive-class probabilities of the rows.
+    beta : float
+        Weight of recall against precision in the F-beta score.
+    true_positive_value, false_positive_cost : float
+        Expected profit of a predicted positive that is, or is not, a positive.
+
+    Returns:
+    -------
+    dict
+        Arrays indexed by candidate threshold, from the highest: threshold, predicted_positives,
+        true_positives, precision, recall, f_beta and profit.
+    """
+    try:
+        order = np.argsort(scores, kind='stable')[::-1]
+        sorted_scores = np.asarray(scores)[order]
+        cumulative_positives = np.cumsum(np.asarray(y_true, dtype=bool)[order], dtype=np.int64)
+        # the last row of every run of equal scores: a threshold cannot split a run
+        ends = np.flatnonzero(np.r_[sorted_scores[1:] != sorted_scores[:-1], True])
+        true_positives = cumulative_positives[ends].astype(np.float64)
+        predicted_positives = ends + 1.0
+        false_positives = predicted_positives - true_positives
+        positives = float(cumulative_positives[-1]) if len(cumulative_positives) else 0.0
+        recall = true_positives / positives if positives else np.zeros_like(true_positives)
+        beta2 = beta ** 2
+        denominator = (1 + beta2) * true_positives + beta2 * (positives - true_positives) + false_positives
+        return {'threshold': sorted_scores[ends],
+                'predicted_positives': predicted_positives,
+                'true_positives': true_positives,
+                'precision': true_positives / predicted_positives,
+                'recall': recall,
+                'f_beta': np.divide((1 + beta2) * true_positives, denominator,
+                                    out=np.zeros_like(true_positives), where=denominator > 0),
+                'profit': true_positive_value * true_positives - false_positive_cost * false_positives}
+    except Exception as e:
+        raise MyException(e, sys)
+
+
+def optimal_threshold(y_true: np.ndarray, scores: np.ndarray, objective: str = 'f_beta', **kwargs) -> tuple:
+    """
+    Returns (threshold, index, curve): the candidate threshold maximising `objective`
+    ('f_beta' or 'profit'), its index in the threshold_curve of the scores, and the curve.
+    """
+    try:
+        curve = threshold_curve(y_true, scores, **kwargs)
+        if objective not in ('f_beta', 'profit'):
+            raise ValueError(f"Unknown threshold objective {objective}, expected 'f_beta' or 'profit'")
+        best = int(np.argmax(curve[objective]))
+        return float(curve['threshold'][best]), best, curve
+    except Exception as e:
+        raise MyException(e, sys)
+
+
+class MyModel:
+    """
+    A trained model bundled with everything needed to score raw vehicle records:
+    the feature encoder, the fitted preprocessing pipeline and the estimator.
+    With a `decision_threshold`, a record is predicted positive when its positive-class
+    probability reaches it, instead of when it is the most probable class.
+    """
+
+    def __init__(self, preprocessing_object: object, trained_model_object: object, feature_encoder: FeatureEncoder,
+                 decision_threshold: Optional[float] = None):
+        self.preprocessing_object = preprocessing_object
+        self.trained_model_object = trained_model_object
+        self.feature_encoder = feature_encoder
+        self.decision_threshold = decision_threshold
+
+    def transform(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """
+        Encodes and scales raw records into the model's feature matrix.
+        """
+        try:
+            features = pd.DataFrame(self.feature_encoder.encode(dataframe), columns=self.feature_encoder.feature_names, copy=False)
+            return self.preprocessing_object.transform(features)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def predict_transformed(self, features: np.ndarray) -> np.ndarray:
+        """
+        Predicts the response of preprocessed features.
+        """
+        # models pickled before thresholds were introduced have no decision_threshold
+        decision_threshold = getattr(self, "decision_threshold", None)
+        if decision_threshold is None:
+            return self.trained_model_object.predict(features)
+        return decide(self.trained_model_object.classes_, self.trained_model_object.predict_proba(features), decision_threshold)
+
+    def predict(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """
+        Predicts the response of raw records.
+        """
+        try:
+            return self.predict_transformed(self.transform(dataframe))
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def predict_proba(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """
+        Returns the probability of a positive response for raw records.
+        """
+        try:
+            return self.trained_model_object.predict_proba(self.transform(dataframe))[:, 1]
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def __repr__(self):
+        return f"{type(self.trained_model_object).__name__}()"
+
+    def __str__(self):
+        return f"{type(self.trained_model_object).__name__}()"
+
+
+MODEL_PACKAGE_FORMAT_VERSION = 1
+MODEL_PACKAGE_ALIGNMENT = 64
+
+
+def _column_transformer(preprocessing_object: object) -> object:
+    if hasattr(preprocessing_object, "named_steps"):
+        return preprocessing_object.named_steps["preprocessor"]
+    return preprocessing_object
+
+
+def _export_preprocessing(preprocessing_object: object, feature_names: list, arrays: dict) -> list:
+    """
+    Describes the fitted ColumnTransformer as a list of steps over encoded feature indices,
+    in output order, with the scaler parameters added to `arrays`.
+    """
+    from sklearn.preprocessing import FunctionTransformer, MinMaxScaler, StandardScaler
+    steps = []
+    for position, (name, transformer, columns) in enumerate(_column_transformer(preprocessing_object).transformers_):
+        if isinstance(transformer, str) and transformer == "drop" or len(columns) == 0:
+            continue
+        step = {"columns": [feature_names.index(column) if isinstance(column, str) else int(column) for column in columns]}
+        # a fitted "passthrough" remainder is an identity FunctionTransformer
+        if (isinstance(transformer, str) and transformer == "passthrough"
+                or isinstance(transformer, FunctionTransformer) and transformer.func is None):
+            step["kind"] = "passthrough"
+        elif isinstance(transformer, StandardScaler):
+            # StandardScaler casts its parameters to the dtype of the (float32) features, MinMaxScaler does not
+            step["kind"] = "standard"
+            if transformer.with_mean:
+                arrays[f"preprocessing_{position}_mean"] = transformer.mean_.astype(np.float32)
+                step["mean"] = f"preprocessing_{position}_mean"
+            if transformer.with_std:
+                arrays[f"preprocessing_{position}_scale"] = transformer.scale_.astype(np.float32)
+                step["scale"] = f"preprocessing_{position}_scale"
+        elif isinstance(transformer, MinMaxScaler) and not transformer.clip:
+            step["kind"] = "minmax"
+            arrays[f"preprocessing_{position}_scale"] = transformer.scale_
+            arrays[f"preprocessing_{position}_min"] = transformer.min_
+            step.update(scale=f"preprocessing_{position}_scale", min=f"preprocessing_{position}_min")
+        else:
+            raise ValueError(f"Cannot package preprocessing step {name}: {type(transformer).__name__}")
+        steps.append(step)
+    return steps
+
+
+def _scale_block(step: dict, arrays: dict, block: np.ndarray, columns=slice(None)) -> np.ndarray:
+    """
+    Applies a packaged preprocessing step in place to a float32 block of its columns (or of
+    the step columns selected by `columns`), with the same in-place operations as the scaler.
+    """
+    if step["kind"] == "standard":
+        if "mean" in step:
+            block -= arrays[step["mean"]][columns]
+        if "scale" in step:
+            block /= arrays[step["scale"]][columns]
+    elif step["kind"] == "minmax":
+        block *= arrays[step["scale"]][columns]
+        block += arrays[step["min"]][columns]
+    return block
+
+
+def _export_forest(model: object, arrays: dict) -> dict:
+    """
+    Flattens the trees of a fitted forest classifier into node arrays with global child indices.
+    Node values are normalised to class probabilities as DecisionTreeClassifier.predict_proba does.
+    """
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    if model.n_outputs_ != 1:
+        raise ValueError("Only single-output forests can be packaged")
+    sizes = np.array([tree.node_count for tree in trees], dtype=np.int64)
+    roots = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    left, right, values = [], [], []
+    for tree, root in zip(trees, roots):
+        left.append(np.where(tree.children_left >= 0, tree.children_left + root, -1))
+        right.append(np.where(tree.children_right >= 0, tree.children_right + root, -1))
+        value = tree.value[:, 0, :model.n_classes_]
+        normalizer = value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        values.append(value / normalizer)
+    if all(hasattr(tree, "missing_go_to_left") for tree in trees):
+        arrays["forest_missing_go_to_left"] = np.concatenate([tree.missing_go_to_left for tree in trees]).astype(np.bool_)
+    arrays.update(forest_roots=roots, forest_left=np.concatenate(left), forest_right=np.concatenate(right),
+                  forest_feature=np.concatenate([tree.feature for tree in trees]).astype(np.int64),
+                  forest_threshold=np.concatenate([tree.threshold for tree in trees]),
+                  forest_value=np.concatenate(values))
+    return {"kind": "forest"}
+
+
+def _export_hist_gradient_boosting(model: object, arrays: dict) -> dict:
+    """
+    Flattens the predictors of a fitted binary HistGradientBoostingClassifier.
+    """
+    if model.n_trees_per_iteration_ != 1:
+        raise ValueError("Only binary gradient boosting models can be packaged")
+    nodes = [predictors[0].nodes for predictors in model._predictors]
+    if any(node["is_categorical"].any() for node in nodes):
+        raise ValueError("Gradient boosting models with categorical splits cannot be packaged")
+    sizes = np.array([len(node) for node in nodes], dtype=np.int64)
+    roots = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    arrays.update(boosting_roots=roots,
+                  boosting_left=np.concatenate([np.where(node["is_leaf"] == 0, node["left"].astype(np.int64) + root, -1)
+                                                for node, root in zip(nodes, roots)]),
+                  boosting_right=np.concatenate([node["right"].astype(np.int64) + root for node, root in zip(nodes, roots)]),
+                  boosting_feature=np.concatenate([node["feature_idx"] for node in nodes]).astype(np.int64),
+                  boosting_threshold=np.concatenate([node["num_threshold"] for node in nodes]),
+                  boosting_missing_go_to_left=np.concatenate([node["missing_go_to_left"] for node in nodes]).astype(np.bool_),
+                  boosting_value=np.concatenate([node["value"] for node in nodes]),
+                  boosting_baseline=np.asarray(model._baseline_prediction, dtype=np.float64).ravel())
+    return {"kind": "hist_gradient_boosting"}
+
+
+def _float32_thresholds(threshold: np.ndarray) -> np.ndarray:
+    """
+    Returns the largest float32 not above each float64 threshold. For a float32 x,
+    x <= threshold holds exactly when x <= the rounded threshold, so the comparison
+    can be done in float32 without changing any split.
+    """
+    rounded = threshold.astype(np.float32)
+    above = rounded.astype(np.float64) > threshold
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+class CompiledForest:
+    """
+    A tree ensemble compiled into contiguous node arrays and evaluated with NumPy instead
+    of per-tree estimator calls.
+
+    Leaves are stored as nodes that loop back to themselves (threshold +inf), so all
+    (row, tree) pairs of a block of rows descend one level per step with the same four
+    gathers: the node's feature, the row's value of it, the node's threshold and the next
+    node. Every few levels the pairs that reached a leaf are dropped. Forests average the
+    normalised leaf values over the trees and binary gradient boosting adds the leaf values
+    to the baseline, in the order scikit-learn does, so the probabilities are identical to
+    the estimator's.
+    """
+
+    COMPACT_EVERY = 4
+
+    def __init__(self, kind: str, roots: np.ndarray, left: np.ndarray, right: np.ndarray, feature: np.ndarray,
+                 threshold: np.ndarray, value: np.ndarray, classes: np.ndarray, missing_go_to_left: Optional[np.ndarray] = None,
+                 baseline: float = 0.0, binner: Optional[FeatureBinner] = None, float32_thresholds: bool = False,
+                 block_rows: int = 256):
+        """
+        Args:
+            kind (str): "forest" or "hist_gradient_boosting".
+            roots, left, right, feature, threshold, value: Node arrays with global indices, -1 children at leaves.
+            float32_thresholds (bool): Compare in float32 against thresholds rounded down, which leaves every split unchanged.
+            block_rows (int): Rows evaluated together; bounds the size of the per-level work arrays.
+        """
+        try:
+            self.kind = kind
+            self.classes_ = classes
+            self.value = value
+            self.baseline = baseline
+            self.binner = binner
+            self.block_rows = block_rows
+            leaf = left < 0
+            nodes = np.arange(len(left), dtype=np.int32)
+            self.roots = np.asarray(roots, dtype=np.int32)
+            self.children = np.empty((len(left), 2), dtype=np.int32)
+            self.children[:, 0] = np.where(leaf, nodes, left)
+            self.children[:, 1] = np.where(leaf, nodes, right)
+            self.children = self.children.ravel()
+            self.feature = np.where(leaf, 0, feature).astype(np.int32)
+            threshold = _float32_thresholds(threshold) if float32_thresholds else np.asarray(threshold, dtype=np.float64)
+            self.threshold = np.where(leaf, np.inf, threshold).astype(threshold.dtype)
+            self.missing_go_to_left = None if missing_go_to_left is None else np.asarray(missing_go_to_left, dtype=np.bool_)
+            # number of levels below the deepest root
+            self.depth, frontier = 0, self.roots[~leaf[self.roots]]
+            while len(frontier):
+                frontier = np.concatenate([left[frontier], right[frontier]])
+                frontier = frontier[~leaf[frontier]]
+                self.depth += 1
+        except Exception as e:
+            raise MyException(e, sys)
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, kind: str, classes: np.ndarray, **kwargs) -> "CompiledForest":
+        """
+        Builds the compiled ensemble from the arrays written by _export_forest or _export_hist_gradient_boosting.
+        """
+        if kind == "forest":
+            return cls(kind, arrays["forest_roots"], arrays["forest_left"], arrays["forest_right"], arrays["forest_feature"],
+                       arrays["forest_threshold"], arrays["forest_value"], classes,
+                       missing_go_to_left=arrays.get("forest_missing_go_to_left"), **kwargs)
+        return cls(kind, arrays["boosting_roots"], arrays["boosting_left"], arrays["boosting_right"], arrays["boosting_feature"],
+                   arrays["boosting_threshold"], arrays["boosting_value"], classes,
+                   missing_go_to_left=arrays["boosting_missing_go_to_left"], baseline=float(arrays["boosting_baseline"][0]), **kwargs)
+
+    @classmethod
+    def from_estimator(cls, estimator: object, **kwargs) -> "CompiledForest":
+        """
+        Compiles a fitted forest classifier, a binary HistGradientBoostingClassifier or a BinnedClassifier wrapping one.
+        """
+        try:
+            if isinstance(estimator, BinnedClassifier):
+                kwargs["binner"] = estimator.binner
+                estimator = estimator.estimator
+            arrays = {}
+            if hasattr(estimator, "estimators_") and hasattr(estimator.estimators_[0], "tree_"):
+                kind = _export_forest(estimator, arrays)["kind"]
+            elif hasattr(estimator, "_predictors"):
+                kind = _export_hist_gradient_boosting(estimator, arrays)["kind"]
+            else:
+                raise ValueError(f"Cannot compile estimator {type(estimator).__name__}")
+            return cls.from_arrays(arrays, kind, estimator.classes_, **kwargs)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def apply(self, features: np.ndarray) -> np.ndarray:
+        """
+        Returns the leaf reached in every tree, shape (rows, trees), for a block of float32
+        features (already binned for binned ensembles).
+        """
+        n_rows, n_features = features.shape
+        flat = np.ascontiguousarray(features, dtype=np.float32).ravel()
+        missing = np.isnan(flat).any()
+        leaves = np.tile(self.roots, n_rows)
+        pairs = np.arange(len(leaves))
+        node = leaves.copy()
+        # offset of each pair's row in the flattened feature matrix
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.int32) * n_features, self.n_trees)
+        for level in range(1, self.depth + 1):
+            feature = self.feature.take(node)
+            values = flat.take(row_offset + feature)
+            go_right = values > self.threshold.take(node)
+            if missing:
+                # NaN compares False: take the learned direction (right when none was learned)
+                is_missing = np.isnan(values)
+                go_right[is_missing] = True if self.missing_go_to_left is None else ~self.missing_go_to_left[node[is_missing]]
+            step = self.children.take(2 * node + go_right)
+            if level % self.COMPACT_EVERY == 0 and level < self.depth:
+                moved = step != node
+                leaves[pairs] = step
+                pairs, node, row_offset = pairs[moved], step[moved], row_offset[moved]
+            else:
+                node = step
+        leaves[pairs] = node
+        return leaves.reshape(n_rows, self.n_trees)
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """
+        Returns class probabilities, shape (rows, classes).
+        """
+        try:
+            features = np.asarray(features)
+            if self.binner is not None:
+                features = self.binner.transform(features)
+            leaves = np.empty((len(features), self.n_trees), dtype=np.int32)
+            for start in range(0, len(features), self.block_rows):
+                leaves[start:start + self.block_rows] = self.apply(features[start:start + self.block_rows])
+            if self.kind == "forest":
+                proba = np.zeros((len(features), len(self.classes_)), dtype=np.float64)
+                for tree in range(self.n_trees):
+                    proba += self.value.take(leaves[:, tree], axis=0)
+                proba /= self.n_trees
+                return proba
+            raw = np.zeros(len(features), dtype=np.float64)
+            raw += self.baseline
+            for tree in range(self.n_trees):
+                raw += self.value.take(leaves[:, tree])
+            proba = np.empty((len(features), 2), dtype=np.float64)
+            proba[:, 1] = expit(raw)
+            proba[:, 0] = 1 - proba[:, 1]
+            return proba
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(features), axis=1), axis=0)
+
+    def __repr__(self):
+        return f"CompiledForest({self.kind}, {self.n_trees} trees, depth {self.depth})"
+
+
+def save_model_package(model: MyModel, manifest_file_path: str) -> None:
+    """
+    Writes `model` as a model package: a JSON manifest plus one uncompressed blob holding
+    every array (preprocessing parameters, optional bin thresholds and the flattened trees)
+    at 64-byte aligned offsets, so that load_model_package can memory-map it without copying.
+
+    Args:
+        model (MyModel): Model to package; its estimator may be a forest, a HistGradientBoostingClassifier
+            or a BinnedClassifier wrapping one.
+        manifest_file_path (str): Path of manifest.json; the blob is written next to it.
+    """
+    try:
+        if not hasattr(model.feature_encoder, "schema_config"):
+            raise ValueError("The model was pickled by an older version without its schema and cannot be packaged")
+        feature_names = model.feature_encoder.feature_names
+        arrays = {}
+        manifest = {"format_version": MODEL_PACKAGE_FORMAT_VERSION,
+                    "schema": model.feature_encoder.schema_config,
+                    "preprocessing": _export_preprocessing(model.preprocessing_object, feature_names, arrays),
+                    "binned": False,
+                    "decision_threshold": getattr(model, "decision_threshold", None)}
+        estimator = model.trained_model_object
+        if isinstance(estimator, BinnedClassifier):
+            arrays["binner_thresholds"] = np.concatenate(estimator.binner.thresholds)
+            arrays["binner_offsets"] = np.cumsum([0] + [len(column) for column in estimator.binner.thresholds]).astype(np.int64)
+            manifest["binned"] = True
+            estimator = estimator.estimator
+        if hasattr(estimator, "estimators_") and hasattr(estimator.estimators_[0], "tree_"):
+            manifest["model"] = _export_forest(estimator, arrays)
+        elif hasattr(estimator, "_predictors"):
+            manifest["model"] = _export_hist_gradient_boosting(estimator, arrays)
+        else:
+            raise ValueError(f"Cannot package estimator {type(estimator).__name__}")
+        manifest["model"].update(classes=estimator.classes_.tolist(), classes_dtype=estimator.classes_.dtype.str)
+
+        directory = os.path.dirname(manifest_file_path)
+        os.makedirs(directory, exist_ok=True)
+        manifest["arrays_file"] = MODEL_PACKAGE_ARRAYS_FILE_NAME
+        manifest["arrays"] = {}
+        blob_path = os.path.join(directory, MODEL_PACKAGE_ARRAYS_FILE_NAME)
+        with open(blob_path + ".tmp", "wb") as blob:
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                padding = -blob.tell() % MODEL_PACKAGE_ALIGNMENT
+                blob.write(b"\0" * padding)
+                manifest["arrays"][name] = {"offset": blob.tell(), "dtype": array.dtype.str, "shape": list(array.shape)}
+                blob.write(array.tobytes())
+        os.replace(blob_path + ".tmp", blob_path)
+        # the manifest is written last: a package is complete once its manifest exists
+        with open(manifest_file_path + ".tmp", "w") as file:
+            json.dump(manifest, file, indent=1)
+        os.replace(manifest_file_path + ".tmp", manifest_file_path)
+    except Exception as e:
+        raise MyException(e, sys)
+
+
+class PackagedModel:
+    """
+    A model package loaded by memory-mapping its blob read-only.
+
+    Every array is a view into the shared mapping, so loading costs a JSON parse and a
+    mmap, and serving processes on the same host share the pages through the page cache.
+    Scoring reproduces the arithmetic of the scikit-learn objects it was exported from:
+    the scalers run in place on float32 features and the trees are evaluated by a
+    CompiledForest, so predictions match the pickled model.
+    """
+
+    def __init__(self, manifest_file_path: str, float32_thresholds: bool = False):
+        try:
+            with open(manifest_file_path) as file:
+                self.manifest = json.load(file)
+            if self.manifest["format_version"] != MODEL_PACKAGE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported model package version {self.manifest['format_version']}")
+            blob_path = os.path.join(os.path.dirname(manifest_file_path), self.manifest["arrays_file"])
+            with open(blob_path, "rb") as blob:
+                self._mmap = mmap.mmap(blob.fileno(), 0, access=mmap.ACCESS_READ)
+            self.arrays = {name: np.frombuffer(self._mmap, dtype=np.dtype(spec["dtype"]),
+                                               count=int(np.prod(spec["shape"], dtype=np.int64)),
+                                               offset=spec["offset"]).reshape(spec["shape"])
+                           for name, spec in self.manifest["arrays"].items()}
+            self.feature_encoder = FeatureEncoder(self.manifest["schema"])
+            model = self.manifest["model"]
+            self.kind = model["kind"]
+            self.classes_ = np.array(model["classes"], dtype=np.dtype(model["classes_dtype"]))
+            self.decision_threshold = self.manifest.get("decision_threshold")
+            binner = None
+            if self.manifest["binned"]:
+                offsets = self.arrays["binner_offsets"]
+                binner = FeatureBinner([self.arrays["binner_thresholds"][start:end] for start, end in zip(offsets[:-1], offsets[1:])])
+            self.trees = CompiledForest.from_arrays(self.arrays, self.kind, self.classes_, binner=binner,
+                                                    float32_thresholds=float32_thresholds)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def transform_features(self, features: np.ndarray) -> np.ndarray:
+        """
+        Applies the packaged preprocessing to encoded features.
+        """
+        features = np.asarray(features, dtype=np.float32)
+        return np.hstack([_scale_block(step, self.arrays, features[:, step["columns"]])
+                          for step in self.manifest["preprocessing"]])
+
+    def predict_proba_transformed(self, features: np.ndarray) -> np.ndarray:
+        """
+        Returns class probabilities of preprocessed features, shape (rows, classes).
+        """
+        return self.trees.predict_proba(features)
+
+    def predict_transformed(self, features: np.ndarray) -> np.ndarray:
+        return decide(self.classes_, self.predict_proba_transformed(features), self.decision_threshold)
+
+    def transform(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """
+        Encodes and scales raw records into the model's feature matrix.
+        """
+        try:
+            return self.transform_features(self.feature_encoder.encode(dataframe))
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def predict(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """
+        Predicts the response of raw records.
+        """
+        return self.predict_transformed(self.transform(dataframe))
+
+    def predict_proba(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """
+        Returns the probability of a positive response for raw records.
+        """
+        return self.predict_proba_transformed(self.transform(dataframe))[:, 1]
+
+    def __repr__(self):
+        return f"PackagedModel({self.kind})"
+
+
+def load_model_package(manifest_file_path: str, float32_thresholds: bool = False) -> PackagedModel:
+    """
+    Loads a model package written by save_model_package.
+    """
+    return PackagedModel(manifest_file_path, float32_thresholds=float32_thresholds)
+
+
+class VehicleInsuranceModel:
+    """
+    A trained model compiled for low-latency scoring of raw records without pandas.
+
+    The encoder and the preprocessing are folded together: numeric input columns are
+    scaled straight into their output features, one vectorised operation per scaler, and
+    every categorical column becomes a lookup table holding the already scaled indicator
+    features of each category. Records are scored from a dict of scalars or columns, or
+    from a structured array, and the estimator then runs on the float32 feature matrix.
+    Scaling repeats the float32 operations of the fitted scalers, so the features are
+    identical to the ones of the sklearn pipeline.
+    """
+
+    def __init__(self, model: object, compiled_max_rows: int = 256, float32_thresholds: bool = False):
+        """
+        Args:
+            model: A MyModel or a PackagedModel (load_model_package).
+            compiled_max_rows (int): Batches of up to this many rows are scored by a CompiledForest of a
+                MyModel's trees, larger ones by the estimator, which has the higher throughput there. 0 disables it.
+            float32_thresholds (bool): Compile the trees with float32 thresholds (CompiledForest).
+        """
+        try:
+            encoder = model.feature_encoder
+            self.compiled = None
+            if isinstance(model, PackagedModel):
+                steps, arrays = model.manifest["preprocessing"], model.arrays
+                self.estimator = model.trees
+            else:
+                arrays = {}
+                steps = _export_preprocessing(model.preprocessing_object, encoder.feature_names, arrays)
+                self.estimator = model.trained_model_object
+                if compiled_max_rows:
+                    self.compiled = CompiledForest.from_estimator(self.estimator, float32_thresholds=float32_thresholds)
+            self.compiled_max_rows = compiled_max_rows
+            self.classes_ = self.estimator.classes_
+            self.decision_threshold = getattr(model, "decision_threshold", None)
+            self.model = model
+            self._arrays = arrays
+            # the step, position within the step and output position of every encoded feature
+            placement, start = {}, 0
+            for step in steps:
+                for position, column in enumerate(step["columns"]):
+                    placement[column] = (step, position, start + position)
+                start += len(step["columns"])
+            self.n_features = start
+
+            self._numeric = []   # (step, source columns, positions within the step, output positions)
+            for step in steps:
+                members = [(name, placement[index]) for name, index in encoder._numeric if placement[index][0] is step]
+                if members:
+                    self._numeric.append((step, [name for name, _ in members],
+                                          np.array([place[1] for _, place in members]),
+                                          np.array([place[2] for _, place in members])))
+            self._lookups = []   # (source column, vocabulary, output positions, scaled table)
+            for name, index, table in encoder._lookups:
+                scaled = np.empty_like(table)
+                outputs = []
+                for offset in range(table.shape[1]):
+                    step, position, output = placement[index + offset]
+                    scaled[:, offset] = _scale_block(step, arrays, table[:, offset:offset + 1].copy(),
+                                                     slice(position, position + 1))[:, 0]
+                    outputs.append(output)
+                self._lookups.append((name, list(encoder.category_values[name]), np.array(outputs), scaled))
+        except Exception as e:
+            raise MyException(e, sys)
+
+    @staticmethod
+    def _codes(name: str, vocabulary: list, values) -> np.ndarray:
+        values = np.asarray(values).reshape(-1)
+        codes = np.full(values.shape, -1, dtype=np.intp)
+        for code, category in enumerate(vocabulary):
+            codes[values == category] = code
+        if (codes < 0).any():
+            raise ValueError(f"Column {name} has values outside {vocabulary}")
+        return codes
+
+    def invalid_records(self, records) -> np.ndarray:
+        """
+        Returns why each record cannot be scored: its first source column that is missing,
+        not numeric or outside the vocabulary, or "" when the record can be scored.
+        """
+        try:
+            reasons = None
+            checks = [(name, pd.to_numeric(pd.Series(np.asarray(records[name]).reshape(-1)), errors="coerce").isna().to_numpy(),
+                       "is missing or not numeric")
+                      for _, names, _, _ in self._numeric for name in names]
+            checks += [(name, ~pd.Series(np.asarray(records[name]).reshape(-1)).isin(vocabulary).to_numpy(),
+                        f"is not one of {vocabulary}")
+                       for name, vocabulary, _, _ in self._lookups]
+            for name, invalid, problem in checks:
+                if reasons is None:
+                    reasons = np.full(len(invalid), "", dtype=object)
+                reasons[invalid & (reasons == "")] = f"{name} {problem}"
+            return reasons
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def transform(self, records) -> np.ndarray:
+        """
+        Encodes and scales raw records into the model's float32 feature matrix.
+
+        Args:
+            records: A dict mapping every source column to a scalar (one record) or to a
+                sequence of values, or a NumPy structured array with those fields.
+        Returns:
+            np.ndarray: Feature matrix of shape (rows, n_features).
+        """
+        try:
+            out = None
+            for step, names, positions, outputs in self._numeric:
+                block = np.column_stack([np.asarray(records[name], dtype=np.float32).reshape(-1) for name in names])
+                if out is None:
+                    out = np.empty((len(block), self.n_features), dtype=np.float32)
+                out[:, outputs] = _scale_block(step, self._arrays, block, positions)
+            for name, vocabulary, outputs, table in self._lookups:
+                codes = self._codes(name, vocabulary, records[name])
+                if out is None:
+                    out = np.empty((len(codes), self.n_features), dtype=np.float32)
+                out[:, outputs] = table[codes]
+            return out
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def predict_proba_features(self, features: np.ndarray) -> np.ndarray:
+        """
+        Returns class probabilities of preprocessed features, shape (rows, classes).
+        """
+        if self.compiled is not None and len(features) <= self.compiled_max_rows:
+            return self.compiled.predict_proba(features)
+        return self.estimator.predict_proba(features)
+
+    def score(self, records) -> tuple:
+        """
+        Returns (predictions, positive-class probabilities) of raw records in one pass.
+        """
+        try:
+            proba = self.predict_proba_features(self.transform(records))
+            return decide(self.classes_, proba, self.decision_threshold), proba[:, 1]
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def predict_proba(self, records) -> np.ndarray:
+        """
+        Returns the probability of a positive response for raw records.
+        """
+        try:
+            return self.predict_proba_features(self.transform(records))[:, 1]
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def predict(self, records) -> np.ndarray:
+        """
+        Predicts the response of raw records.
+        """
+        try:
+            proba = self.predict_proba_features(self.transform(records))
+            return decide(self.classes_, proba, self.decision_threshold)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def __repr__(self):
+        return f"VehicleInsuranceModel({self.model!r})"
@@ -0,0 +1,384 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from pandas import DataFrame
+
+from src.cloud_storage.aws_storage import SimpleStorageService
+from src.constants import (MODEL_CACHE_DIR, MODEL_CACHE_MAX_BYTES, MODEL_CACHE_REFRESH_SECONDS, MODEL_PACKAGE_ARRAYS_FILE_NAME,
+                           MODEL_PUSHER_POINTER_NAME, MODEL_PUSHER_VERSIONS_DIR_NAME, MODEL_PUSHER_CHUNKS_DIR_NAME,
+                           MODEL_PUSHER_VERSION_MANIFEST_FILE_NAME, S3_MAX_CONCURRENCY)
+from src.entity.estimator import load_model_package
+from src.exception import MyException
+from src.logger import logging
+from src.utils.main_utils import load_object
+from src.utils.stage_cache import hash_file
+
+
+def registry_pointer_key(registry: str) -> str:
+    return f"{registry}/{MODEL_PUSHER_POINTER_NAME}"
+
+
+def registry_version_key(registry: str, version: str) -> str:
+    return f"{registry}/{MODEL_PUSHER_VERSIONS_DIR_NAME}/{version}/{MODEL_PUSHER_VERSION_MANIFEST_FILE_NAME}"
+
+
+def registry_chunk_key(registry: str, sha256: str) -> str:
+    return f"{registry}/{MODEL_PUSHER_CHUNKS_DIR_NAME}/{sha256}"
+
+
+def content_digest(files: list) -> str:
+    """
+    Identifies a model by its files: the sha256 of their (name, sha256) pairs, in order.
+    """
+    digest = hashlib.sha256()
+    for name, sha256 in files:
+        digest.update(f"{name}:{sha256}\n".encode())
+    return digest.hexdigest()
+
+
+def download_registry_files(s3: SimpleStorageService, bucket_name: str, registry: str, files: list, directory: str) -> None:
+    """
+    Assembles files of a registry version in `directory` from their chunks, fetched concurrently
+    and written at their offsets, and checks every chunk and file against its sha256.
+    """
+    os.makedirs(directory, exist_ok=True)
+    descriptors, tasks = {}, []
+    try:
+        for file in files:
+            path = os.path.join(directory, file["name"])
+            with open(path, "wb") as handle:
+                handle.truncate(file["size"])
+            descriptors[file["name"]] = os.open(path, os.O_WRONLY)
+            offset = 0
+            for chunk in file["chunks"]:
+                tasks.append((file["name"], offset, chunk))
+                offset += chunk["size"]
+
+        def download_chunk(task: tuple) -> None:
+            name, offset, chunk = task
+            body = s3.s3_client.get_object(Bucket=bucket_name, Key=registry_chunk_key(registry, chunk["sha256"]))["Body"].read()
+            if len(body) != chunk["size"] or hashlib.sha256(body).hexdigest() != chunk["sha256"]:
+                raise ValueError(f"Chunk {chunk['sha256']} of {name} is corrupt")
+            os.pwrite(descriptors[name], body, offset)
+
+        with ThreadPoolExecutor(max_workers=S3_MAX_CONCURRENCY) as executor:
+            list(executor.map(download_chunk, tasks))
+    finally:
+        for descriptor in descriptors.values():
+            os.close(descriptor)
+    for file in files:
+        if hash_file(os.path.join(directory, file["name"])) != file["sha256"]:
+            raise ValueError(f"{file['name']} does not match its sha256")
+
+
+class S3Estimator:
+    """
+    Serves predictions with the model stored at s3://bucket_name/model_path.
+
+    model_path is a dill model.pkl, the manifest.json of a model package (whose arrays.bin
+    sits next to it), or a model registry written by ModelPusher, whose LATEST pointer names
+    the version to serve. Downloaded models are kept in an on-disk cache shared by every
+    process on the host:
+
+    - objects/<sha256>/ holds the files of one model, named after the hash of their content,
+      so the same model pushed under several keys is stored once;
+    - refs/<hash of the key>.json maps the S3 key to its cache entry and the ETags it was
+      downloaded with.
+
+    Loading a model whose key has a ref never touches the network. Whether the registry
+    holds a newer model is checked with HEAD requests by `refresh`, on demand or from the
+    background refresher, which swaps the new model in once it is loaded. A registry
+    version still in the cache, e.g. after a rollback, is swapped in without downloading.
+    Entries are evicted least recently used first when the cache outgrows max_cache_bytes.
+    """
+
+    def __init__(self, bucket_name: str, model_path: str, cache_dir: str = MODEL_CACHE_DIR,
+                 max_cache_bytes: int = MODEL_CACHE_MAX_BYTES, refresh_seconds: float = MODEL_CACHE_REFRESH_SECONDS):
+        self.bucket_name = bucket_name
+        self.model_path = model_path
+        self.is_registry = not model_path.endswith((".json", ".pkl"))
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.refresh_seconds = refresh_seconds
+        # (cache entry, model) published together so that readers never pair an entry with another model
+        self.loaded: tuple = (None, None)
+        self._s3 = None
+        self._lock = threading.Lock()
+        self._stop_refresher = threading.Event()
+        self._refresher = None
+
+    @property
+    def loaded_entry(self) -> Optional[str]:
+        return self.loaded[0]
+
+    @property
+    def loaded_model(self) -> object:
+        return self.loaded[1]
+
+    @property
+    def s3(self) -> SimpleStorageService:
+        # created on first use so that a process serving from the cache needs no credentials
+        if self._s3 is None:
+            self._s3 = SimpleStorageService()
+        return self._s3
+
+    def is_model_present(self, model_path: str) -> bool:
+        try:
+            if self.is_registry:
+                model_path = registry_pointer_key(model_path)
+            return self.s3.s3_key_path_available(bucket_name=self.bucket_name, s3_key=model_path)
+        except MyException as e:
+            logging.info(e)
+            return False
+
+    def _remote_keys(self) -> list:
+        keys = [self.model_path]
+        if self.model_path.endswith(".json"):
+            keys.append(f"{os.path.dirname(self.model_path)}/{MODEL_PACKAGE_ARRAYS_FILE_NAME}")
+        return keys
+
+    def _key_digest(self, *parts) -> str:
+        return hashlib.sha256(json.dumps([self.bucket_name, *parts]).encode()).hexdigest()[:32]
+
+    def _ref_path(self) -> str:
+        return os.path.join(self.cache_dir, "refs", f"{self._key_digest(self.model_path)}.json")
+
+    def _entry_dir(self, entry: str) -> str:
+        return os.path.join(self.cache_dir, "objects", entry)
+
+    def _entry_model_path(self, entry: str) -> str:
+        # an entry holds a package (a .json manifest and its arrays) or a single pickle
+        names = sorted(os.listdir(self._entry_dir(entry)))
+        manifests = [name for name in names if name.endswith(".json")]
+        return os.path.join(self._entry_dir(entry), (manifests or names)[0])
+
+    def _read_ref(self) -> Optional[dict]:
+        ref_path = self._ref_path()
+        if not os.path.exists(ref_path):
+            return None
+        with open(ref_path) as file:
+            ref = json.load(file)
+        return ref if os.path.isdir(self._entry_dir(ref["entry"])) else None
+
+    def _touch(self, entry: str) -> bool:
+        # marks the entry as recently used; False when another process has just evicted it
+        try:
+            os.utime(self._entry_dir(entry))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _write_ref(self, ref: dict) -> None:
+        ref_path = self._ref_path()
+        os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+        temporary_path = f"{ref_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(ref, file)
+        os.replace(temporary_path, ref_path)
+
+    def _store_entry(self, incoming_dir: str, entry: str) -> None:
+        entry_dir = self._entry_dir(entry)
+        if os.path.exists(entry_dir):
+            shutil.rmtree(incoming_dir, ignore_errors=True)
+            return
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        try:
+            os.rename(incoming_dir, entry_dir)
+        except OSError:
+            # another process stored the same content first
+            shutil.rmtree(incoming_dir, ignore_errors=True)
+
+    def _get_json(self, s3_key: str) -> tuple:
+        response = self.s3.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)
+        return json.loads(response["Body"].read()), response["ETag"]
+
+    def _fetch_registry(self, ref: Optional[dict]) -> str:
+        pointer_key = registry_pointer_key(self.model_path)
+        head = self.s3.head_object(self.bucket_name, pointer_key)
+        if head is None:
+            raise FileNotFoundError(f"s3://{self.bucket_name}/{pointer_key} does not exist")
+        if ref is not None and ref["etags"] == {pointer_key: head["ETag"]} and self._touch(ref["entry"]):
+            return ref["entry"]
+        pointer, pointer_etag = self._get_json(pointer_key)
+        version, _ = self._get_json(registry_version_key(self.model_path, pointer["version"]))
+        entry = version["digest"]
+        if not os.path.isdir(self._entry_dir(entry)):
+            incoming_dir = os.path.join(self.cache_dir, "incoming", self._key_digest(self.model_path, entry))
+            download_registry_files(self.s3, self.bucket_name, self.model_path, version["files"], incoming_dir)
+            self._store_entry(incoming_dir, entry)
+            logging.info(f"Cached version {pointer['version']} of s3://{self.bucket_name}/{self.model_path} as {entry}")
+        self._write_ref({"bucket": self.bucket_name, "key": self.model_path, "etags": {pointer_key: pointer_etag},
+                         "entry": entry, "version": pointer["version"]})
+        self.evict(keep=entry)
+        return entry
+
+    def fetch(self, check_remote: bool = False) -> str:
+        """
+        Returns the cache entry holding the model, downloading it when it is not cached or,
+        with check_remote, when the ETags in the registry differ from the cached ones.
+        """
+        try:
+            ref = self._read_ref()
+            if ref is not None and not self._touch(ref["entry"]):
+                ref = None
+            if ref is not None and not check_remote:
+                return ref["entry"]
+            if self.is_registry:
+                return self._fetch_registry(ref)
+
+            etags = {}
+            for key in self._remote_keys():
+                head = self.s3.head_object(self.bucket_name, key)
+                if head is None:
+                    raise FileNotFoundError(f"s3://{self.bucket_name}/{key} does not exist")
+                etags[key] = head["ETag"]
+            if ref is not None and ref["etags"] == etags and self._touch(ref["entry"]):
+                return ref["entry"]
+
+            # the download directory is named after the ETags so that an interrupted download resumes
+            incoming_dir = os.path.join(self.cache_dir, "incoming", self._key_digest(self.model_path, etags))
+            files = []
+            for key in self._remote_keys():
+                local_path = os.path.join(incoming_dir, os.path.basename(key))
+                self.s3.download_file(self.bucket_name, key, local_path)
+                files.append((os.path.basename(key), hash_file(local_path)))
+            entry = content_digest(files)
+            self._store_entry(incoming_dir, entry)
+            self._write_ref({"bucket": self.bucket_name, "key": self.model_path, "etags": etags, "entry": entry})
+            logging.info(f"Cached s3://{self.bucket_name}/{self.model_path} as {entry}")
+            self.evict(keep=entry)
+            return entry
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """
+        Removes the least recently used entries until the cache fits in max_cache_bytes.
+        The entry being fetched and the one currently loaded are kept. The cache is shared
+        by every process on the host, so entries another process removes meanwhile are skipped.
+        """
+        try:
+            objects_dir = os.path.join(self.cache_dir, "objects")
+            entries = []
+            for entry in os.listdir(objects_dir) if os.path.isdir(objects_dir) else []:
+                entry_dir = os.path.join(objects_dir, entry)
+                try:
+                    size = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+                    entries.append((os.path.getmtime(entry_dir), size, entry))
+                except FileNotFoundError:
+                    continue
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry in sorted(entries):
+                if total <= self.max_cache_bytes:
+                    break
+                if entry in (keep, self.loaded_entry):
+                    continue
+                # a process still mapping the files keeps reading them after the unlink
+                shutil.rmtree(os.path.join(objects_dir, entry), ignore_errors=True)
+                total -= size
+                logging.info(f"Evicted model cache entry {entry} ({size} bytes)")
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def _load_entry(self, entry: str) -> object:
+        model_file_path = self._entry_model_path(entry)
+        if model_file_path.endswith(".json"):
+            return load_model_package(model_file_path)
+        return load_object(model_file_path)
+
+    def _load_fetched(self, entry: str, check_remote: bool = False) -> tuple:
+        try:
+            return entry, self._load_entry(entry)
+        except Exception:
+            if os.path.isdir(self._entry_dir(entry)):
+                raise
+            # evicted by another process between the fetch and the load: its ref no longer
+            # resolves, so fetching again downloads it
+            logging.info(f"Model cache entry {entry} was evicted before it was loaded, fetching it again")
+            entry = self.fetch(check_remote)
+            return entry, self._load_entry(entry)
+
+    def load_model(self) -> object:
+        """
+        Returns the loaded model, loading it from the cache (or the registry) on first use.
+        """
+        try:
+            if self.loaded_model is None:
+                with self._lock:
+                    if self.loaded_model is None:
+                        self.loaded = self._load_fetched(self.fetch())
+            return self.loaded_model
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def refresh(self) -> bool:
+        """
+        Checks the registry and swaps in the model pushed since the last load.
+        The new model is fully loaded before the swap, and predictions already running keep
+        the model they started with. Returns whether the model changed.
+        """
+        try:
+            with self._lock:
+                entry = self.fetch(check_remote=True)
+                if entry == self.loaded_entry:
+                    return False
+                self.loaded = self._load_fetched(entry, check_remote=True)
+                entry = self.loaded_entry
+            logging.info(f"Swapped in model {entry} from s3://{self.bucket_name}/{self.model_path}")
+            return True
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def _refresh_loop(self) -> None:
+        while not self._stop_refresher.wait(self.refresh_seconds):
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.error(f"Model refresh failed, keeping the current model: {e}")
+
+    def start_refresher(self) -> None:
+        """
+        Starts a daemon thread calling `refresh` every refresh_seconds.
+        """
+        if self._refresher is None:
+            self._stop_refresher.clear()
+            self._refresher = threading.Thread(target=self._refresh_loop, name="model-refresher", daemon=True)
+            self._refresher.start()
+
+    def stop_refresher(self) -> None:
+        if self._refresher is not None:
+            self._stop_refresher.set()
+            self._refresher.join()
+            self._refresher = None
+
+    def save_model(self, from_file: str, remove: bool = False) -> None:
+        """
+        Uploads a model.pkl, or a package manifest with its arrays, to model_path.
+        remove deletes the local files once uploaded.
+        """
+        try:
+            if self.is_registry:
+                raise ValueError("Models are published to a registry by ModelPusher")
+            local_paths = [from_file]
+            if from_file.endswith(".json"):
+                local_paths.append(os.path.join(os.path.dirname(from_file), MODEL_PACKAGE_ARRAYS_FILE_NAME))
+            # the manifest goes last so that a reader never sees it before its arrays
+            for local_path, key in reversed(list(zip(local_paths, self._remote_keys()))):
+                self.s3.upload_file(local_path, self.bucket_name, key)
+            if remove:
+                for local_path in local_paths:
+                    os.remove(local_path)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def predict(self, dataframe: DataFrame):
+        try:
+            return self.load_model().predict(dataframe=dataframe)
+        except Exception as e:
+            raise MyException(e, sys)
@@ -0,0 +1,153 @@
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.exception import MyException
+from src.logger import logging
+
+
+@dataclass
+class Stage:
+    '''A node of the pipeline graph.
+    The stage runs `func` with the artifacts named in `inputs` as keyword arguments
+    and publishes its return value as the artifact named `output`.'''
+
+    name: str
+    func: Callable[..., object]
+    inputs: Tuple[str, ...] = ()
+    output: Optional[str] = None
+
+
+@dataclass
+class StageResult:
+    '''Outcome of one stage: status is "done", "failed" or "skipped" (an upstream stage failed).'''
+
+    name: str
+    status: str
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class DagRunResult:
+    '''Artifacts published by the run and the result of every selected stage.'''
+
+    artifacts: Dict[str, object] = field(default_factory=dict)
+    stages: Dict[str, StageResult] = field(default_factory=dict)
+
+    @property
+    def succeeded(self) -> bool:
+        return all(result.status == "done" for result in self.stages.values())
+
+
+class DagRunner:
+    '''
+    Runs pipeline stages as a dependency graph.
+
+    A stage becomes ready once every artifact it consumes has been published; ready
+    stages run concurrently on a thread pool and share the published artifacts without
+    copying them; stages that need more cores start their own worker pools. A failing
+    stage does not stop independent branches: only the stages downstream of it are skipped.
+    '''
+
+    def __init__(self, stages: Iterable[Stage], max_workers: int = 4):
+        try:
+            self.stages = {stage.name: stage for stage in stages}
+            self.max_workers = max_workers
+            self.producers = {}
+            for stage in self.stages.values():
+                if stage.output is not None:
+                    if stage.output in self.producers:
+                        raise ValueError(f"Artifact {stage.output} is produced by both {self.producers[stage.output]} and {stage.name}")
+                    self.producers[stage.output] = stage.name
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def _upstream(self, stage: Stage, provided: Dict[str, object]) -> List[str]:
+        return [self.producers[name] for name in stage.inputs if name not in provided]
+
+    def select(self, targets: Optional[List[str]] = None, provided: Optional[Dict[str, object]] = None) -> List[str]:
+        '''
+        Returns the stages needed to run `targets` (every stage when None), in topological order.
+        Artifacts in `provided` are not recomputed, which cuts the graph above them.
+        '''
+        try:
+            provided = provided or {}
+            for name in targets or []:
+                if name not in self.stages:
+                    raise ValueError(f"Unknown stage: {name}")
+            order, state = [], {}
+
+            def visit(name: str):
+                if state.get(name) == "done":
+                    return
+                if state.get(name) == "visiting":
+                    raise ValueError(f"Cycle in pipeline graph at stage {name}")
+                state[name] = "visiting"
+                stage = self.stages[name]
+                for artifact in stage.inputs:
+                    if artifact not in provided and artifact not in self.producers:
+                        raise ValueError(f"Stage {name} needs artifact {artifact} which no stage produces")
+                for upstream in self._upstream(stage, provided):
+                    visit(upstream)
+                state[name] = "done"
+                order.append(name)
+
+            for name in targets or list(self.stages):
+                visit(name)
+            return order
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def run(self, targets: Optional[List[str]] = None, provided: Optional[Dict[str, object]] = None) -> DagRunResult:
+        '''
+        Runs the selected subgraph.
+        Args:
+            targets (Optional[List[str]]): Stages to run together with their upstream stages. All stages when None.
+            provided (Optional[Dict[str, object]]): Artifacts that are already available.
+        Returns:
+            DagRunResult: Published artifacts and per-stage status and timing.
+        '''
+        try:
+            provided = dict(provided or {})
+            order = self.select(targets, provided)
+            result = DagRunResult(artifacts=provided)
+            pending = set(order)
+            running = {}
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while pending or running:
+                    for name in [name for name in order if name in pending]:
+                        stage = self.stages[name]
+                        upstream = self._upstream(stage, provided)
+                        if any(result.stages.get(parent) and result.stages[parent].status != "done" for parent in upstream):
+                            pending.discard(name)
+                            result.stages[name] = StageResult(name, "skipped")
+                            logging.info(f"Stage {name} skipped, an upstream stage did not complete")
+                        elif all(parent in result.stages for parent in upstream):
+                            pending.discard(name)
+                            kwargs = {artifact: result.artifacts[artifact] for artifact in stage.inputs}
+                            logging.info(f"Stage {name} started")
+                            running[executor.submit(stage.func, **kwargs)] = (name, time.perf_counter())
+                    if not running:
+                        continue
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name, started = running.pop(future)
+                        seconds = time.perf_counter() - started
+                        try:
+                            value = future.result()
+                        except Exception as error:
+                            result.stages[name] = StageResult(name, "failed", seconds, str(error))
+                            logging.error(f"Stage {name} failed after {seconds:.2f}s: {error}")
+                            continue
+                        if self.stages[name].output is not None:
+                            result.artifacts[self.stages[name].output] = value
+                        result.stages[name] = StageResult(name, "done", seconds)
+                        logging.info(f"Stage {name} completed in {seconds:.2f}s")
+            summary = ", ".join(f"{name}={result.stages[name].status} ({result.stages[name].seconds:.2f}s)" for name in order)
+            logging.info(f"Pipeline graph finished: {summary}")
+            return result
+        except Exception as e:
+            raise MyException(e, sys)
@@ -0,0 +1,364 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.constants import TARGET_COLUMN
+from src.configuration.mongo_db_connection import MongoDBConnection
+from src.data_access.proj1_data import Proj1Data
+from src.entity.artifact_entity import BatchPredictionArtifact
+from src.entity.config_entity import BatchPredictionConfig
+from src.entity.estimator import VehicleInsuranceModel, load_model_package
+from src.entity.s3_estimator import S3Estimator
+from src.exception import MyException
+from src.logger import logging
+from src.utils.main_utils import count_rows, iter_dataframe_chunks, load_object
+
+# record keys carried from the input to the predictions, never passed to the model
+KEY_COLUMNS = ["_id", "id"]
+
+# Per-process state of the scoring workers, set once by _init_prediction_worker
+_PREDICTION_MODEL = {}
+
+
+def _s3_estimator(model_file_path: str) -> S3Estimator:
+    bucket_name, _, model_path = model_file_path[len("s3://"):].partition("/")
+    return S3Estimator(bucket_name=bucket_name, model_path=model_path)
+
+
+def load_prediction_model(model_file_path: str) -> VehicleInsuranceModel:
+    """
+    Loads a dill model.pkl or, for a .json path, a memory-mapped model package.
+    An s3://bucket/key path is read through the local model cache.
+    """
+    if model_file_path.startswith("s3://"):
+        return VehicleInsuranceModel(_s3_estimator(model_file_path).load_model())
+    if model_file_path.endswith(".json"):
+        return VehicleInsuranceModel(load_model_package(model_file_path))
+    return VehicleInsuranceModel(load_object(model_file_path))
+
+
+def _init_prediction_worker(model_file_path: str, refresh_seconds: Optional[float] = None) -> None:
+    if model_file_path.startswith("s3://") and refresh_seconds:
+        # the registry is polled in the background; _score_chunk picks up the swapped model
+        estimator = _s3_estimator(model_file_path)
+        estimator.refresh_seconds = refresh_seconds
+        estimator.load_model()
+        estimator.start_refresher()
+        entry, model = estimator.loaded
+        _PREDICTION_MODEL["estimator"] = estimator
+        _PREDICTION_MODEL["entry"], _PREDICTION_MODEL["model"] = entry, VehicleInsuranceModel(model)
+    else:
+        _PREDICTION_MODEL["model"] = load_prediction_model(model_file_path)
+
+
+def _score_chunk(records, reject_invalid: bool = False) -> tuple:
+    """
+    Worker entry point: returns the predictions and positive-class probabilities of a
+    chunk (a DataFrame or a dict of columns).
+    With reject_invalid, records that cannot be scored are left out instead of failing the
+    chunk, and (predictions, probabilities, scored mask, rejected records with a "reason"
+    column) is returned for a DataFrame chunk.
+    """
+    estimator = _PREDICTION_MODEL.get("estimator")
+    if estimator is not None:
+        # one read of the published (entry, model) pair, which the refresher thread replaces
+        entry, model = estimator.loaded
+        if entry != _PREDICTION_MODEL["entry"]:
+            _PREDICTION_MODEL["model"], _PREDICTION_MODEL["entry"] = VehicleInsuranceModel(model), entry
+    model = _PREDICTION_MODEL["model"]
+    if not reject_invalid:
+        return model.score(records)
+    reasons = model.invalid_records(records)
+    valid = reasons == ""
+    if valid.all():
+        return (*model.score(records), valid, records.iloc[:0].assign(reason=""))
+    if valid.any():
+        predictions, probabilities = model.score(records[valid])
+    else:
+        predictions, probabilities = np.empty(0, dtype=model.classes_.dtype), np.empty(0)
+    return predictions, probabilities, valid, records[~valid].assign(reason=reasons[~valid])
+
+
+def prediction_executor(model_file_path: str, workers: int, refresh_seconds: Optional[float] = None) -> Executor:
+    """
+    Returns the pool scoring requests: `workers` processes that each load the model once,
+    or with 0 workers one thread of the calling process scoring with a model loaded here.
+    With refresh_seconds, a model read from s3:// is replaced when a new one is pushed.
+    """
+    if workers:
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_prediction_worker, initargs=(model_file_path, refresh_seconds))
+    _init_prediction_worker(model_file_path, refresh_seconds)
+    return ThreadPoolExecutor(max_workers=1)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-record requests into micro-batches scored on an executor.
+
+    Requests are queued; a batch is closed when it holds `max_batch_size` records or
+    `max_wait_seconds` after its first record arrived, and is scored off the event loop
+    as one vectorised call. Up to `max_concurrent_batches` batches are scored at a time,
+    so a batch fills while the previous ones are being scored.
+    """
+
+    def __init__(self, executor: Executor, max_batch_size: int, max_wait_seconds: float, max_concurrent_batches: int = 1):
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.max_concurrent_batches = max_concurrent_batches
+        self._queue: Optional[asyncio.Queue] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._scoring = set()
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._runner = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, *self._scoring, return_exceptions=True)
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.cancel()
+
+    async def submit(self, record: dict) -> tuple:
+        """
+        Scores one record and returns its (prediction, probability).
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, future))
+        return await future
+
+    async def score(self, columns: dict) -> tuple:
+        """
+        Scores a batch given as columns directly on the executor, returning (predictions, probabilities).
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.executor, _score_chunk, columns)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_seconds
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._slots.acquire()
+            task = asyncio.create_task(self._score_batch(batch))
+            self._scoring.add(task)
+            task.add_done_callback(self._scoring.discard)
+
+    async def _score_batch(self, batch: list) -> None:
+        try:
+            columns = {name: [record[name] for record, _ in batch] for name in batch[0][0]}
+            predictions, probabilities = await self.score(columns)
+            for (_, future), prediction, probability in zip(batch, predictions.tolist(), probabilities.tolist()):
+                if not future.done():
+                    future.set_result((prediction, probability))
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+        finally:
+            self._slots.release()
+
+
+class BatchPrediction:
+    """
+    Scores a whole collection or file of vehicle records.
+
+    The input is streamed in chunks and the chunks are scored on a process pool whose
+    workers each load the model once. Only a fixed number of chunks are read ahead of
+    the writer, so memory stays bounded by the chunk size whatever the input size.
+    Predictions are written in input order, either upserted into a MongoDB collection
+    (keyed by the input document `_id`, so a rerun replaces the previous scores) or
+    appended to a Parquet file one row group per chunk.
+    """
+
+    def __init__(self, batch_prediction_config: BatchPredictionConfig = BatchPredictionConfig()):
+        self.batch_prediction_config = batch_prediction_config
+
+    def read_chunks(self) -> Iterator[pd.DataFrame]:
+        config = self.batch_prediction_config
+        if config.input_file_path:
+            return iter_dataframe_chunks(config.input_file_path, config.input_file_format, config.chunk_size)
+        return Proj1Data().export_collection_as_batches(config.input_collection_name, batch_size=config.chunk_size,
+                                                        projection={TARGET_COLUMN: 0})
+
+    def count_input_rows(self) -> int:
+        config = self.batch_prediction_config
+        if config.input_file_path:
+            return count_rows(config.input_file_path, config.input_file_format)
+        return Proj1Data().mongo_client.database[config.input_collection_name].estimated_document_count()
+
+    def _workers(self) -> int:
+        return self.batch_prediction_config.workers or os.cpu_count() or 1
+
+    def write_mongo(self, keys: pd.DataFrame, predictions: np.ndarray, probabilities: np.ndarray) -> None:
+        from pymongo import ReplaceOne
+        scored_at = datetime.now()
+        model = self.batch_prediction_config.model_file_path
+        documents = [{"prediction": prediction, "probability": probability, "model": model, "scored_at": scored_at}
+                     for prediction, probability in zip(predictions.tolist(), probabilities.tolist())]
+        if "id" in keys:
+            for document, record_id in zip(documents, keys["id"].tolist()):
+                document["id"] = record_id
+        if "_id" in keys:
+            self._output_collection.bulk_write([ReplaceOne({"_id": key}, document, upsert=True)
+                                                for key, document in zip(keys["_id"].tolist(), documents)], ordered=False)
+        else:
+            self._output_collection.insert_many(documents, ordered=False)
+
+    def write_parquet(self, keys: pd.DataFrame, predictions: np.ndarray, probabilities: np.ndarray) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        columns = {name: keys[name].astype(str) if name == "_id" else keys[name] for name in keys.columns}
+        table = pa.Table.from_pandas(pd.DataFrame({**columns, "prediction": predictions, "probability": probabilities}),
+                                     preserve_index=False)
+        if self._parquet_writer is None:
+            os.makedirs(os.path.dirname(self.batch_prediction_config.output_file_path), exist_ok=True)
+            self._parquet_writer = pq.ParquetWriter(self.batch_prediction_config.output_file_path, table.schema)
+        self._parquet_writer.write_table(table)
+
+    def write_rejects(self, keys: pd.DataFrame, rejected: pd.DataFrame) -> None:
+        """
+        Appends rejected records, as strings since their values may not match the schema, to the reject file.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(pd.concat([keys, rejected], axis=1).astype(str), preserve_index=False)
+        if self._reject_writer is None:
+            os.makedirs(os.path.dirname(self.batch_prediction_config.reject_file_path), exist_ok=True)
+            self._reject_writer = pq.ParquetWriter(self.batch_prediction_config.reject_file_path, table.schema)
+        self._reject_writer.write_table(table)
+
+    def initiate_batch_prediction(self) -> BatchPredictionArtifact:
+        """
+        Scores every input record and writes the predictions.
+        Returns:
+            BatchPredictionArtifact: Output location, row counts and throughput.
+        """
+        try:
+            config = self.batch_prediction_config
+            if config.output_collection_name:
+                self._output_collection = MongoDBConnection().database[config.output_collection_name]
+                write, output = self.write_mongo, config.output_collection_name
+            else:
+                self._parquet_writer = None
+                write, output = self.write_parquet, config.output_file_path
+            total_rows = self.count_input_rows()
+            workers = self._workers()
+            max_pending = workers * config.chunks_in_flight_per_worker
+            logging.info(f"Batch prediction of {total_rows} rows with {config.model_file_path} on {workers} workers, "
+                         f"{config.chunk_size} rows per chunk, writing to {output}")
+
+            self._reject_writer = None
+            started = time.perf_counter()
+            state = {"rows": 0, "positive_rows": 0, "rejected_rows": 0, "next": 0}
+            keys, scored, running = {}, {}, {}
+
+            def write_ready():
+                # chunks are written in input order as soon as all earlier chunks are written
+                while state["next"] in scored:
+                    predictions, probabilities, valid, rejected = scored.pop(state["next"])
+                    chunk_keys = keys.pop(state["next"])
+                    if len(predictions):
+                        write(chunk_keys[valid], predictions, probabilities)
+                    if len(rejected):
+                        logging.warning(f"Skipped {len(rejected)} records of chunk {state['next']} that cannot be scored: "
+                                        f"{rejected['reason'].value_counts().to_dict()}")
+                        if config.reject_file_path:
+                            self.write_rejects(chunk_keys[~valid].reset_index(drop=True), rejected.reset_index(drop=True))
+                    state["next"] += 1
+                    state["rows"] += len(predictions)
+                    state["rejected_rows"] += len(rejected)
+                    state["positive_rows"] += int(np.count_nonzero(predictions == 1))
+                    elapsed = time.perf_counter() - started
+                    rate = state["rows"] / elapsed if elapsed else 0.0
+                    remaining = f", {(total_rows - state['rows']) / rate:.0f}s left" if rate and total_rows > state["rows"] else ""
+                    logging.info(f"Scored {state['rows']}/{total_rows} rows, {rate:.0f} rows/s{remaining}")
+
+            def collect(block: bool):
+                done, _ = wait(running, return_when=FIRST_COMPLETED) if block else (list(running), None)
+                for future in done:
+                    scored[running.pop(future)] = future.result()
+                write_ready()
+
+            executor = None
+            if workers > 1:
+                executor = prediction_executor(config.model_file_path, workers)
+            else:
+                _init_prediction_worker(config.model_file_path)
+            try:
+                for sequence, chunk in enumerate(self.read_chunks()):
+                    key_columns = [name for name in KEY_COLUMNS if name in chunk.columns]
+                    keys[sequence] = chunk[key_columns]
+                    features = chunk.drop(columns=key_columns + ([TARGET_COLUMN] if TARGET_COLUMN in chunk.columns else []))
+                    if executor is None:
+                        scored[sequence] = _score_chunk(features, reject_invalid=True)
+                        write_ready()
+                        continue
+                    running[executor.submit(_score_chunk, features, True)] = sequence
+                    while len(running) + len(scored) >= max_pending:
+                        collect(block=True)
+                while running:
+                    collect(block=True)
+            finally:
+                if executor is not None:
+                    executor.shutdown(cancel_futures=True)
+                if getattr(self, "_parquet_writer", None) is not None:
+                    self._parquet_writer.close()
+                if self._reject_writer is not None:
+                    self._reject_writer.close()
+
+            seconds = time.perf_counter() - started
+            artifact = BatchPredictionArtifact(output=output, rows=state["rows"], positive_rows=state["positive_rows"],
+                                               seconds=seconds, rows_per_second=state["rows"] / seconds if seconds else 0.0,
+                                               rejected_rows=state["rejected_rows"],
+                                               reject_output=config.reject_file_path if self._reject_writer is not None else None)
+            logging.info(f"Batch prediction artifact: {artifact}")
+            return artifact
+        except Exception as e:
+            raise MyException(e, sys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a MongoDB collection or a data file with the production model.")
+    parser.add_argument("--model", default=None, help="model.pkl, model package manifest.json, s3://bucket/key or the registry")
+    parser.add_argument("--input-file", default=None, help="score this file instead of the MongoDB collection")
+    parser.add_argument("--input-format", default=None, help="parquet, feather or csv")
+    parser.add_argument("--input-collection", default=None)
+    parser.add_argument("--output-collection", default=None, help="upsert predictions into this collection")
+    parser.add_argument("--output-file", default=None, help="Parquet file written when no output collection is given")
+    parser.add_argument("--reject-file", default=None, help="Parquet file receiving the records that cannot be scored")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    options = {name: value for name, value in {
+        "model_file_path": args.model, "input_file_path": args.input_file, "input_file_format": args.input_format,
+        "input_collection_name": args.input_collection, "output_collection_name": args.output_collection,
+        "output_file_path": args.output_file, "reject_file_path": args.reject_file, "chunk_size": args.chunk_size,
+        "workers": args.workers,
+    }.items() if value is not None}
+    print(BatchPrediction(BatchPredictionConfig(**options)).initiate_batch_prediction())
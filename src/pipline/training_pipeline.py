@@ -1,73 +1,352 @@
+import os
 import sys
+import inspect
+from functools import partial
+from typing import List, Optional
+from pandas import DataFrame
 from src.exception import MyException
 from src.components.data_ingestion import DataIngestion
-from src.entity.artifact_entity import DataIngestionArtifact,DataValidationArtifact,DataTransformationArtifact
+from src.entity.artifact_entity import (DataIngestionArtifact, DataValidationArtifact, DataTransformationArtifact, ModelTrainerArtifact,
+                                       ModelEvaluationArtifact, ModelPusherArtifact, DataProfileArtifact, FittedTransformationArtifact,
+                                       TransformedSplitArtifact)
 from src.components.data_validation import DataValidation
 from src.components.data_transformation import DataTransformation
-from src.entity.config_entity import DataIngestionConfig, DataValidationConfig,DataTransformationConfig
+from src.components.model_trainer import ModelTrainer
+from src.components.model_evaluation import ModelEvaluation
+from src.components.model_pusher import ModelPusher
+from src.entity.config_entity import DataIngestionConfig, DataValidationConfig,DataTransformationConfig,ModelTrainerConfig,ModelEvaluationConfig,ModelPusherConfig
+from src.entity import estimator
+from src.utils import main_utils, data_profile
+from src.utils.stage_cache import StageCache, hash_dataframe
+from src.pipline.dag import DagRunner, DagRunResult, Stage
+from src.constants import PIPELINE_MAX_WORKERS, MODEL_PACKAGE_ARRAYS_FILE_NAME
 from src.logger import logging
 
 class TrainingPipeline:
-    def __init__(self):
-       self.data_ingestion = DataIngestion() 
+    def __init__(self, full_refresh: bool = False, force_recompute: bool = False, max_workers: int = PIPELINE_MAX_WORKERS):
+       '''full_refresh: rebuild the shared feature store from a full export instead of fetching new documents only.
+       force_recompute: run every stage even when the stage cache holds outputs for the same inputs.
+       max_workers: number of independent stages run at the same time.'''
+       self.data_ingestion = DataIngestion(data_ingestion_config=DataIngestionConfig(full_refresh=full_refresh))
        self.data_validation = DataValidation(data_ingestion_artifact=DataIngestionArtifact,
-                                             data_validation_config=DataValidationConfig)
+                                             data_validation_config=DataValidationConfig())
        self.data_transformation=DataTransformation(data_validation_artifact=DataValidationArtifact,
                                                     data_ingestion_artifact=DataIngestionArtifact,
-                                                    data_transformation_config=DataTransformationConfig)
+                                                    data_transformation_config=DataTransformationConfig())
+       self.model_trainer_config = ModelTrainerConfig()
+       self.model_evaluation_config = ModelEvaluationConfig()
+       self.model_pusher_config = ModelPusherConfig()
+       self.stage_cache = StageCache(force_recompute=force_recompute)
+       self.max_workers = max_workers
        
 
-    def start_ingestion(self) -> DataIngestionArtifact:
+    def start_export(self) -> DataFrame:
         try:
-            logging.info("Starting data ingestion process")
+            logging.info("Starting data export")
             logging.info(f"Data ingestion config: {self.data_ingestion.data_ingestion_config}")
             logging.info("gettig the data from mongo db")
+            return self.data_ingestion.export_data()
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def start_feature_store_snapshot(self, dataframe: DataFrame) -> str:
+        try:
+            return self.data_ingestion.save_feature_store_snapshot(dataframe)
+        except Exception as e:
+            raise MyException(e, sys)
 
-            data_ingestion=DataIngestion(data_ingestion_config=self.data_ingestion.data_ingestion_config)
-            data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
+    def start_ingestion(self, dataframe: DataFrame) -> DataIngestionArtifact:
+        try:
+            logging.info("Starting data ingestion process")
+            data_ingestion_config = self.data_ingestion.data_ingestion_config
+
+            def split() -> DataIngestionArtifact:
+                self.data_ingestion.split_data_as_train_test(dataframe=dataframe)
+                return DataIngestionArtifact(trained_file_path=data_ingestion_config.training_file_path,
+                                             test_file_path=data_ingestion_config.testing_file_path,
+                                             file_format=data_ingestion_config.file_format,
+                                             profile_file_path=data_ingestion_config.profile_file_path,
+                                             schema_fingerprint=self.data_ingestion.schema_fingerprint())
+
+            # The Mongo delta is always fetched; the split is reused when the exported data did not change.
+            # It is keyed on the frame itself so that it does not wait for the snapshot file.
+            key = self.stage_cache.compute_key("data_ingestion_split",
+                                               input_files=[],
+                                               config={"train_test_split_ratio": data_ingestion_config.train_test_split_ratio,
+                                                       "file_format": data_ingestion_config.file_format,
+                                                       "histogram_bins": data_ingestion_config.histogram_bins},
+                                               code_files=[inspect.getfile(DataIngestion), inspect.getfile(data_profile), inspect.getfile(main_utils)],
+                                               extra={"data": hash_dataframe(dataframe)})
+            data_ingestion_artifact = self.stage_cache.run("data_ingestion_split", key,
+                                                           outputs={"train": data_ingestion_config.training_file_path,
+                                                                    "test": data_ingestion_config.testing_file_path,
+                                                                    "profile": data_ingestion_config.profile_file_path},
+                                                           compute=split, artifact_type=DataIngestionArtifact)
             logging.info("Data ingestion process completed successfully")
             return data_ingestion_artifact
         
         except Exception as e:
             raise MyException(e, sys) 
         
-    def start_validation(self, data_ingestion_artifact: DataIngestionArtifact) -> DataValidationArtifact:
+    def start_split_validation(self, data_ingestion_artifact: DataIngestionArtifact, split: str) -> DataProfileArtifact:
+        try:
+            logging.info(f"Profiling the {split} split")
+            data_validation = DataValidation(data_ingestion_artifact=data_ingestion_artifact,
+                                             data_validation_config=self.data_validation.data_validation_config)
+            config = data_validation.data_validation_config
+            # With trusted ingestion profiles the profile only depends on them, not on the split file
+            if data_validation.has_trusted_profiles():
+                input_files = [data_ingestion_artifact.profile_file_path]
+            else:
+                input_files = [{"train": data_ingestion_artifact.trained_file_path,
+                                "test": data_ingestion_artifact.test_file_path}[split]]
+            key = self.stage_cache.compute_key(f"data_validation_{split}",
+                                               input_files=input_files,
+                                               schema_section={name: data_validation.schema_config.get(name) for name in ("columns", "numeric_ranges", "category_values")},
+                                               config={"chunk_size": config.chunk_size, "histogram_bins": config.histogram_bins},
+                                               code_files=[inspect.getfile(DataValidation), inspect.getfile(data_profile), inspect.getfile(main_utils)],
+                                               extra={"split": split, "file_format": data_ingestion_artifact.file_format})
+            profile_file_path = config.train_profile_file_path if split == "train" else config.test_profile_file_path
+            return self.stage_cache.run(f"data_validation_{split}", key,
+                                        outputs={"profile": profile_file_path},
+                                        compute=lambda: data_validation.initiate_split_profile(split),
+                                        artifact_type=DataProfileArtifact)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def start_validation(self, data_ingestion_artifact: DataIngestionArtifact, train_profile_artifact: DataProfileArtifact,
+                         test_profile_artifact: DataProfileArtifact) -> DataValidationArtifact:
         try:
             logging.info("Starting data validation process")
             logging.info(f"Data validation config: {self.data_validation.data_validation_config}")
             data_validation = DataValidation(data_ingestion_artifact=data_ingestion_artifact,
                                              data_validation_config=self.data_validation.data_validation_config)
-            data_validation_artifact = data_validation.initiate_data_validation()
+            schema = data_validation.schema_config
+            # The report only depends on the two split profiles and on the previous run's profile,
+            # the baseline of the run-over-run drift scores
+            previous_profile = data_validation.data_validation_config.previous_profile_file_path
+            input_files = [train_profile_artifact.profile_file_path, test_profile_artifact.profile_file_path]
+            key = self.stage_cache.compute_key("data_validation",
+                                               input_files=input_files + ([previous_profile] if os.path.exists(previous_profile) else []),
+                                               schema_section={name: schema.get(name) for name in ("columns", "numeric_ranges", "category_values")},
+                                               config=data_validation.data_validation_config,
+                                               code_files=[inspect.getfile(DataValidation), inspect.getfile(data_profile), inspect.getfile(main_utils)])
+            data_validation_artifact = self.stage_cache.run("data_validation", key,
+                                                            outputs={"report": data_validation.data_validation_config.validation_report_file_path},
+                                                            compute=lambda: data_validation.initiate_data_validation(
+                                                                train_profile_artifact, test_profile_artifact),
+                                                            artifact_type=DataValidationArtifact)
             logging.info("Data validation process completed successfully")
             return data_validation_artifact
         
         except Exception as e:
             raise MyException(e, sys)
-        
-    def start_transformation(self, data_validation_artifact: DataValidationArtifact,data_ingestion_artifact: DataIngestionArtifact,data_transformation_config:DataTransformationConfig) -> DataTransformationArtifact:
+
+    def _transformation_key(self, stage: str, data_transformation: DataTransformation, input_files: List[str], **extra) -> str:
+        return self.stage_cache.compute_key(stage,
+                                            input_files=input_files,
+                                            schema_section=data_transformation._schema,
+                                            config=data_transformation.data_transformation_config,
+                                            code_files=[inspect.getfile(DataTransformation), inspect.getfile(estimator), inspect.getfile(main_utils)],
+                                            extra=extra)
+
+    def start_transformation_fit(self, data_validation_artifact: DataValidationArtifact,
+                                 data_ingestion_artifact: DataIngestionArtifact) -> FittedTransformationArtifact:
         try:
-            logging.info("Starting data transformation process")
+            logging.info("Fitting the data transformation")
             logging.info(f"Data transformation config: {self.data_transformation.data_transformation_config}")
+            data_transformation_config = self.data_transformation.data_transformation_config
             data_transformation = DataTransformation(data_validation_artifact=data_validation_artifact,
                                                      data_ingestion_artifact=data_ingestion_artifact,
                                                      data_transformation_config=data_transformation_config)
-            data_transformation_artifact = data_transformation.initalize_transformation()
+            key = self._transformation_key("data_transformation_fit", data_transformation,
+                                           [data_ingestion_artifact.trained_file_path],
+                                           validation_status=data_validation_artifact.validation_status,
+                                           file_format=data_ingestion_artifact.file_format)
+            return self.stage_cache.run("data_transformation_fit", key,
+                                        outputs={"preprocessing": data_transformation_config.transformed_object_file_path,
+                                                 "train_unresampled": data_transformation_config.transformed_file_path_train_unresampled,
+                                                 **({"validation": data_transformation_config.transformed_file_path_validation}
+                                                    if data_transformation_config.validation_split_ratio > 0 else {}),
+                                                 **({"binner": data_transformation_config.binner_object_file_path}
+                                                    if data_transformation_config.write_binned else {})},
+                                        compute=data_transformation.fit_transformation,
+                                        artifact_type=FittedTransformationArtifact)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def start_transformation_train(self, fitted_transformation_artifact: FittedTransformationArtifact) -> TransformedSplitArtifact:
+        try:
+            logging.info("Resampling and binning the training split")
+            data_transformation_config = self.data_transformation.data_transformation_config
+            data_transformation = DataTransformation(data_validation_artifact=None, data_ingestion_artifact=None,
+                                                     data_transformation_config=data_transformation_config)
+            key = self._transformation_key("data_transformation_train", data_transformation,
+                                           [fitted_transformation_artifact.unresampled_train_file_path]
+                                           + ([fitted_transformation_artifact.binner_object_file_path]
+                                              if fitted_transformation_artifact.binner_object_file_path else []))
+            return self.stage_cache.run("data_transformation_train", key,
+                                        outputs={"train": data_transformation_config.transformed_file_path_train,
+                                                 **({"binned_train": data_transformation_config.binned_file_path_train}
+                                                    if fitted_transformation_artifact.binner_object_file_path else {})},
+                                        compute=lambda: data_transformation.transform_train(fitted_transformation_artifact),
+                                        artifact_type=TransformedSplitArtifact)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def start_transformation_test(self, fitted_transformation_artifact: FittedTransformationArtifact,
+                                  data_ingestion_artifact: DataIngestionArtifact) -> TransformedSplitArtifact:
+        try:
+            logging.info("Transforming and binning the test split")
+            data_transformation_config = self.data_transformation.data_transformation_config
+            data_transformation = DataTransformation(data_validation_artifact=None, data_ingestion_artifact=data_ingestion_artifact,
+                                                     data_transformation_config=data_transformation_config)
+            key = self._transformation_key("data_transformation_test", data_transformation,
+                                           [data_ingestion_artifact.test_file_path, fitted_transformation_artifact.preprocessing_object_file_path]
+                                           + ([fitted_transformation_artifact.binner_object_file_path]
+                                              if fitted_transformation_artifact.binner_object_file_path else []),
+                                           file_format=data_ingestion_artifact.file_format)
+            return self.stage_cache.run("data_transformation_test", key,
+                                        outputs={"test": data_transformation_config.transformed_file_path_test,
+                                                 **({"binned_test": data_transformation_config.binned_file_path_test}
+                                                    if fitted_transformation_artifact.binner_object_file_path else {})},
+                                        compute=lambda: data_transformation.transform_test(fitted_transformation_artifact),
+                                        artifact_type=TransformedSplitArtifact)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def start_transformation(self, fitted_transformation_artifact: FittedTransformationArtifact,
+                             train_transformation_artifact: TransformedSplitArtifact,
+                             test_transformation_artifact: TransformedSplitArtifact) -> DataTransformationArtifact:
+        try:
+            # Not cached: it only joins the outputs of the cached fit, train and test stages
+            data_transformation_artifact = DataTransformation.join_transformation(
+                fitted_transformation_artifact, train_transformation_artifact, test_transformation_artifact)
             logging.info("Data transformation process completed successfully")
             return data_transformation_artifact
-        
         except Exception as e:
             raise MyException(e, sys)
         
-    def run_pipeline(self):
+    def start_model_trainer(self, data_transformation_artifact: DataTransformationArtifact) -> ModelTrainerArtifact:
+        try:
+            logging.info("Starting model training process")
+            model_trainer_config = self.model_trainer_config
+            model_trainer = ModelTrainer(data_transformation_artifact=data_transformation_artifact,
+                                         model_trainer_config=model_trainer_config)
+            input_files = [data_transformation_artifact.transformed_train_file_path,
+                           data_transformation_artifact.transformed_test_file_path,
+                           data_transformation_artifact.preprocessing_object_file_path]
+            if data_transformation_artifact.transformed_validation_file_path:
+                input_files.append(data_transformation_artifact.transformed_validation_file_path)
+            production_version = None
+            if model_trainer_config.retrain:
+                # restored once, before hashing: a new production version invalidates the cached model,
+                # and retraining starts from the version that was hashed even if LATEST moves meanwhile
+                production_version = model_trainer.restore_production_model()
+                input_files.append(model_trainer_config.production_model_file_path)
+            key = self.stage_cache.compute_key("model_trainer",
+                                               input_files=input_files,
+                                               schema_section=model_trainer.model_config,
+                                               config=model_trainer_config,
+                                               code_files=[inspect.getfile(ModelTrainer), inspect.getfile(estimator)])
+            model_trainer_artifact = self.stage_cache.run("model_trainer", key,
+                                                          outputs={"model": model_trainer_config.trained_model_file_path,
+                                                                   "search_report": model_trainer_config.search_report_file_path,
+                                                                   "package_manifest": model_trainer_config.trained_model_package_file_path,
+                                                                   "package_arrays": os.path.join(os.path.dirname(model_trainer_config.trained_model_package_file_path),
+                                                                                                  MODEL_PACKAGE_ARRAYS_FILE_NAME)},
+                                                          compute=lambda: model_trainer.initiate_model_trainer(production_version),
+                                                          artifact_type=ModelTrainerArtifact)
+            logging.info("Model training process completed successfully")
+            return model_trainer_artifact
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def start_model_evaluation(self, data_transformation_artifact: DataTransformationArtifact,
+                               model_trainer_artifact: ModelTrainerArtifact) -> ModelEvaluationArtifact:
+        try:
+            # Not cached: the outcome depends on the production model currently in the registry
+            logging.info("Starting model evaluation process")
+            model_evaluation = ModelEvaluation(model_eval_config=self.model_evaluation_config,
+                                               data_transformation_artifact=data_transformation_artifact,
+                                               model_trainer_artifact=model_trainer_artifact)
+            model_evaluation_artifact = model_evaluation.initiate_model_evaluation()
+            logging.info("Model evaluation process completed successfully")
+            return model_evaluation_artifact
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def start_model_pusher(self, model_evaluation_artifact: ModelEvaluationArtifact) -> ModelPusherArtifact:
+        try:
+            # Not cached: pushing only uploads the chunks missing from the registry
+            logging.info("Starting model pusher process")
+            model_pusher = ModelPusher(model_evaluation_artifact=model_evaluation_artifact,
+                                       model_pusher_config=self.model_pusher_config)
+            model_pusher_artifact = model_pusher.initiate_model_pusher()
+            logging.info("Model pusher process completed successfully")
+            return model_pusher_artifact
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def build_graph(self) -> DagRunner:
+        '''
+        Declares the pipeline stages by the artifacts they consume and produce.
+        Stages that only need the same upstream artifact run concurrently: the feature store
+        snapshot and the train/test split, the profiles of the train and test splits, and,
+        once the preprocessing is fitted on the training split, the resampling of the training
+        array and the transformation of the test split. Each pair is joined before the stage
+        that needs both.
+        '''
+        try:
+            stages = [
+                Stage("export", self.start_export, output="dataframe"),
+                Stage("feature_store_snapshot", self.start_feature_store_snapshot, inputs=("dataframe",), output="feature_store_file_path"),
+                Stage("data_ingestion", self.start_ingestion, inputs=("dataframe",), output="data_ingestion_artifact"),
+                Stage("data_validation_train", partial(self.start_split_validation, split="train"),
+                      inputs=("data_ingestion_artifact",), output="train_profile_artifact"),
+                Stage("data_validation_test", partial(self.start_split_validation, split="test"),
+                      inputs=("data_ingestion_artifact",), output="test_profile_artifact"),
+                Stage("data_validation", self.start_validation,
+                      inputs=("data_ingestion_artifact", "train_profile_artifact", "test_profile_artifact"),
+                      output="data_validation_artifact"),
+                Stage("data_transformation_fit", self.start_transformation_fit,
+                      inputs=("data_validation_artifact", "data_ingestion_artifact"), output="fitted_transformation_artifact"),
+                Stage("data_transformation_train", self.start_transformation_train,
+                      inputs=("fitted_transformation_artifact",), output="train_transformation_artifact"),
+                Stage("data_transformation_test", self.start_transformation_test,
+                      inputs=("fitted_transformation_artifact", "data_ingestion_artifact"), output="test_transformation_artifact"),
+                Stage("data_transformation", self.start_transformation,
+                      inputs=("fitted_transformation_artifact", "train_transformation_artifact", "test_transformation_artifact"),
+                      output="data_transformation_artifact"),
+                Stage("model_trainer", self.start_model_trainer, inputs=("data_transformation_artifact",), output="model_trainer_artifact"),
+                Stage("model_evaluation", self.start_model_evaluation,
+                      inputs=("data_transformation_artifact", "model_trainer_artifact"), output="model_evaluation_artifact"),
+                Stage("model_pusher", self.start_model_pusher, inputs=("model_evaluation_artifact",), output="model_pusher_artifact"),
+            ]
+            return DagRunner(stages, max_workers=self.max_workers)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def run_pipeline(self, stages: Optional[List[str]] = None, provided: Optional[dict] = None) -> DagRunResult:
+            '''
+            Runs the whole graph, or only `stages` and the stages they depend on.
+            `provided` holds artifacts from an earlier run (e.g. a DataIngestionArtifact) that should not be recomputed.
+            '''
             try:
                 logging.info("Starting the training pipeline")
-                data_ingestion_artifact = self.start_ingestion()
-                logging.info(f"Data ingestion artifact: {data_ingestion_artifact}")
+                result = self.build_graph().run(targets=stages, provided=provided)
+                for name, artifact in result.artifacts.items():
+                    if name != "dataframe":
+                        logging.info(f"{name}: {artifact}")
+                failed = [stage.name for stage in result.stages.values() if stage.status == "failed"]
+                if failed:
+                    errors = "; ".join(f"{name}: {result.stages[name].error}" for name in failed)
+                    raise Exception(f"Training pipeline stages failed: {errors}")
                 logging.info("Training pipeline completed successfully")
-                data_validation_artifact = self.start_validation(data_ingestion_artifact)
-                logging.info(f"Data validation artifact: {data_validation_artifact}")
-                data_transformation_artifact = self.start_transformation(data_validation_artifact,data_ingestion_artifact,data_transformation_config=DataTransformationConfig())
-                logging.info(f"Data transformation artifact: {data_transformation_artifact}")
+                return result
 
             except Exception as e:
-                raise MyException(e, sys)
\ No newline at end of file
+                raise MyException(e, sys)
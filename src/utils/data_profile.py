@@ -0,0 +1,310 @@
+import hashlib
+import json
+import sys
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from src.exception import MyException
+
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+def _dtype_matches(dtype, expected: str) -> bool:
+    if expected == "category":
+        return isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_object_dtype(dtype) \
+            or pd.api.types.is_string_dtype(dtype)
+    if expected == "int":
+        return pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype)
+    if expected == "float":
+        return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+    return True
+
+
+def schema_fingerprint(schema_config: dict, histogram_bins: int) -> str:
+    """
+    Returns the sha256 of everything a profile depends on: the schema columns, numeric
+    ranges, category domains and the number of histogram bins.
+    """
+    payload = {name: schema_config.get(name) for name in ("columns", "numeric_ranges", "category_values")}
+    payload["histogram_bins"] = histogram_bins
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def profile_dataframe(dataframe: DataFrame, schema_config: dict, histogram_bins: int) -> dict:
+    """
+    Profiles a DataFrame already held in memory.
+    """
+    profiler = DataProfiler(schema_config, histogram_bins)
+    profiler.update(dataframe)
+    return profiler.to_dict()
+
+
+class DataProfiler:
+    """
+    Builds the profile of a dataset one chunk at a time, in memory bounded by the schema.
+
+    Numeric columns keep null/invalid counts, moments, range violations and a histogram
+    over fixed bins of their `numeric_ranges` entry (plus an underflow and an overflow bin).
+    Because the bins only depend on the schema, histograms of different files and runs are
+    directly comparable and double as quantile sketches. Categorical columns keep counts
+    over their `category_values` domain and a few examples of unknown values.
+    """
+
+    def __init__(self, schema_config: dict, histogram_bins: int):
+        try:
+            self.expected = {name: kind for column in schema_config["columns"] for name, kind in column.items()}
+            self.ranges = schema_config.get("numeric_ranges", {})
+            self.domains = schema_config.get("category_values", {})
+            self.histogram_bins = histogram_bins
+            self.rows = 0
+            self.columns = None
+            self.dtypes = {}
+            self.numeric = {}
+            self.categorical = {}
+            for name, kind in self.expected.items():
+                if kind == "category":
+                    domain = self.domains.get(name, [])
+                    self.categorical[name] = {"nulls": 0, "counts": np.zeros(len(domain) + 1, dtype=np.int64),
+                                              "unknown_examples": []}
+                else:
+                    self.numeric[name] = {"nulls": 0, "invalid": 0, "count": 0, "min": np.inf, "max": -np.inf,
+                                          "sum": 0.0, "sum_squares": 0.0, "below_range": 0, "above_range": 0,
+                                          "histogram": np.zeros(histogram_bins + 2, dtype=np.int64) if name in self.ranges else None}
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def _update_numeric(self, name: str, series: pd.Series) -> None:
+        state = self.numeric[name]
+        nulls = series.isna()
+        values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(values)
+        state["nulls"] += int(nulls.sum())
+        state["invalid"] += int((~valid).sum() - nulls.sum())
+        values = values[valid]
+        if len(values) == 0:
+            return
+        state["count"] += len(values)
+        state["min"] = min(state["min"], float(values.min()))
+        state["max"] = max(state["max"], float(values.max()))
+        state["sum"] += float(values.sum())
+        state["sum_squares"] += float(np.dot(values, values))
+        if state["histogram"] is not None:
+            low, high = self.ranges[name]
+            state["below_range"] += int((values < low).sum())
+            state["above_range"] += int((values > high).sum())
+            # bin 0 is the underflow, bins 1..n the range (high inclusive), bin n+1 the overflow
+            index = np.floor((values - low) / (high - low) * self.histogram_bins).astype(np.int64) + 1
+            index = np.where(values == high, self.histogram_bins, index)
+            state["histogram"] += np.bincount(np.clip(index, 0, self.histogram_bins + 1),
+                                              minlength=self.histogram_bins + 2)
+
+    def _update_categorical(self, name: str, series: pd.Series) -> None:
+        state = self.categorical[name]
+        domain = self.domains.get(name, [])
+        nulls = series.isna()
+        state["nulls"] += int(nulls.sum())
+        codes = pd.Categorical(series, categories=domain).codes.astype(np.int64)
+        known = codes >= 0
+        unknown = ~known & ~nulls.to_numpy()
+        counts = np.bincount(codes[known], minlength=len(domain) + 1)
+        counts[-1] += int(unknown.sum())
+        state["counts"] += counts
+        if unknown.any() and len(state["unknown_examples"]) < 5:
+            for value in pd.unique(series[unknown]):
+                if len(state["unknown_examples"]) < 5 and str(value) not in state["unknown_examples"]:
+                    state["unknown_examples"].append(str(value))
+
+    def update(self, chunk: DataFrame) -> None:
+        """
+        Adds a chunk of rows to the profile.
+        """
+        try:
+            if self.columns is None:
+                self.columns = [str(column) for column in chunk.columns]
+                self.dtypes = {str(column): str(dtype) for column, dtype in chunk.dtypes.items()}
+            self.rows += len(chunk)
+            for name in self.numeric:
+                if name in chunk.columns:
+                    self._update_numeric(name, chunk[name])
+            for name in self.categorical:
+                if name in chunk.columns:
+                    self._update_categorical(name, chunk[name])
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def to_dict(self) -> dict:
+        """
+        Returns the profile as plain python values, ready to be written as YAML.
+        """
+        try:
+            numeric = {}
+            for name, state in self.numeric.items():
+                count = state["count"]
+                mean = state["sum"] / count if count else None
+                summary = {"nulls": state["nulls"], "invalid": state["invalid"], "count": count,
+                           "min": state["min"] if count else None, "max": state["max"] if count else None,
+                           "mean": mean,
+                           "std": float(np.sqrt(max(state["sum_squares"] / count - mean * mean, 0.0))) if count else None}
+                if state["histogram"] is not None:
+                    summary.update({"range": [float(value) for value in self.ranges[name]],
+                                    "below_range": state["below_range"], "above_range": state["above_range"],
+                                    "histogram": state["histogram"].tolist()})
+                    summary["quantiles"] = histogram_quantiles(summary, QUANTILES)
+                numeric[name] = summary
+            categorical = {}
+            for name, state in self.categorical.items():
+                domain = self.domains.get(name, [])
+                counts = state["counts"].tolist()
+                categorical[name] = {"nulls": state["nulls"],
+                                     "counts": {str(value): count for value, count in zip(domain, counts)},
+                                     "unknown": counts[-1], "unknown_examples": state["unknown_examples"]}
+            return {"rows": self.rows, "columns": self.columns or [], "dtypes": self.dtypes,
+                    "numeric": numeric, "categorical": categorical}
+        except Exception as e:
+            raise MyException(e, sys)
+
+
+def histogram_quantiles(summary: dict, quantiles=QUANTILES) -> Dict[str, float]:
+    """
+    Estimates quantiles from a fixed-bin histogram by linear interpolation inside bins.
+    The underflow and overflow bins span from the observed min and up to the observed max.
+
+    Parameters:
+    ----------
+    summary : dict
+        Numeric column profile with 'range', 'histogram', 'min' and 'max'.
+    quantiles : Iterable[float]
+        Probabilities to estimate.
+    """
+    counts = np.asarray(summary["histogram"], dtype=np.float64)
+    if counts.sum() == 0:
+        return {}
+    low, high = summary["range"]
+    inner = np.linspace(low, high, len(counts) - 1)
+    edges = np.concatenate([[min(summary["min"], low)], inner, [max(summary["max"], high)]])
+    cdf = np.concatenate([[0.0], np.cumsum(counts) / counts.sum()])
+    estimates = np.clip(np.interp(list(quantiles), cdf, edges), summary["min"], summary["max"])
+    return {f"p{round(q * 100):02d}": float(value) for q, value in zip(quantiles, estimates)}
+
+
+def _proportions(counts: np.ndarray, epsilon: float = 1e-4) -> np.ndarray:
+    total = counts.sum()
+    proportions = counts / total if total else np.zeros_like(counts, dtype=np.float64)
+    return np.maximum(proportions, epsilon)
+
+
+def population_stability_index(expected: List[int], actual: List[int]) -> float:
+    """
+    Returns the PSI between two count vectors over the same bins.
+    """
+    expected_share = _proportions(np.asarray(expected, dtype=np.float64))
+    actual_share = _proportions(np.asarray(actual, dtype=np.float64))
+    return float(np.sum((actual_share - expected_share) * np.log(actual_share / expected_share)))
+
+
+def ks_statistic(expected: List[int], actual: List[int]) -> float:
+    """
+    Returns the two-sample Kolmogorov-Smirnov statistic evaluated at the bin edges
+    of two histograms over the same bins (a lower bound of the exact statistic).
+    """
+    expected = np.asarray(expected, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    if expected.sum() == 0 or actual.sum() == 0:
+        return 0.0
+    return float(np.max(np.abs(np.cumsum(expected) / expected.sum() - np.cumsum(actual) / actual.sum())))
+
+
+def drift_scores(reference: dict, current: dict) -> Dict[str, dict]:
+    """
+    Computes PSI (and KS for numeric columns) of every column profiled in both profiles.
+    Numeric columns are only compared when their histograms share the same range and bins.
+    """
+    try:
+        scores = {}
+        for name, summary in current.get("numeric", {}).items():
+            base = reference.get("numeric", {}).get(name)
+            if not base or "histogram" not in summary or "histogram" not in base \
+                    or base["range"] != summary["range"] or len(base["histogram"]) != len(summary["histogram"]):
+                continue
+            scores[name] = {"psi": population_stability_index(base["histogram"], summary["histogram"]),
+                            "ks": ks_statistic(base["histogram"], summary["histogram"])}
+        for name, summary in current.get("categorical", {}).items():
+            base = reference.get("categorical", {}).get(name)
+            if not base:
+                continue
+            categories = sorted(set(base["counts"]) | set(summary["counts"]))
+            expected = [base["counts"].get(value, 0) for value in categories] + [base["unknown"]]
+            actual = [summary["counts"].get(value, 0) for value in categories] + [summary["unknown"]]
+            scores[name] = {"psi": population_stability_index(expected, actual)}
+        return scores
+    except Exception as e:
+        raise MyException(e, sys)
+
+
+def drift_warnings(scores: Dict[str, dict], psi_threshold: float, ks_threshold: float, label: str) -> List[str]:
+    """
+    Lists the columns whose drift scores exceed the thresholds.
+    """
+    warnings = []
+    for name, score in scores.items():
+        if score["psi"] > psi_threshold:
+            warnings.append(f"{label}: {name} PSI {score['psi']:.4f} > {psi_threshold}")
+        if score.get("ks", 0.0) > ks_threshold:
+            warnings.append(f"{label}: {name} KS {score['ks']:.4f} > {ks_threshold}")
+    return warnings
+
+
+def profile_checks(profile: dict, schema_config: dict, max_null_rate: float, label: str,
+                   expected_columns: Optional[List[str]] = None) -> List[str]:
+    """
+    Checks a profile against the schema and returns one message per failed check:
+    missing or unexpected columns, dtypes, null rates, category domains and numeric ranges.
+
+    Parameters:
+    ----------
+    profile : dict
+        Output of `DataProfiler.to_dict`.
+    schema_config : dict
+        Parsed config/schema.yaml.
+    max_null_rate : float
+        Largest accepted share of null values in a column.
+    label : str
+        Name of the profiled dataset, used in the messages.
+    expected_columns : Optional[List[str]]
+        Columns the dataset must hold. Defaults to the schema columns.
+    """
+    try:
+        errors = []
+        expected = {name: kind for column in schema_config["columns"] for name, kind in column.items()}
+        expected_columns = expected_columns if expected_columns is not None else list(expected)
+        columns = profile["columns"]
+        missing = [name for name in expected_columns if name not in columns]
+        unexpected = [name for name in columns if name not in expected]
+        if missing:
+            errors.append(f"{label}: missing columns {missing}")
+        if unexpected:
+            errors.append(f"{label}: unexpected columns {unexpected}")
+        rows = profile["rows"]
+        for name, dtype in profile["dtypes"].items():
+            if name in expected and not _dtype_matches(pd.api.types.pandas_dtype(dtype), expected[name]):
+                errors.append(f"{label}: column {name} has dtype {dtype}, expected {expected[name]}")
+        for kind in ("numeric", "categorical"):
+            for name, summary in profile[kind].items():
+                if name not in columns:
+                    continue
+                if rows and summary["nulls"] / rows > max_null_rate:
+                    errors.append(f"{label}: column {name} null rate {summary['nulls'] / rows:.4f} > {max_null_rate}")
+                if summary.get("invalid"):
+                    errors.append(f"{label}: column {name} has {summary['invalid']} non-numeric values")
+                if summary.get("below_range") or summary.get("above_range"):
+                    errors.append(f"{label}: column {name} has {summary['below_range']} values below and "
+                                  f"{summary['above_range']} above the range {summary['range']}")
+                if summary.get("unknown"):
+                    errors.append(f"{label}: column {name} has {summary['unknown']} values outside the domain, "
+                                  f"e.g. {summary['unknown_examples']}")
+        return errors
+    except Exception as e:
+        raise MyException(e, sys)
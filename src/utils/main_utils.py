@@ -5,6 +5,8 @@ from src.exception import MyException
 from src.logger import logging
 
 from pandas import DataFrame
+from typing import Iterator, List, Optional
+import pandas as pd
 import numpy as np
 import yaml
 import dill
@@ -49,7 +51,7 @@ def write_yaml_file(file_path: str, content:object,replace:bool=False) -> None:
             os.remove(file_path)
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
-        with open(file_path, 'wb') as file:
+        with open(file_path, 'w') as file:
             yaml.dump(content, file)
     except Exception as e:
         raise MyException(e, sys)
@@ -135,4 +137,263 @@ def load_numpy_array_data(file_path: str) -> np.ndarray:
         return array
     except Exception as e:
         raise MyException(e, sys)
-    
+
+
+def get_schema_dtypes(schema_config: dict) -> dict:
+    """
+    Builds a column -> pandas dtype map from the `columns` section of the schema.
+
+    'category' becomes a CategoricalDtype over the fixed `category_values`
+    vocabulary when one is declared (plain 'category' otherwise), 'float' becomes 'float32' and 'int' becomes
+    'integer', which `apply_schema_dtypes` narrows to the smallest signed width
+    that holds the values (int8 for 0/1 flags). Explicit numpy dtype names in the
+    schema (e.g. 'int32', 'float64') are used as they are.
+
+    Parameters:
+    ----------
+    schema_config : dict
+        Content of config/schema.yaml.
+
+    Returns:
+    -------
+    dict
+        Mapping of column name to dtype.
+    """
+    kinds = {"category": "category", "int": "integer", "float": "float32"}
+    vocabulary = schema_config.get("category_values", {})
+    dtypes = {}
+    for column in schema_config["columns"]:
+        for name, kind in column.items():
+            if kind == "category" and name in vocabulary:
+                dtypes[name] = pd.CategoricalDtype(categories=vocabulary[name])
+            else:
+                dtypes[name] = kinds.get(kind, kind)
+    return dtypes
+
+
+def apply_schema_dtypes(dataframe: DataFrame, dtypes: dict) -> DataFrame:
+    """
+    Casts the columns of `dataframe` that appear in `dtypes`.
+    Integer columns holding missing values are narrowed as float32 instead.
+    """
+    try:
+        casts = {}
+        for name, dtype in dtypes.items():
+            if name not in dataframe.columns:
+                continue
+            column = dataframe[name]
+            if isinstance(dtype, str) and dtype == "integer":
+                if column.isna().any():
+                    casts[name] = "float32"
+                elif pd.api.types.is_numeric_dtype(column):
+                    downcast = pd.to_numeric(column, downcast="integer")
+                    if downcast.dtype != column.dtype:
+                        casts[name] = downcast.dtype
+                else:
+                    casts[name] = pd.to_numeric(column, downcast="integer").dtype
+            elif column.dtype != dtype:
+                if isinstance(dtype, str) and dtype.startswith("int") and column.isna().any():
+                    continue
+                casts[name] = dtype
+        return dataframe.astype(casts) if casts else dataframe
+    except Exception as e:
+        raise MyException(e, sys)
+
+
+def report_memory_savings(stage: str, dataframe: DataFrame) -> dict:
+    """
+    Logs the memory held by `dataframe` next to the same data with pandas
+    default dtypes (int64/float64 numbers, object strings).
+
+    Parameters:
+    ----------
+    stage : str
+        Name of the pipeline stage, used in the log message.
+    dataframe : DataFrame
+        Dataframe after schema dtypes were applied.
+
+    Returns:
+    -------
+    dict
+        Bytes used, bytes with default dtypes and the saved ratio.
+    """
+    try:
+        rows = len(dataframe)
+        actual = int(dataframe.memory_usage(index=False, deep=True).sum())
+        default = 0
+        for name in dataframe.columns:
+            column = dataframe[name]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                # object column: one pointer per row plus one str object per row
+                sizes = np.array([sys.getsizeof(str(value)) for value in column.cat.categories], dtype=np.int64)
+                counts = np.bincount(column.cat.codes[column.cat.codes >= 0], minlength=len(sizes))
+                default += 8 * rows + int(sizes @ counts)
+            elif pd.api.types.is_numeric_dtype(column):
+                default += 8 * rows
+            else:
+                default += int(column.memory_usage(index=False, deep=True))
+        report = {"stage": stage, "bytes": actual, "default_bytes": default,
+                  "saved_ratio": round(1 - actual / default, 4) if default else 0.0}
+        logging.info(f"[{stage}] memory {actual / 2**20:.2f} MiB vs {default / 2**20:.2f} MiB with default dtypes "
+                     f"({report['saved_ratio']:.1%} saved)")
+        return report
+    except Exception as e:
+        raise MyException(e, sys)
+
+
+def save_dataframe(file_path: str, dataframe: DataFrame, file_format: str) -> None:
+    logging.info(f"Saving dataframe to {file_path} as {file_format}")
+    """
+    Saves a DataFrame as parquet, feather or csv.
+
+    Category columns are written dictionary-encoded by the columnar formats.
+
+    Parameters:
+    ----------
+    file_path : str
+        Path to the file where the dataframe will be saved.
+    dataframe : DataFrame
+        Dataframe to be saved.
+    file_format : str
+        One of 'parquet', 'feather' or 'csv'.
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        dataframe = dataframe.reset_index(drop=True)
+        if file_format == "parquet":
+            dataframe.to_parquet(file_path, index=False)
+        elif file_format == "feather":
+            dataframe.to_feather(file_path)
+        elif file_format == "csv":
+            dataframe.to_csv(file_path, index=False, header=True)
+        else:
+            raise ValueError(f"Unsupported file format: {file_format}")
+    except Exception as e:
+        raise MyException(e, sys)
+
+
+def _csv_parse_dtypes(dtypes: Optional[dict]) -> Optional[dict]:
+    """Dtypes that read_csv can apply while parsing; integer narrowing happens afterwards."""
+    if not dtypes:
+        return None
+    return {name: dtype for name, dtype in dtypes.items() if not isinstance(dtype, str) or dtype != "integer"}
+
+
+def read_dataframe(file_path: str, file_format: str, columns: Optional[List[str]] = None,
+                   dtypes: Optional[dict] = None) -> DataFrame:
+    logging.info(f"Reading {file_format} dataframe from {file_path}")
+    """
+    Reads a DataFrame saved with `save_dataframe`.
+
+    Parameters:
+    ----------
+    file_path : str
+        Path to the file.
+    file_format : str
+        One of 'parquet', 'feather' or 'csv'.
+    columns : Optional[List[str]]
+        Only read these columns. Reads all columns when None.
+    dtypes : Optional[dict]
+        Schema dtypes from `get_schema_dtypes` applied to the loaded columns.
+
+    Returns:
+    -------
+    DataFrame
+        Loaded dataframe.
+    """
+    try:
+        if file_format == "parquet":
+            dataframe = pd.read_parquet(file_path, columns=columns)
+        elif file_format == "feather":
+            dataframe = pd.read_feather(file_path, columns=columns)
+        elif file_format == "csv":
+            dataframe = pd.read_csv(file_path, usecols=columns, dtype=_csv_parse_dtypes(dtypes))
+        else:
+            raise ValueError(f"Unsupported file format: {file_format}")
+        return apply_schema_dtypes(dataframe, dtypes) if dtypes else dataframe
+    except Exception as e:
+        raise MyException(e, sys)
+
+
+def read_dataframe_header(file_path: str, file_format: str) -> DataFrame:
+    """
+    Returns an empty DataFrame carrying the columns and dtypes of a saved file.
+    For the columnar formats only the file footer/schema is read.
+    """
+    try:
+        if file_format == "parquet":
+            import pyarrow.parquet as pq
+            return pq.read_schema(file_path).empty_table().to_pandas()
+        if file_format == "feather":
+            import pyarrow.ipc as ipc
+            with ipc.open_file(file_path) as reader:
+                return reader.schema.empty_table().to_pandas()
+        if file_format == "csv":
+            return pd.read_csv(file_path, nrows=0)
+        raise ValueError(f"Unsupported file format: {file_format}")
+    except Exception as e:
+        raise MyException(e, sys)
+
+
+def iter_dataframe_chunks(file_path: str, file_format: str, chunk_size: int,
+                          columns: Optional[List[str]] = None, dtypes: Optional[dict] = None) -> Iterator[DataFrame]:
+    """
+    Yields a saved DataFrame in chunks of at most `chunk_size` rows.
+
+    Parameters:
+    ----------
+    file_path : str
+        Path to the file.
+    file_format : str
+        One of 'parquet', 'feather' or 'csv'.
+    chunk_size : int
+        Maximum number of rows per chunk.
+    columns : Optional[List[str]]
+        Only read these columns. Reads all columns when None.
+    dtypes : Optional[dict]
+        Schema dtypes from `get_schema_dtypes` applied to every chunk.
+    """
+    try:
+        if file_format == "parquet":
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(file_path)
+            chunks = (batch.to_pandas() for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns))
+        elif file_format == "feather":
+            import pyarrow as pa
+            import pyarrow.ipc as ipc
+            with pa.memory_map(file_path) as source:
+                table = ipc.open_file(source).read_all()
+            if columns is not None:
+                table = table.select(columns)
+            chunks = (batch.to_pandas() for batch in table.to_batches(max_chunksize=chunk_size))
+        elif file_format == "csv":
+            chunks = pd.read_csv(file_path, usecols=columns, chunksize=chunk_size, dtype=_csv_parse_dtypes(dtypes))
+        else:
+            raise ValueError(f"Unsupported file format: {file_format}")
+        for chunk in chunks:
+            yield apply_schema_dtypes(chunk, dtypes) if dtypes else chunk
+    except Exception as e:
+        raise MyException(e, sys)
+
+
+def count_rows(file_path: str, file_format: str) -> int:
+    """
+    Returns the number of rows of a saved DataFrame without loading it.
+    Parquet and feather read the row counts from their metadata.
+    """
+    try:
+        if file_format == "parquet":
+            import pyarrow.parquet as pq
+            return pq.ParquetFile(file_path).metadata.num_rows
+        if file_format == "feather":
+            import pyarrow as pa
+            import pyarrow.ipc as ipc
+            with pa.memory_map(file_path) as source:
+                reader = ipc.open_file(source)
+                return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        if file_format == "csv":
+            with open(file_path, 'rb') as file:
+                return max(sum(1 for _ in file) - 1, 0)
+        raise ValueError(f"Unsupported file format: {file_format}")
+    except Exception as e:
+        raise MyException(e, sys)
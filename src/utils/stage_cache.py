@@ -0,0 +1,247 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from dataclasses import asdict, fields, is_dataclass
+from typing import Callable, Dict, List, Optional, get_type_hints
+
+import pandas as pd
+
+from src.constants import STAGE_CACHE_DIR, STAGE_CACHE_ENTRY_FILE_NAME
+from src.entity.config_entity import TIMESTAMP
+from src.exception import MyException
+from src.logger import logging
+from src.utils.main_utils import read_yaml_file, write_yaml_file
+
+
+def hash_file(file_path: str, block_size: int = 1 << 20) -> str:
+    """
+    Returns the sha256 hex digest of a file's content, read in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_dataframe(dataframe) -> str:
+    """
+    Returns the sha256 hex digest of a DataFrame's column names and row values.
+    """
+    digest = hashlib.sha256(json.dumps([str(column) for column in dataframe.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(dataframe, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _config_fields(config: object) -> dict:
+    """
+    Returns the fields of a config dataclass that describe what a stage computes.
+    Paths inside the timestamped run directory change every run and are left out.
+    """
+    if config is None:
+        return {}
+    values = asdict(config) if is_dataclass(config) else dict(config)
+    return {name: value for name, value in values.items()
+            if not (isinstance(value, str) and TIMESTAMP in value)}
+
+
+class StageCache:
+    """
+    Content-addressed cache of pipeline stage outputs.
+
+    A stage is keyed by the hash of its input files, the schema section it reads, its
+    config fields and the source of the modules implementing it. When a key is already
+    cached the stored outputs are hard-linked into the current run directory and the
+    stage's artifact is rebuilt from the entry instead of recomputing the stage (nested
+    artifact dataclasses, such as metrics, are stored as their fields).
+    Cached files are shared between runs through hard links and must not be modified in place.
+    """
+
+    def __init__(self, cache_dir: str = STAGE_CACHE_DIR, force_recompute: bool = False):
+        self.cache_dir = cache_dir
+        self.force_recompute = force_recompute
+
+    @staticmethod
+    def compute_key(stage: str, input_files: List[str], schema_section: Optional[dict] = None,
+                    config: object = None, code_files: Optional[List[str]] = None, extra: Optional[dict] = None) -> str:
+        """
+        Computes the cache key of a stage run.
+
+        Parameters:
+        ----------
+        stage : str
+            Name of the stage.
+        input_files : List[str]
+            Upstream artifact files, hashed by content.
+        schema_section : Optional[dict]
+            Part of config/schema.yaml the stage depends on.
+        config : object
+            Stage config dataclass.
+        code_files : Optional[List[str]]
+            Source files of the stage, hashed as its code version.
+        extra : Optional[dict]
+            Any other value the stage output depends on.
+
+        Returns:
+        -------
+        str
+            sha256 hex digest.
+        """
+        try:
+            payload = {
+                "stage": stage,
+                "inputs": [hash_file(path) for path in input_files],
+                "schema": schema_section,
+                "config": _config_fields(config),
+                "code": [hash_file(path) for path in code_files or []],
+                "extra": extra,
+            }
+            return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def _entry_dir(self, stage: str, key: str) -> str:
+        return os.path.join(self.cache_dir, stage, key)
+
+    @staticmethod
+    def _link(source: str, destination: str) -> None:
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        if os.path.exists(destination):
+            os.remove(destination)
+        try:
+            os.link(source, destination)
+        except OSError:
+            shutil.copy2(source, destination)
+
+    def run(self, stage: str, key: str, outputs: Dict[str, str], compute: Callable[[], object], artifact_type: type):
+        """
+        Returns the artifact of a stage, reusing cached outputs when `key` is cached.
+
+        Parameters:
+        ----------
+        stage : str
+            Name of the stage.
+        key : str
+            Key from `compute_key`.
+        outputs : Dict[str, str]
+            Output name -> path of that output in the current run.
+        compute : Callable[[], object]
+            Runs the stage and returns its artifact dataclass.
+        artifact_type : type
+            Artifact dataclass rebuilt on a cache hit.
+        """
+        try:
+            entry_dir = self._entry_dir(stage, key)
+            entry_path = os.path.join(entry_dir, STAGE_CACHE_ENTRY_FILE_NAME)
+            if not self.force_recompute and os.path.exists(entry_path):
+                entry = read_yaml_file(entry_path)
+                for name, path in outputs.items():
+                    self._link(os.path.join(entry_dir, name), path)
+                types = get_type_hints(artifact_type)
+                values = {}
+                for name, value in entry["artifact"].items():
+                    if isinstance(value, dict) and "output" in value:
+                        value = outputs[value["output"]]
+                    elif isinstance(value, dict) and "dataclass" in value:
+                        value = types[name](**value["dataclass"])
+                    values[name] = value
+                os.utime(entry_path)
+                logging.info(f"Stage cache hit for {stage} ({key[:12]}), reused outputs from {entry['created']}")
+                return artifact_type(**values)
+
+            logging.info(f"Stage cache miss for {stage} ({key[:12]}), computing")
+            artifact = compute()
+            # Record which artifact fields point at outputs so a hit can point them at the new run.
+            by_path = {os.path.abspath(path): name for name, path in outputs.items()}
+            stored = {}
+            for field in fields(artifact):
+                value = getattr(artifact, field.name)
+                if isinstance(value, str) and os.path.abspath(value) in by_path:
+                    value = {"output": by_path[os.path.abspath(value)]}
+                elif is_dataclass(value):
+                    value = {"dataclass": asdict(value)}
+                stored[field.name] = value
+            os.makedirs(entry_dir, exist_ok=True)
+            size = 0
+            for name, path in outputs.items():
+                self._link(path, os.path.join(entry_dir, name))
+                size += os.path.getsize(path)
+            write_yaml_file(entry_path + ".tmp", {"stage": stage, "key": key, "created": TIMESTAMP,
+                                                  "size": size, "artifact": stored})
+            os.replace(entry_path + ".tmp", entry_path)
+            return artifact
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def entries(self) -> List[dict]:
+        """
+        Lists cached entries with their stage, key, size and last use time.
+        """
+        try:
+            result = []
+            if not os.path.isdir(self.cache_dir):
+                return result
+            for stage in sorted(os.listdir(self.cache_dir)):
+                stage_dir = os.path.join(self.cache_dir, stage)
+                for key in sorted(os.listdir(stage_dir)):
+                    entry_path = os.path.join(stage_dir, key, STAGE_CACHE_ENTRY_FILE_NAME)
+                    if not os.path.exists(entry_path):
+                        continue
+                    entry = read_yaml_file(entry_path)
+                    result.append({"stage": stage, "key": key, "size": entry["size"],
+                                   "created": entry["created"], "last_used": os.path.getmtime(entry_path)})
+            return result
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def evict(self, max_age_days: Optional[float] = None, max_bytes: Optional[int] = None) -> List[dict]:
+        """
+        Removes entries unused for more than `max_age_days`, then the least recently
+        used entries until the cache holds at most `max_bytes`.
+
+        Returns:
+        -------
+        List[dict]
+            The removed entries.
+        """
+        try:
+            entries = sorted(self.entries(), key=lambda entry: entry["last_used"])
+            removed = []
+            if max_age_days is not None:
+                cutoff = time.time() - max_age_days * 86400
+                removed += [entry for entry in entries if entry["last_used"] < cutoff]
+                entries = [entry for entry in entries if entry["last_used"] >= cutoff]
+            if max_bytes is not None:
+                total = sum(entry["size"] for entry in entries)
+                while entries and total > max_bytes:
+                    entry = entries.pop(0)
+                    total -= entry["size"]
+                    removed.append(entry)
+            for entry in removed:
+                shutil.rmtree(self._entry_dir(entry["stage"], entry["key"]), ignore_errors=True)
+                logging.info(f"Evicted stage cache entry {entry['stage']}/{entry['key'][:12]}")
+            return removed
+        except Exception as e:
+            raise MyException(e, sys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or evict the pipeline stage cache.")
+    parser.add_argument("command", choices=["list", "evict"])
+    parser.add_argument("--max-age-days", type=float, default=None)
+    parser.add_argument("--max-size-mb", type=float, default=None)
+    args = parser.parse_args()
+
+    cache = StageCache()
+    if args.command == "list":
+        for entry in cache.entries():
+            print(f"{entry['stage']:<22} {entry['key'][:16]} {entry['size'] / 2**20:>10.2f} MiB  "
+                  f"created {entry['created']}  last used {time.ctime(entry['last_used'])}")
+    else:
+        max_bytes = int(args.max_size_mb * 2**20) if args.max_size_mb is not None else None
+        removed = cache.evict(max_age_days=args.max_age_days, max_bytes=max_bytes)
+        print(f"Evicted {len(removed)} entries")
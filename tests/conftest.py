@@ -0,0 +1,35 @@
+import mongomock
+import pytest
+
+from src.configuration.mongo_db_connection import MongoDBConnection
+
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    """
+    Serves every MongoDBConnection, shared or dedicated, from one in-memory mongomock client.
+    """
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(MongoDBConnection, "client", None)
+    monkeypatch.setattr(MongoDBConnection, "_create_client", staticmethod(lambda: client))
+    return client
+
+
+@pytest.fixture
+def s3_bucket(monkeypatch):
+    """
+    Serves S3Client from moto's in-memory S3, with the model bucket created. Returns the bucket name.
+    """
+    from moto import mock_aws
+
+    from src.configuration.aws_connection import S3Client
+    from src.constants import MODEL_BUCKET_NAME
+
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.delenv("AWS_ENDPOINT_URL", raising=False)
+    monkeypatch.setattr(S3Client, "s3_client", None)
+    monkeypatch.setattr(S3Client, "s3_resource", None)
+    with mock_aws():
+        S3Client().s3_client.create_bucket(Bucket=MODEL_BUCKET_NAME)
+        yield MODEL_BUCKET_NAME
@@ -0,0 +1,115 @@
+import os
+
+import pytest
+
+from src.cloud_storage.aws_storage import SimpleStorageService
+
+MIB = 1024 * 1024
+
+
+def interrupt_after(storage: SimpleStorageService, operation: str, calls: int, monkeypatch) -> list:
+    """
+    Makes the client's `operation` fail once it was called `calls` times; returns the list of calls made.
+    """
+    original, made = getattr(storage.s3_client, operation), []
+
+    def operation_call(**kwargs):
+        made.append(kwargs)
+        if len(made) > calls:
+            raise ConnectionError("connection reset")
+        return original(**kwargs)
+
+    monkeypatch.setattr(storage.s3_client, operation, operation_call)
+    return made
+
+
+def count_calls(storage: SimpleStorageService, operation: str, monkeypatch) -> list:
+    return interrupt_after(storage, operation, 10**9, monkeypatch)
+
+
+@pytest.fixture
+def storage(s3_bucket, tmp_path):
+    # one part at a time, so an interruption always leaves the same parts behind
+    return SimpleStorageService(part_size=5 * MIB, multipart_threshold=5 * MIB, max_concurrency=1,
+                                state_dir=str(tmp_path / "state"))
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    path = tmp_path / "model.bin"
+    path.write_bytes(os.urandom(17 * MIB))
+    return path
+
+
+def test_interrupted_upload_resumes_with_the_missing_parts(storage, s3_bucket, model_file, tmp_path):
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        interrupt_after(storage, "upload_part", 2, monkeypatch)
+        with pytest.raises(Exception, match="connection reset"):
+            storage.upload_file(str(model_file), s3_bucket, "models/model.bin")
+    assert os.listdir(tmp_path / "state")
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        uploaded = count_calls(storage, "upload_part", monkeypatch)
+        assert storage.upload_file(str(model_file), s3_bucket, "models/model.bin")
+    assert [call["PartNumber"] for call in uploaded] == [3, 4]
+    assert os.listdir(tmp_path / "state") == []
+
+    storage.download_file(s3_bucket, "models/model.bin", str(tmp_path / "copy.bin"))
+    assert (tmp_path / "copy.bin").read_bytes() == model_file.read_bytes()
+
+
+def test_upload_of_a_changed_file_starts_over(storage, s3_bucket, model_file, tmp_path):
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        interrupt_after(storage, "upload_part", 2, monkeypatch)
+        with pytest.raises(Exception, match="connection reset"):
+            storage.upload_file(str(model_file), s3_bucket, "models/model.bin")
+    model_file.write_bytes(os.urandom(17 * MIB))
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        uploaded = count_calls(storage, "upload_part", monkeypatch)
+        storage.upload_file(str(model_file), s3_bucket, "models/model.bin")
+    assert [call["PartNumber"] for call in uploaded] == [1, 2, 3, 4]
+    storage.download_file(s3_bucket, "models/model.bin", str(tmp_path / "copy.bin"))
+    assert (tmp_path / "copy.bin").read_bytes() == model_file.read_bytes()
+
+
+def test_interrupted_download_resumes_with_the_missing_parts(storage, s3_bucket, model_file, tmp_path):
+    storage.upload_file(str(model_file), s3_bucket, "models/model.bin")
+    local_path = str(tmp_path / "download" / "model.bin")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        interrupt_after(storage, "get_object", 3, monkeypatch)
+        with pytest.raises(Exception, match="connection reset"):
+            storage.download_file(s3_bucket, "models/model.bin", local_path)
+    assert not os.path.exists(local_path)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        fetched = count_calls(storage, "get_object", monkeypatch)
+        assert storage.download_file(s3_bucket, "models/model.bin", local_path)
+    assert [call["Range"] for call in fetched] == [f"bytes={15 * MIB}-{17 * MIB - 1}"]
+    assert open(local_path, "rb").read() == model_file.read_bytes()
+    assert not os.path.exists(local_path + ".part")
+
+
+def test_download_of_a_replaced_object_starts_over(storage, s3_bucket, model_file, tmp_path):
+    storage.upload_file(str(model_file), s3_bucket, "models/model.bin")
+    local_path = str(tmp_path / "download" / "model.bin")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        interrupt_after(storage, "get_object", 2, monkeypatch)
+        with pytest.raises(Exception, match="connection reset"):
+            storage.download_file(s3_bucket, "models/model.bin", local_path)
+    model_file.write_bytes(os.urandom(17 * MIB))
+    storage.upload_file(str(model_file), s3_bucket, "models/model.bin")
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        fetched = count_calls(storage, "get_object", monkeypatch)
+        storage.download_file(s3_bucket, "models/model.bin", local_path)
+    assert len(fetched) == 4
+    assert open(local_path, "rb").read() == model_file.read_bytes()
+
+
+def test_transfers_of_unchanged_content_are_skipped(storage, s3_bucket, model_file, tmp_path):
+    assert storage.upload_file(str(model_file), s3_bucket, "models/model.bin")
+    assert not storage.upload_file(str(model_file), s3_bucket, "models/model.bin")
+    local_path = str(tmp_path / "copy.bin")
+    assert storage.download_file(s3_bucket, "models/model.bin", local_path)
+    assert not storage.download_file(s3_bucket, "models/model.bin", local_path)
@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+from src.exception import MyException
+from src.pipline.dag import DagRunner, Stage
+from src.pipline.training_pipeline import TrainingPipeline
+
+
+def toy_graph(calls: list, fail: str = None, barrier: threading.Barrier = None) -> DagRunner:
+    '''
+    source -> left, right -> join -> sink, plus an unrelated island stage.
+    `fail` names a stage that raises; left and right wait on `barrier` when given.
+    '''
+    def stage(name: str, wait: bool = False):
+        def func(**inputs):
+            calls.append(name)
+            if wait and barrier is not None:
+                barrier.wait(timeout=5)
+            if name == fail:
+                raise RuntimeError(f"{name} broke")
+            return "+".join([name] + [inputs[key] for key in sorted(inputs)])
+        return func
+
+    return DagRunner([
+        Stage("sink", stage("sink"), inputs=("joined",), output="result"),
+        Stage("join", stage("join"), inputs=("left_value", "right_value"), output="joined"),
+        Stage("left", stage("left", wait=True), inputs=("source_value",), output="left_value"),
+        Stage("right", stage("right", wait=True), inputs=("source_value",), output="right_value"),
+        Stage("source", stage("source"), output="source_value"),
+        Stage("island", stage("island"), output="island_value"),
+    ], max_workers=4)
+
+
+def test_select_returns_the_upstream_subgraph_in_topological_order():
+    runner = toy_graph([])
+
+    order = runner.select(["join"])
+
+    assert set(order) == {"source", "left", "right", "join"}
+    assert order.index("source") < order.index("left") < order.index("join")
+    assert order.index("source") < order.index("right") < order.index("join")
+    assert runner.select(["join"], provided={"left_value": "x"}) == ["source", "right", "join"]
+
+
+def test_run_publishes_the_artifacts_of_the_selected_stages_only():
+    calls = []
+
+    result = toy_graph(calls).run(targets=["sink"], provided={"source_value": "given"})
+
+    assert result.succeeded
+    assert "source" not in calls and "island" not in calls
+    assert result.artifacts["result"] == "sink+join+left+given+right+given"
+
+
+def test_independent_stages_run_concurrently():
+    calls = []
+    # left and right each wait for the other: a serial run would time out on the barrier
+    result = toy_graph(calls, barrier=threading.Barrier(2)).run(targets=["join"])
+
+    assert result.succeeded
+    assert sorted(calls[1:3]) == ["left", "right"]
+
+
+def test_cycles_are_rejected():
+    runner = DagRunner([Stage("a", lambda b: b, inputs=("b",), output="a"),
+                        Stage("b", lambda a: a, inputs=("a",), output="b")])
+
+    with pytest.raises(MyException, match="Cycle"):
+        runner.select()
+
+
+def test_artifacts_without_a_producer_are_rejected():
+    runner = DagRunner([Stage("a", lambda missing: missing, inputs=("missing",), output="a")])
+
+    with pytest.raises(MyException, match="no stage produces"):
+        runner.select()
+
+
+def test_a_failure_skips_the_downstream_stages_only():
+    calls = []
+
+    result = toy_graph(calls, fail="left").run()
+
+    statuses = {name: stage.status for name, stage in result.stages.items()}
+    assert statuses == {"source": "done", "left": "failed", "right": "done", "join": "skipped",
+                        "sink": "skipped", "island": "done"}
+    assert "left broke" in result.stages["left"].error
+    assert "join" not in calls and "sink" not in calls
+    assert not result.succeeded
+
+
+def test_training_graph_profiles_and_transforms_the_splits_side_by_side():
+    runner = TrainingPipeline().build_graph()
+
+    def upstream(name: str) -> set:
+        return set(runner.select([name])) - {name}
+
+    for train, test, join in (("data_validation_train", "data_validation_test", "data_validation"),
+                              ("data_transformation_train", "data_transformation_test", "data_transformation")):
+        assert train not in upstream(test) and test not in upstream(train)
+        assert {train, test} <= upstream(join)
+    assert "data_transformation" in upstream("model_trainer")
@@ -0,0 +1,49 @@
+import pytest
+
+from src.constants import DATABASE_NAME
+from src.components.data_ingestion import DataIngestion
+from src.data_access.proj1_data import Proj1Data
+from src.entity.config_entity import DataIngestionConfig
+
+
+def vehicle_documents(start: int, stop: int) -> list:
+    return [{"id": i, "Gender": "Male" if i % 2 else "Female", "Age": 20 + i % 60, "Driving_License": 1,
+             "Region_Code": float(i % 50), "Previously_Insured": i % 2, "Vehicle_Age": "1-2 Year",
+             "Vehicle_Damage": "Yes", "Annual_Premium": 1000.0 + i, "Policy_Sales_Channel": 26.0,
+             "Vintage": 10 + i % 280, "Response": i % 2} for i in range(start, stop)]
+
+
+@pytest.mark.parametrize("export_workers", [1, 2])
+def test_documents_inserted_during_an_export_are_fetched_once(mongo_client, monkeypatch, tmp_path, export_workers):
+    collection = mongo_client[DATABASE_NAME]["vehicles"]
+    collection.insert_many(vehicle_documents(0, 100))
+    get_max_value = Proj1Data.get_max_value
+    inserted = iter([vehicle_documents(100, 130), vehicle_documents(130, 150)])
+
+    def get_max_value_then_insert(self, *args, **kwargs):
+        # a writer inserts documents right after the run has read its upper bound
+        high = get_max_value(self, *args, **kwargs)
+        documents = next(inserted, None)
+        if documents:
+            collection.insert_many(documents)
+        return high
+
+    monkeypatch.setattr(Proj1Data, "get_max_value", get_max_value_then_insert)
+    config = DataIngestionConfig(collection_name="vehicles", store_dir=str(tmp_path / "store"), file_format="csv",
+                                 export_workers=export_workers, export_partitions=3, export_use_processes=False)
+
+    first = DataIngestion(config).update_feature_store()
+    assert len(first) == 100
+    second = DataIngestion(config).update_feature_store()
+    assert sorted(second["Annual_Premium"]) == [1000.0 + i for i in range(130)]
+    third = DataIngestion(config).update_feature_store()
+    assert sorted(third["Annual_Premium"]) == [1000.0 + i for i in range(150)]
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "feather", "csv"])
+def test_the_feature_store_and_split_files_are_named_after_the_file_format(file_format):
+    config = DataIngestionConfig(file_format=file_format)
+
+    for path in (config.feature_store_file_path, config.training_file_path, config.testing_file_path):
+        assert path.endswith(f".{file_format}")
+    assert DataIngestionConfig(file_format=file_format, training_file_path="train.data").training_file_path == "train.data"
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+from vehicle_records import vehicle_frame
+
+from src.components.data_transformation import DataTransformation
+from src.constants import TARGET_COLUMN
+from src.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
+from src.entity.config_entity import DataTransformationConfig
+
+
+def transform(tmp_path, frame, out_of_core: bool, resampling_strategy: str):
+    frame.to_parquet(tmp_path / 'train.parquet')
+    frame.iloc[:500].to_parquet(tmp_path / 'test.parquet')
+    output_dir = tmp_path / ('out_of_core' if out_of_core else 'in_memory')
+    config = DataTransformationConfig(transformed_file_path_train=str(output_dir / 'train.npy'),
+                                      transformed_file_path_test=str(output_dir / 'test.npy'),
+                                      transformed_file_path_validation=str(output_dir / 'validation.npy'),
+                                      transformed_file_path_train_unresampled=str(output_dir / 'train_unresampled.npy'),
+                                      transformed_object_file_path=str(output_dir / 'preprocessing.pkl'),
+                                      chunk_size=700, out_of_core=out_of_core, resampling_strategy=resampling_strategy,
+                                      validation_split_ratio=0.1, write_binned=False)
+    ingestion = DataIngestionArtifact(trained_file_path=str(tmp_path / 'train.parquet'),
+                                      test_file_path=str(tmp_path / 'test.parquet'), file_format='parquet')
+    transformation = DataTransformation(config, DataValidationArtifact(validation_status=True, message='',
+                                                                       validation_report_file_path=''), ingestion)
+    return transformation, transformation.initalize_transformation()
+
+
+@pytest.mark.parametrize('out_of_core', [False, True])
+def test_validation_rows_are_held_out_before_resampling(tmp_path, out_of_core):
+    frame = vehicle_frame(3000)
+    transformation, artifact = transform(tmp_path, frame, out_of_core, resampling_strategy='undersample')
+
+    held_out = transformation.validation_rows(len(frame))
+    validation = np.load(artifact.transformed_validation_file_path)
+    train = np.load(artifact.transformed_train_file_path)
+    assert len(validation) == held_out.sum() == 300
+    # the validation rows keep the class balance of the data, only the training rows are resampled
+    np.testing.assert_array_equal(validation[:, -1], frame[TARGET_COLUMN].to_numpy()[held_out])
+    assert train[:, -1].mean() > frame[TARGET_COLUMN].mean()
+    assert not (train[:, None, :-1] == validation[None, :, :-1]).all(axis=2).any()
+
+
+def test_resampled_out_of_core_train_array_keeps_the_float32_features(tmp_path):
+    _, artifact = transform(tmp_path, vehicle_frame(3000), out_of_core=True, resampling_strategy='smote')
+
+    train = np.load(artifact.transformed_train_file_path, mmap_mode='r')
+    assert train.dtype == np.load(artifact.transformed_test_file_path, mmap_mode='r').dtype == np.float32
+    assert set(np.unique(train[:, -1])) == {0.0, 1.0}
+
+
+def test_in_memory_and_out_of_core_hold_out_the_same_validation_array(tmp_path):
+    frame = vehicle_frame(3000)
+    arrays = [np.load(transform(tmp_path, frame, out_of_core, resampling_strategy='none')[1].transformed_validation_file_path)
+              for out_of_core in (False, True)]
+
+    np.testing.assert_allclose(arrays[0], arrays[1], rtol=1e-6, atol=1e-6)
+
+
+def baseline_features(frame: pd.DataFrame) -> pd.DataFrame:
+    '''The per-chunk pandas feature engineering DataTransformation used before FeatureEncoder.'''
+    dataframe = frame.drop(columns=[TARGET_COLUMN, '_id'])
+    dataframe['Gender'] = dataframe['Gender'].map({'Male': 1, 'Female': 0}).astype(int)
+    for column in ('Vehicle_Age', 'Vehicle_Damage'):
+        dummies = pd.get_dummies(dataframe[column], prefix=column, drop_first=True)
+        dataframe = pd.concat([dataframe.drop(columns=[column]), dummies], axis=1)
+    dataframe = dataframe.rename(columns={'Vehicle_Age_< 1 Year': 'Vehicle_Age_lt_1_year',
+                                          'Vehicle_Age_> 2 Year': 'Vehicle_Age_gt_2_year'})
+    return dataframe.astype({name: int for name in ('Vehicle_Age_lt_1_year', 'Vehicle_Age_gt_2_year', 'Vehicle_Damage_Yes')})
+
+
+@pytest.mark.parametrize('chunk_size', [None, 700])
+def test_encoded_features_match_the_baseline_pandas_pipeline(tmp_path, chunk_size):
+    frame = vehicle_frame(3000).assign(_id=[f"{index:024x}" for index in range(3000)])
+    frame.to_parquet(tmp_path / 'train.parquet')
+    transformation = DataTransformation(DataTransformationConfig(chunk_size=chunk_size), None,
+                                        DataIngestionArtifact(trained_file_path=str(tmp_path / 'train.parquet'),
+                                                              test_file_path=None, file_format='parquet'))
+
+    features, target = transformation.encode_dataset(str(tmp_path / 'train.parquet'))
+
+    expected = baseline_features(frame)
+    assert transformation.encoder.feature_names == list(expected.columns)
+    for index, name in enumerate(expected.columns):
+        np.testing.assert_array_equal(features[:, index], expected[name].to_numpy(dtype=np.float32), err_msg=name)
+    np.testing.assert_array_equal(target, frame[TARGET_COLUMN].to_numpy())
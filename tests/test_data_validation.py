@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import ks_2samp
+
+from vehicle_records import vehicle_frame
+
+from src.components.data_validation import DataValidation
+from src.constants import SCHEMA_FILE_PATH
+from src.entity.artifact_entity import DataIngestionArtifact
+from src.entity.config_entity import DataValidationConfig
+from src.utils.data_profile import (DataProfiler, ks_statistic, population_stability_index, profile_checks,
+                                    profile_dataframe, schema_fingerprint)
+from src.utils.main_utils import read_yaml_file, save_dataframe, write_yaml_file
+
+
+def histogram(values: np.ndarray, schema_config: dict, bins: int) -> list:
+    profiler = DataProfiler(schema_config, bins)
+    profiler.update(pd.DataFrame({"Age": values}))
+    return profiler.to_dict()["numeric"]["Age"]["histogram"]
+
+
+def test_ks_statistic_matches_scipy_on_values_aligned_with_the_bins():
+    schema_config = read_yaml_file(SCHEMA_FILE_PATH)
+    rng = np.random.default_rng(0)
+    expected, actual = rng.integers(18, 99, 3000), rng.integers(25, 99, 2000)
+    # Age is profiled over [18, 100]: 82 bins put every integer below 99 in a bin of its own
+    statistic = ks_statistic(histogram(expected, schema_config, 82), histogram(actual, schema_config, 82))
+
+    assert statistic == pytest.approx(ks_2samp(expected, actual).statistic, abs=1e-12)
+
+    continuous = rng.normal(50, 10, 3000), rng.normal(53, 10, 2000)
+    lower_bound = ks_statistic(*(histogram(values, schema_config, 64) for values in continuous))
+    assert ks_2samp(*continuous).statistic - 0.05 < lower_bound <= ks_2samp(*continuous).statistic
+
+
+def test_population_stability_index_matches_the_hand_computed_value():
+    # shares 0.5/0.3/0.2 against 0.3/0.3/0.4
+    psi = (0.3 - 0.5) * np.log(0.3 / 0.5) + (0.4 - 0.2) * np.log(0.4 / 0.2)
+    assert psi == pytest.approx(0.24079, abs=1e-5)
+    assert population_stability_index([50, 30, 20], [30, 30, 40]) == pytest.approx(psi, abs=1e-12)
+    assert population_stability_index([50, 30, 20], [5, 3, 2]) == pytest.approx(0.0, abs=1e-15)
+    # an empty bin counts as a share of 1e-4
+    assert population_stability_index([10, 0], [5, 5]) == pytest.approx(
+        (0.5 - 1.0) * np.log(0.5 / 1.0) + (0.5 - 1e-4) * np.log(0.5 / 1e-4), abs=1e-12)
+
+
+def test_profile_checks_report_every_failed_check():
+    schema_config = read_yaml_file(SCHEMA_FILE_PATH)
+    frame = vehicle_frame(200)
+    assert profile_checks(profile_dataframe(frame, schema_config, 16), schema_config, 0.0, "train") == []
+
+    frame = frame.drop(columns="Vintage").assign(Extra=1)
+    frame.loc[0, "Age"] = 150
+    frame.loc[1, "Gender"] = "Unknown"
+    frame.loc[2:5, "Region_Code"] = np.nan
+    frame["Annual_Premium"] = frame["Annual_Premium"].astype(object)
+    frame.loc[6, "Annual_Premium"] = "n/a"
+
+    errors = profile_checks(profile_dataframe(frame, schema_config, 16), schema_config, 0.01, "train")
+
+    expected = ["train: missing columns ['Vintage']",
+                "train: unexpected columns ['Extra']",
+                "train: column Annual_Premium has dtype object, expected float",
+                "train: column Region_Code null rate 0.0200 > 0.01",
+                "train: column Annual_Premium has 1 non-numeric values",
+                "train: column Age has 0 values below and 1 above the range [18.0, 100.0]",
+                "train: column Gender has 1 values outside the domain, e.g. ['Unknown']"]
+    assert sorted(errors) == sorted(expected)
+    assert profile_checks(profile_dataframe(frame, schema_config, 16), schema_config, 0.05, "train") == \
+        [error for error in errors if "null rate" not in error]
+
+
+def ingested_splits(tmp_path, fingerprint_matches: bool = True) -> DataValidation:
+    '''
+    Writes train/test parquet files and an ingestion profile file whose profiles are marked with
+    rows=-1, so that a profile read from it is told apart from one streamed from the files.
+    '''
+    schema_config = read_yaml_file(SCHEMA_FILE_PATH)
+    config = DataValidationConfig(chunk_size=64)
+    fingerprint = schema_fingerprint(schema_config, config.histogram_bins)
+    paths = {split: str(tmp_path / f"{split}.parquet") for split in ("train", "test")}
+    for seed, split in enumerate(paths):
+        save_dataframe(paths[split], vehicle_frame(300 + seed, seed), "parquet")
+    profile_file_path = str(tmp_path / "profile.yaml")
+    write_yaml_file(profile_file_path, {"schema_fingerprint": fingerprint,
+                                        "profiles": {split: {"rows": -1} for split in paths}})
+    artifact = DataIngestionArtifact(trained_file_path=paths["train"], test_file_path=paths["test"], file_format="parquet",
+                                     profile_file_path=profile_file_path,
+                                     schema_fingerprint=fingerprint if fingerprint_matches else "stale")
+    return DataValidation(artifact, config)
+
+
+def test_the_ingestion_profiles_are_used_when_the_schema_fingerprint_matches(tmp_path, monkeypatch):
+    data_validation = ingested_splits(tmp_path)
+    monkeypatch.setattr(data_validation, "profile_file", lambda *args: pytest.fail("a split file was read"))
+
+    assert data_validation.load_profiles() == ({"rows": -1}, {"rows": -1})
+
+
+@pytest.mark.parametrize("fingerprint_matches", [False, True])
+def test_the_split_files_are_streamed_without_a_trusted_profile(tmp_path, fingerprint_matches):
+    data_validation = ingested_splits(tmp_path, fingerprint_matches)
+    if fingerprint_matches:
+        # profiled against the current schema, but the profile file is gone
+        (tmp_path / "profile.yaml").unlink()
+
+    train_profile, test_profile = data_validation.load_profiles()
+
+    assert (train_profile["rows"], test_profile["rows"]) == (300, 301)
+    # streaming in chunks of 64 rows profiles the file exactly as ingestion profiles it in memory
+    schema_config = read_yaml_file(SCHEMA_FILE_PATH)
+    assert train_profile == profile_dataframe(vehicle_frame(300, 0), schema_config,
+                                              data_validation.data_validation_config.histogram_bins)
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+
+from src.constants import TARGET_COLUMN
+from src.entity.estimator import CompiledForest, VehicleInsuranceModel, load_model_package, save_model_package
+from src.utils.main_utils import load_object, save_object
+from vehicle_records import fit_model, vehicle_frame
+
+
+ESTIMATORS = {
+    "random_forest": (lambda: RandomForestClassifier(n_estimators=20, max_depth=12, random_state=1), False),
+    "hist_gradient_boosting": (lambda: HistGradientBoostingClassifier(max_iter=30, random_state=1), False),
+    "binned_hist_gradient_boosting": (lambda: HistGradientBoostingClassifier(max_iter=30, random_state=1), True),
+}
+
+
+@pytest.mark.parametrize("family", ESTIMATORS)
+@pytest.mark.parametrize("decision_threshold", [None, 0.3])
+def test_model_package_predicts_like_the_dill_pickle(tmp_path, family, decision_threshold):
+    make_estimator, binned = ESTIMATORS[family]
+    model = fit_model(vehicle_frame(3000), make_estimator(), binned, decision_threshold)
+    save_object(str(tmp_path / "model.pkl"), model)
+    save_model_package(model, str(tmp_path / "package" / "model.json"))
+
+    pickled = load_object(str(tmp_path / "model.pkl"))
+    package = load_model_package(str(tmp_path / "package" / "model.json"))
+    records = vehicle_frame(2000, seed=1).drop(columns=TARGET_COLUMN)
+    np.testing.assert_array_equal(package.transform(records), pickled.transform(records))
+    np.testing.assert_array_equal(package.predict_proba(records), pickled.predict_proba(records))
+    np.testing.assert_array_equal(package.predict(records), pickled.predict(records))
+
+
+@pytest.mark.parametrize("family", ESTIMATORS)
+@pytest.mark.parametrize("float32_thresholds", [False, True])
+def test_compiled_forest_matches_sklearn_probabilities(family, float32_thresholds):
+    make_estimator, binned = ESTIMATORS[family]
+    model = fit_model(vehicle_frame(3000), make_estimator(), binned)
+    estimator = model.trained_model_object
+    features = np.asarray(model.transform(vehicle_frame(1000, seed=1).drop(columns=TARGET_COLUMN)), dtype=np.float32)
+    compiled = CompiledForest.from_estimator(estimator, float32_thresholds=float32_thresholds, block_rows=128)
+    if not binned:
+        # rows holding the float32 rounding of a split threshold, where quantising could flip the split
+        threshold = CompiledForest.from_estimator(estimator).threshold
+        splits = np.flatnonzero(np.isfinite(threshold))
+        splits = np.random.default_rng(0).choice(splits, min(len(splits), 2000), replace=False)
+        edges = features[np.arange(len(splits)) % len(features)]
+        edges[np.arange(len(splits)), compiled.feature[splits]] = threshold[splits].astype(np.float32)
+        features = np.vstack([features, edges])
+
+    np.testing.assert_allclose(compiled.predict_proba(features), estimator.predict_proba(features), rtol=1e-12, atol=1e-12)
+    np.testing.assert_array_equal(compiled.predict(features), estimator.predict(features))
+
+
+def test_compiled_forest_sends_missing_values_the_learned_way():
+    frame = vehicle_frame(3000)
+    model = fit_model(frame, HistGradientBoostingClassifier(max_iter=30, random_state=1))
+    estimator = model.trained_model_object
+    features = np.asarray(model.transform(vehicle_frame(500, seed=1).drop(columns=TARGET_COLUMN)), dtype=np.float32)
+    features[::3, 0] = np.nan
+    features[::5, -1] = np.nan
+
+    compiled = CompiledForest.from_estimator(estimator)
+    np.testing.assert_allclose(compiled.predict_proba(features), estimator.predict_proba(features), rtol=1e-12, atol=1e-12)
+
+
+def test_fused_model_scores_records_like_the_pandas_path():
+    model = fit_model(vehicle_frame(3000), ESTIMATORS["random_forest"][0](), decision_threshold=0.4)
+    fused = VehicleInsuranceModel(model, compiled_max_rows=0)
+    frame = vehicle_frame(500, seed=1).drop(columns=TARGET_COLUMN)
+    records = {name: frame[name].to_numpy() for name in frame.columns}
+
+    np.testing.assert_array_equal(fused.transform(records), model.transform(frame))
+    np.testing.assert_array_equal(fused.predict_proba(records), model.predict_proba(frame))
+    np.testing.assert_array_equal(fused.predict(frame.to_records(index=False)), model.predict(frame))
+    assert fused.predict(frame.iloc[0].to_dict()) == model.predict(frame.iloc[:1])
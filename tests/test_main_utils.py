@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from vehicle_records import vehicle_frame
+
+from src.constants import SCHEMA_FILE_PATH
+from src.entity.estimator import FeatureEncoder
+from src.utils.main_utils import get_schema_dtypes, read_dataframe, read_yaml_file, save_dataframe
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "feather", "csv"])
+def test_schema_dtypes_are_applied_on_read(tmp_path, file_format):
+    schema_config = read_yaml_file(SCHEMA_FILE_PATH)
+    frame = vehicle_frame(500)
+    frame.loc[3, "Gender"] = "Unknown"
+    frame["Vintage"] = frame["Vintage"].astype(float)
+    frame.loc[4, "Vintage"] = np.nan
+    file_path = str(tmp_path / f"data.{file_format}")
+    save_dataframe(file_path, frame, file_format)
+
+    dataframe = read_dataframe(file_path, file_format, dtypes=get_schema_dtypes(schema_config))
+
+    for name, categories in schema_config["category_values"].items():
+        assert dataframe[name].dtype == pd.CategoricalDtype(categories=categories)
+    # 0/1 flags and ages fit in int8; an int column with missing values is read as float32
+    assert {name: str(dataframe[name].dtype) for name in ("Age", "Driving_License", "Previously_Insured", "Response")} == \
+        {"Age": "int8", "Driving_License": "int8", "Previously_Insured": "int8", "Response": "int8"}
+    assert dataframe["Vintage"].dtype == np.float32 and np.isnan(dataframe.loc[4, "Vintage"])
+    for name in ("Region_Code", "Annual_Premium", "Policy_Sales_Channel"):
+        assert dataframe[name].dtype == np.float32
+    np.testing.assert_array_equal(dataframe["Annual_Premium"], frame["Annual_Premium"].astype(np.float32))
+
+    # a category outside the vocabulary is read as missing, and the encoder refuses it
+    assert dataframe["Gender"].isna().tolist() == [index == 3 for index in range(len(frame))]
+    assert (dataframe["Gender"].drop(index=3) == frame["Gender"].drop(index=3)).all()
+    with pytest.raises(ValueError, match="outside"):
+        FeatureEncoder(schema_config).category_codes("Gender", dataframe["Gender"])
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from sklearn.metrics import f1_score, precision_score, recall_score, roc_auc_score
+
+from src.components.model_evaluation import ModelEvaluation, ResampledMetrics, bootstrap_rows
+from src.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact
+from src.entity.config_entity import ModelEvaluationConfig
+from src.utils.main_utils import save_object
+
+
+def labelled_scores(n_rows: int, seed: int, separation: float) -> tuple:
+    # scores rounded to two decimals, so that many rows tie
+    rng = np.random.default_rng(seed)
+    y_true = rng.random(n_rows) < 0.3
+    scores = np.clip(rng.normal(0.4 + separation * y_true, 0.2), 0, 1).round(2)
+    return y_true, scores >= 0.5, scores
+
+
+def test_resampled_metrics_match_sklearn_with_tied_scores():
+    y_true, y_pred, scores = labelled_scores(2000, 0, 0.2)
+    assert len(np.unique(scores)) < 200
+    rows = bootstrap_rows(np.random.default_rng(1), len(y_true), 5)
+
+    metrics = ResampledMetrics(y_true, y_pred, scores)(rows)
+
+    for metric in (f1_score, precision_score, recall_score):
+        expected = [metric(y_true[resample], y_pred[resample]) for resample in rows]
+        np.testing.assert_allclose(metrics[metric.__name__], expected, rtol=0, atol=1e-12)
+    expected = [roc_auc_score(y_true[resample], scores[resample]) for resample in rows]
+    np.testing.assert_allclose(metrics["roc_auc_score"], expected, rtol=0, atol=1e-12)
+
+
+def test_undefined_metrics_are_zero_as_in_sklearn():
+    y_true = np.array([True, True, False, False])
+    metrics = ResampledMetrics(y_true, np.zeros(4, dtype=bool), np.array([0.1, 0.2, 0.3, 0.4]))(np.array([[2, 3, 2, 3]]))
+
+    assert metrics["precision_score"][0] == metrics["recall_score"][0] == metrics["f1_score"][0] == 0
+    assert np.isnan(metrics["roc_auc_score"][0])
+
+
+def evaluation(tmp_path, changed_threshold_score: float) -> ModelEvaluation:
+    test_file_path, model_file_path = str(tmp_path / "test.npy"), str(tmp_path / "model.pkl")
+    np.save(test_file_path, np.zeros((4, 3), dtype=np.float32))
+    save_object(model_file_path, "trained model")
+    return ModelEvaluation(
+        ModelEvaluationConfig(report_file_path=str(tmp_path / "report.yaml"), changed_threshold_score=changed_threshold_score,
+                              n_resamples=400, bootstrap_batch_size=128),
+        DataTransformationArtifact(transformed_train_file_path=None, transformed_test_file_path=test_file_path,
+                                   preprocessing_object_file_path=None),
+        ModelTrainerArtifact(trained_model_file_path=model_file_path, metric_artifact=None, search_report_file_path=None))
+
+
+@pytest.mark.parametrize("threshold, accepted", [
+    (lambda f1: f1["lower"] - 1e-3, True),
+    (lambda f1: f1["lower"], False),
+    # a mean improvement above the threshold is not enough when the interval reaches below it
+    (lambda f1: (f1["lower"] + f1["mean"]) / 2, False),
+])
+def test_a_model_is_accepted_only_when_the_lower_bound_exceeds_the_threshold(tmp_path, monkeypatch, threshold, accepted):
+    y_true, trained_pred, trained_scores = labelled_scores(3000, 0, 0.25)
+    production_pred, production_scores = trained_pred.copy(), trained_scores.copy()
+    # the production model misses a random tenth of the positives
+    missed = y_true & (np.random.default_rng(2).random(len(y_true)) < 0.1)
+    production_pred[missed], production_scores[missed] = False, 0.0
+    outputs = {"trained": (trained_pred, trained_scores), "production": (production_pred, production_scores)}
+    f1 = evaluation(tmp_path, 0.0).bootstrap_improvement(y_true, outputs["trained"], outputs["production"])["f1_score"]
+    assert 0 < f1["lower"] < f1["mean"] < f1["upper"]
+
+    model_evaluation = evaluation(tmp_path, threshold(f1))
+    monkeypatch.setattr(model_evaluation, "get_best_model", lambda: "production model")
+    monkeypatch.setattr(model_evaluation, "score_models", lambda *args: (y_true, outputs))
+    artifact = model_evaluation.initiate_model_evaluation()
+
+    assert artifact.is_model_accepted == accepted
@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from src.components.model_pusher import ModelPusher
+from src.constants import MODEL_PACKAGE_ARRAYS_FILE_NAME
+from src.entity.config_entity import ModelPusherConfig
+from src.exception import MyException
+
+
+def write_model(directory, seed: int):
+    """
+    Writes a stand-in model package (manifest and arrays files) and pickled model, returning their paths.
+    """
+    os.makedirs(directory, exist_ok=True)
+    payload = os.urandom(64 * 1024) + bytes([seed]) * 4096
+    package_file_path = os.path.join(directory, "model.json")
+    model_file_path = os.path.join(directory, "model.pkl")
+    with open(package_file_path, "w") as file:
+        file.write(f'{{"seed": {seed}}}')
+    with open(os.path.join(directory, MODEL_PACKAGE_ARRAYS_FILE_NAME), "wb") as file:
+        file.write(payload)
+    with open(model_file_path, "wb") as file:
+        file.write(payload[::-1])
+    return package_file_path, model_file_path
+
+
+def chunked_pusher() -> ModelPusher:
+    return ModelPusher(model_pusher_config=ModelPusherConfig(chunk_average_size=4096, chunk_min_size=1024,
+                                                             chunk_max_size=16384))
+
+
+def test_retrain_restores_the_pickled_model_of_the_latest_version(s3_bucket, tmp_path):
+    pusher = chunked_pusher()
+    first = pusher.push(*write_model(tmp_path / "first", 1))
+    package_file_path, model_file_path = write_model(tmp_path / "second", 2)
+    second = pusher.push(package_file_path, model_file_path)
+
+    restored = tmp_path / "production" / "model.pkl"
+    os.makedirs(restored.parent)
+    assert pusher.download_model_file(str(restored)) == second.version
+    assert restored.read_bytes() == open(model_file_path, "rb").read()
+
+    assert pusher.download_model_file(str(restored), version=first.version) == first.version
+    assert restored.read_bytes() == open(tmp_path / "first" / "model.pkl", "rb").read()
+    assert not os.path.exists(f"{restored}.incoming")
+
+
+def test_push_is_skipped_only_when_the_pickled_model_is_unchanged(s3_bucket, tmp_path):
+    pusher = chunked_pusher()
+    package_file_path, model_file_path = write_model(tmp_path, 1)
+    first = pusher.push(package_file_path, model_file_path)
+    assert pusher.push(package_file_path, model_file_path).version == first.version
+
+    with open(model_file_path, "ab") as file:
+        file.write(b"warm-started trees")
+    second = pusher.push(package_file_path, model_file_path)
+    assert second.version != first.version
+    assert second.reused_chunks > 0
+
+
+def test_rollback_points_latest_back_to_the_previous_version(s3_bucket, tmp_path):
+    pusher = chunked_pusher()
+    first = pusher.push(*write_model(tmp_path / "first", 1))
+    second = pusher.push(*write_model(tmp_path / "second", 2))
+
+    assert pusher.rollback() == first.version
+    pointer, _ = pusher.current_pointer()
+    assert (pointer["version"], pointer["previous"]) == (first.version, second.version)
+    assert pusher.list_versions() == sorted([first.version, second.version])
+
+    assert pusher.rollback(version=second.version) == second.version
+    assert pusher.current_pointer()[0]["version"] == second.version
+    with pytest.raises(MyException, match="does not exist"):
+        pusher.rollback(version="19700101T000000Z-missing")
+
+
+def test_a_pointer_changed_concurrently_is_not_overwritten(s3_bucket, tmp_path, monkeypatch):
+    pusher = chunked_pusher()
+    monkeypatch.setattr(pusher, "current_pointer", lambda: (None, None))
+    first = pusher.push(*write_model(tmp_path / "first", 1))
+    # a second push that also saw an empty registry may not create LATEST again
+    with pytest.raises(MyException, match="changed during the update"):
+        pusher.push(*write_model(tmp_path / "second", 2))
+    monkeypatch.undo()
+    assert pusher.current_pointer()[0]["version"] == first.version
+
+    stale = pusher.current_pointer()
+    second = pusher.push(*write_model(tmp_path / "third", 3))
+    monkeypatch.setattr(pusher, "current_pointer", lambda: stale)
+    # a rollback that read LATEST before the push is rejected by the ETag condition
+    with pytest.raises(MyException, match="changed during the update"):
+        pusher.rollback(version=first.version)
+    monkeypatch.undo()
+    assert pusher.current_pointer()[0]["version"] == second.version
+
+
+def test_a_version_manifest_is_never_overwritten(s3_bucket, tmp_path, monkeypatch):
+    pusher = chunked_pusher()
+    first = pusher.push(*write_model(tmp_path / "first", 1))
+    manifest = pusher.get_version(first.version)
+
+    build_version = pusher.build_version
+    def clashing_version(*args):
+        return {**build_version(*args), "version": first.version}
+    monkeypatch.setattr(pusher, "build_version", clashing_version)
+
+    with pytest.raises(MyException):
+        pusher.push(*write_model(tmp_path / "second", 2))
+    assert pusher.get_version(first.version) == manifest
+    assert pusher.current_pointer()[0]["version"] == first.version
@@ -0,0 +1,111 @@
+import multiprocessing
+import time
+
+import numpy as np
+import yaml
+from sklearn.dummy import DummyClassifier
+from sklearn.ensemble import RandomForestClassifier
+from vehicle_records import fit_model, vehicle_frame
+
+from src.components import model_trainer
+from src.components.model_trainer import ModelTrainer
+from src.constants import TARGET_COLUMN
+from src.entity.artifact_entity import DataTransformationArtifact
+from src.entity.config_entity import ModelTrainerConfig
+from src.entity.estimator import optimal_threshold
+from src.utils.main_utils import save_object
+
+
+class SlowClassifier(DummyClassifier):
+    '''A classifier whose fit takes `fit_seconds`, to run the search out of its time budget.'''
+
+    def __init__(self, fit_seconds: float = 0.0, strategy: str = 'most_frequent'):
+        super().__init__(strategy=strategy)
+        self.fit_seconds = fit_seconds
+
+    def fit(self, X, y, sample_weight=None):
+        time.sleep(self.fit_seconds)
+        return super().fit(X, y, sample_weight)
+
+
+def make_trainer(tmp_path, grid: dict, **config) -> ModelTrainer:
+    rng = np.random.default_rng(0)
+    train = np.c_[rng.normal(size=(2000, 4)), rng.integers(0, 2, 2000)]
+    np.save(tmp_path / 'train.npy', train)
+    np.save(tmp_path / 'test.npy', train[:500])
+    model_config = {'model_selection': {'slow': {'class': f"{SlowClassifier.__module__}.SlowClassifier", 'grid': grid}}}
+    (tmp_path / 'model.yaml').write_text(yaml.safe_dump(model_config))
+    artifact = DataTransformationArtifact(transformed_train_file_path=str(tmp_path / 'train.npy'),
+                                          transformed_test_file_path=str(tmp_path / 'test.npy'),
+                                          preprocessing_object_file_path=str(tmp_path / 'preprocessing.pkl'))
+    return ModelTrainer(artifact, ModelTrainerConfig(model_config_file_path=str(tmp_path / 'model.yaml'),
+                                                     min_resources=100, reduction_factor=2, n_jobs=2, **config))
+
+
+def test_search_stops_running_fits_at_the_time_budget(tmp_path):
+    # one candidate of the first rung is still fitting when the budget runs out
+    trainer = make_trainer(tmp_path, {'fit_seconds': [0.0, 0.01, 60.0]}, max_seconds=8)
+    candidates = trainer.get_candidates()
+
+    started = time.perf_counter()
+    best, stopped = trainer.successive_halving(candidates, n_fit_rows=1500)
+
+    assert stopped == 'time budget'
+    assert time.perf_counter() - started < 30
+    assert best['params']['fit_seconds'] < 60
+    # the worker still fitting was terminated and joined, not left running
+    assert multiprocessing.active_children() == []
+
+
+def test_search_completes_within_its_budget(tmp_path):
+    trainer = make_trainer(tmp_path, {'fit_seconds': [0.0, 0.01]}, max_seconds=120)
+
+    best, stopped = trainer.successive_halving(trainer.get_candidates(), n_fit_rows=1500)
+
+    assert stopped == 'completed'
+    assert [rung['rows'] for rung in best['rungs']] == [100, 200, 400, 800, 1500][:len(best['rungs'])]
+
+
+def test_decision_threshold_is_tuned_on_the_validation_array_only(tmp_path, monkeypatch):
+    trainer = make_trainer(tmp_path, {'fit_seconds': [0.0], 'strategy': ['stratified']}, expected_accuracy=0.0,
+                           search_report_file_path=str(tmp_path / 'search_report.yaml'))
+    rng = np.random.default_rng(1)
+    np.save(tmp_path / 'validation.npy', np.c_[rng.normal(size=(300, 4)), rng.integers(0, 2, 300)])
+    trainer.data_transformation_artifact.transformed_validation_file_path = str(tmp_path / 'validation.npy')
+    save_object(str(tmp_path / 'preprocessing.pkl'), None)
+    swept, saved = [], []
+    monkeypatch.setattr(model_trainer, 'optimal_threshold',
+                        lambda y_true, scores, **options: swept.append(len(scores)) or optimal_threshold(y_true, scores, **options))
+    monkeypatch.setattr(trainer, 'save_model', saved.append)
+
+    trainer.initiate_model_trainer()
+
+    assert swept == [300]
+    report = yaml.safe_load((tmp_path / 'search_report.yaml').read_text())
+    assert report['decision_threshold']['validation_rows'] == 300
+    assert saved[0].decision_threshold == report['decision_threshold']['threshold']
+
+
+def test_retrain_starts_from_the_version_restored_by_the_pipeline(tmp_path, monkeypatch):
+    frame = vehicle_frame(1500)
+    production_model = fit_model(frame, RandomForestClassifier(n_estimators=10, random_state=0))
+    save_object(str(tmp_path / 'production.pkl'), production_model)
+    save_object(str(tmp_path / 'preprocessing.pkl'), production_model.preprocessing_object)
+    np.save(tmp_path / 'train.npy', np.c_[production_model.transform(frame), frame[TARGET_COLUMN].to_numpy()])
+    artifact = DataTransformationArtifact(transformed_train_file_path=str(tmp_path / 'train.npy'),
+                                          transformed_test_file_path=str(tmp_path / 'train.npy'),
+                                          preprocessing_object_file_path=str(tmp_path / 'preprocessing.pkl'))
+    trainer = ModelTrainer(artifact, ModelTrainerConfig(
+        retrain=True, retrain_new_estimators=5, retrain_compare_full_refit=False, expected_accuracy=0.0,
+        production_model_file_path=str(tmp_path / 'production.pkl'),
+        search_report_file_path=str(tmp_path / 'report.yaml')))
+    restored = []
+    monkeypatch.setattr(trainer, 'restore_production_model', lambda: restored.append('v2') or 'v2')
+    monkeypatch.setattr(trainer, 'save_model', lambda model: None)
+
+    trainer.initiate_model_trainer(production_version='v1')
+    assert restored == []
+    assert yaml.safe_load((tmp_path / 'report.yaml').read_text())['production_version'] == 'v1'
+
+    trainer.initiate_model_trainer()
+    assert restored == ['v2']
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from src.constants import TARGET_COLUMN
+from src.entity.config_entity import BatchPredictionConfig
+from src.pipline.prediction_pipeline import BatchPrediction
+from src.utils.main_utils import save_object
+from vehicle_records import fit_model, vehicle_frame
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_prediction_skips_records_that_cannot_be_scored(tmp_path, workers):
+    model = fit_model(vehicle_frame(2000), RandomForestClassifier(n_estimators=10, random_state=1))
+    save_object(str(tmp_path / "model.pkl"), model)
+    records = vehicle_frame(1000, seed=1).drop(columns=TARGET_COLUMN)
+    records.insert(0, "id", np.arange(len(records)))
+    records["Age"] = records["Age"].astype(float)
+    records.loc[[3, 250], "Age"] = np.nan
+    records.loc[[10, 11], "Vehicle_Age"] = "> 10 Year"
+    records.loc[[999], "Gender"] = None
+    records.to_parquet(tmp_path / "input.parquet", index=False)
+
+    config = BatchPredictionConfig(model_file_path=str(tmp_path / "model.pkl"), input_file_path=str(tmp_path / "input.parquet"),
+                                   input_file_format="parquet", output_file_path=str(tmp_path / "predictions.parquet"),
+                                   reject_file_path=str(tmp_path / "rejected.parquet"), chunk_size=100, workers=workers)
+    artifact = BatchPrediction(config).initiate_batch_prediction()
+
+    rejected_ids = [3, 10, 11, 250, 999]
+    valid = records[~records["id"].isin(rejected_ids)]
+    assert (artifact.rows, artifact.rejected_rows) == (len(valid), len(rejected_ids))
+    predictions = pd.read_parquet(tmp_path / "predictions.parquet")
+    assert predictions["id"].tolist() == valid["id"].tolist()
+    np.testing.assert_array_equal(predictions["prediction"], model.predict(valid.drop(columns="id")))
+
+    rejected = pd.read_parquet(artifact.reject_output)
+    assert rejected["id"].tolist() == [str(record_id) for record_id in rejected_ids]
+    assert rejected["reason"].tolist() == ["Age is missing or not numeric", "Vehicle_Age is not one of ['1-2 Year', '< 1 Year', '> 2 Year']",
+                                           "Vehicle_Age is not one of ['1-2 Year', '< 1 Year', '> 2 Year']",
+                                           "Age is missing or not numeric", "Gender is not one of ['Female', 'Male']"]
+
+
+def test_batch_prediction_without_rejects_writes_no_reject_file(tmp_path):
+    model = fit_model(vehicle_frame(2000), RandomForestClassifier(n_estimators=10, random_state=1))
+    save_object(str(tmp_path / "model.pkl"), model)
+    vehicle_frame(300, seed=1).drop(columns=TARGET_COLUMN).to_parquet(tmp_path / "input.parquet", index=False)
+
+    config = BatchPredictionConfig(model_file_path=str(tmp_path / "model.pkl"), input_file_path=str(tmp_path / "input.parquet"),
+                                   input_file_format="parquet", output_file_path=str(tmp_path / "predictions.parquet"),
+                                   reject_file_path=str(tmp_path / "rejected.parquet"), chunk_size=100, workers=1)
+    artifact = BatchPrediction(config).initiate_batch_prediction()
+    assert (artifact.rows, artifact.rejected_rows, artifact.reject_output) == (300, 0, None)
+    assert not (tmp_path / "rejected.parquet").exists()
@@ -0,0 +1,62 @@
+import numpy as np
+
+from src.constants import DATABASE_NAME
+from src.data_access.proj1_data import Proj1Data
+
+
+def test_export_fills_fields_missing_from_later_batches(mongo_client):
+    collection = mongo_client[DATABASE_NAME]["sparse"]
+    collection.insert_many([{"id": i, "Age": 20 + i, "Vintage": 100 + i} for i in range(4)] +
+                           [{"id": i, "Age": 20 + i} for i in range(4, 8)] +
+                           [{"id": i, "Age": 20 + i, "Region_Code": 1.5} for i in range(8, 10)])
+
+    df = Proj1Data().export_collection_as_dataframe("sparse", batch_size=4, sort=[("id", 1)])
+
+    assert list(df.columns) == ["Age", "Vintage", "Region_Code"]
+    assert df["Age"].tolist() == list(range(20, 30))
+    np.testing.assert_array_equal(df["Vintage"].to_numpy(), [100, 101, 102, 103] + [np.nan] * 6)
+    np.testing.assert_array_equal(df["Region_Code"].to_numpy(), [np.nan] * 8 + [1.5, 1.5])
+
+
+def test_export_does_not_copy_columns(mongo_client):
+    mongo_client[DATABASE_NAME]["dense"].insert_many([{"id": i, "Age": i, "Annual_Premium": 1.0 * i, "Region_Code": 2.0 * i}
+                                                      for i in range(10)])
+
+    df = Proj1Data().export_collection_as_dataframe("dense", batch_size=3)
+
+    # copying consolidates the two float columns into one block
+    assert df._mgr.nblocks == 3
+    assert len(df) == 10 and df["Annual_Premium"].sum() == 45.0
+
+
+def _insert_rows(client, name: str, n_rows: int) -> None:
+    client[DATABASE_NAME][name].insert_many([{"id": i, "Age": 20 + i % 50, "Annual_Premium": 100.0 * i}
+                                             for i in range(n_rows)])
+
+
+def test_partitions_cover_the_collection_once(mongo_client):
+    _insert_rows(mongo_client, "vehicles", 1000)
+    collection = mongo_client[DATABASE_NAME]["vehicles"]
+    proj1_data = Proj1Data()
+
+    for partition_key in ("_id", "id"):
+        queries = proj1_data.get_partition_queries("vehicles", partition_key=partition_key, num_partitions=7)
+        assert len(queries) == 7
+        ids = [document["id"] for query in queries for document in collection.find(query, {"id": 1})]
+        assert sorted(ids) == list(range(1000))
+
+
+def test_parallel_export_matches_sequential_export(mongo_client):
+    _insert_rows(mongo_client, "vehicles", 1000)
+    proj1_data = Proj1Data()
+
+    for partition_key in ("_id", "id"):
+        df = proj1_data.export_collection_parallel("vehicles", partition_key=partition_key, num_partitions=5,
+                                                   max_workers=3, use_processes=False, batch_size=64,
+                                                   projection={"_id": 0})
+        assert df["id"].tolist() == list(range(1000))
+        assert df["Annual_Premium"].tolist() == [100.0 * i for i in range(1000)]
+
+
+def test_partitions_of_an_empty_collection(mongo_client):
+    assert Proj1Data().get_partition_queries("empty") == []
@@ -0,0 +1,139 @@
+import os
+import shutil
+
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from vehicle_records import fit_model, vehicle_frame
+
+from src.components.model_pusher import ModelPusher
+from src.entity import s3_estimator
+from src.entity.config_entity import ModelPusherConfig
+from src.entity.estimator import PackagedModel, save_model_package
+from src.entity.s3_estimator import S3Estimator
+
+
+class NoNetwork:
+    def __getattr__(self, name):
+        raise AssertionError(f"S3 was called ({name})")
+
+
+@pytest.fixture
+def pusher(s3_bucket):
+    return ModelPusher(model_pusher_config=ModelPusherConfig(chunk_average_size=4096, chunk_min_size=1024,
+                                                             chunk_max_size=16384))
+
+
+def push_model(pusher: ModelPusher, directory, seed: int) -> str:
+    """
+    Pushes a small forest fitted on seeded records and returns the digest of its package, its cache entry.
+    """
+    model = fit_model(vehicle_frame(300, seed), RandomForestClassifier(n_estimators=3, max_depth=4, random_state=seed))
+    manifest_file_path = os.path.join(directory, f"model-{seed}", "model.json")
+    os.makedirs(os.path.dirname(manifest_file_path))
+    save_model_package(model, manifest_file_path)
+    return pusher.get_version(pusher.push(manifest_file_path).version)["digest"]
+
+
+def estimator(pusher: ModelPusher, cache_dir) -> S3Estimator:
+    return S3Estimator(bucket_name=pusher.bucket_name, model_path=pusher.registry, cache_dir=str(cache_dir))
+
+
+def entry_size(cache_dir, entry: str) -> int:
+    entry_dir = os.path.join(cache_dir, "objects", entry)
+    return sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+
+
+def test_a_cached_model_is_loaded_without_calling_s3(pusher, tmp_path):
+    entry = push_model(pusher, tmp_path, 1)
+    estimator(pusher, tmp_path / "cache").load_model()
+
+    cached = estimator(pusher, tmp_path / "cache")
+    cached._s3 = NoNetwork()
+
+    assert isinstance(cached.load_model(), PackagedModel)
+    assert cached.loaded_entry == entry
+
+
+def test_refresh_swaps_in_a_newly_pushed_version(pusher, tmp_path):
+    first = push_model(pusher, tmp_path, 1)
+    serving = estimator(pusher, tmp_path / "cache")
+    old_model = serving.load_model()
+    assert not serving.refresh()
+
+    second = push_model(pusher, tmp_path, 2)
+
+    assert serving.refresh()
+    assert serving.loaded == (second, serving.loaded_model)
+    assert serving.loaded_model is not old_model and first != second
+    assert not serving.refresh()
+
+
+def test_a_rolled_back_version_is_reused_from_the_cache(pusher, tmp_path, monkeypatch):
+    first = push_model(pusher, tmp_path, 1)
+    serving = estimator(pusher, tmp_path / "cache")
+    serving.load_model()
+    push_model(pusher, tmp_path, 2)
+    serving.refresh()
+
+    def download(*args):
+        raise AssertionError("a cached version was downloaded again")
+
+    monkeypatch.setattr(s3_estimator, "download_registry_files", download)
+    pusher.rollback()
+
+    assert serving.refresh()
+    assert serving.loaded_entry == first
+
+
+def test_the_least_recently_used_entries_are_evicted_to_fit_the_size_limit(pusher, tmp_path):
+    cache_dir = tmp_path / "cache"
+    fetching = estimator(pusher, cache_dir)
+    entries = []
+    for seed in (1, 2, 3):
+        entries.append(push_model(pusher, tmp_path, seed))
+        assert fetching.fetch(check_remote=True) == entries[-1]
+    # the second model is the least recently used, then the first
+    for age, entry in zip((1, 2, 0), entries):
+        os.utime(cache_dir / "objects" / entry, (1000 - age * 100, 1000 - age * 100))
+
+    fetching.max_cache_bytes = sum(entry_size(cache_dir, entry) for entry in entries) - entry_size(cache_dir, entries[1])
+    fetching.evict()
+
+    assert sorted(os.listdir(cache_dir / "objects")) == sorted([entries[0], entries[2]])
+    fetching.max_cache_bytes = 0
+    fetching.evict(keep=entries[2])
+    assert os.listdir(cache_dir / "objects") == [entries[2]]
+
+
+def test_entries_removed_by_another_process_are_skipped_or_fetched_again(pusher, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    fetching, entries = estimator(pusher, cache_dir), []
+    for seed in (1, 2):
+        entries.append(push_model(pusher, tmp_path, seed))
+        fetching.fetch(check_remote=True)
+
+    # another process evicts entries[0] between the listing of the cache and its own listdir
+    objects_dir, listdir = str(cache_dir / "objects"), os.listdir
+    def racing_listdir(path):
+        names = listdir(path)
+        if path == objects_dir:
+            shutil.rmtree(os.path.join(objects_dir, entries[0]), ignore_errors=True)
+        return names
+    monkeypatch.setattr(os, "listdir", racing_listdir)
+    fetching.max_cache_bytes = 0
+    fetching.evict(keep=entries[1])
+    monkeypatch.setattr(os, "listdir", listdir)
+
+    # and entries[1] between the fetch and the load
+    serving, load_entry = estimator(pusher, cache_dir), S3Estimator._load_entry
+    def racing_load_entry(self, entry):
+        if not getattr(self, "raced", False):
+            self.raced = True
+            shutil.rmtree(os.path.join(objects_dir, entry))
+        return load_entry(self, entry)
+    monkeypatch.setattr(S3Estimator, "_load_entry", racing_load_entry)
+
+    assert isinstance(serving.load_model(), PackagedModel)
+    assert serving.loaded_entry == entries[1]
+    assert os.path.isdir(os.path.join(objects_dir, entries[1]))
@@ -0,0 +1,113 @@
+import os
+import time
+from dataclasses import dataclass
+
+from src.utils.stage_cache import StageCache
+
+
+@dataclass
+class ToyMetrics:
+    rows: int
+
+
+@dataclass
+class ToyConfig:
+    scale: float = 2.0
+
+
+@dataclass
+class ToyArtifact:
+    output_file_path: str
+    metrics: ToyMetrics
+    note: str = "computed"
+
+
+def toy_stage(cache: StageCache, run_dir, input_file_path: str, config: ToyConfig = ToyConfig()) -> tuple:
+    """
+    Runs a stage writing its scaled input numbers into run_dir, returning its artifact and whether it computed.
+    """
+    output_file_path = os.path.join(run_dir, "out", "values.txt")
+    computed = []
+
+    def compute() -> ToyArtifact:
+        computed.append(True)
+        with open(input_file_path) as file:
+            values = [float(line) * config.scale for line in file]
+        os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+        with open(output_file_path, "w") as file:
+            file.write("\n".join(map(str, values)))
+        return ToyArtifact(output_file_path=output_file_path, metrics=ToyMetrics(rows=len(values)))
+
+    key = cache.compute_key("toy", [input_file_path], schema_section={"columns": ["value"]}, config=config)
+    artifact = cache.run("toy", key, outputs={"values.txt": output_file_path}, compute=compute, artifact_type=ToyArtifact)
+    return artifact, bool(computed)
+
+
+def write_input(tmp_path, values: list) -> str:
+    input_file_path = str(tmp_path / "input.txt")
+    with open(input_file_path, "w") as file:
+        file.write("\n".join(map(str, values)))
+    return input_file_path
+
+
+def test_an_identical_rerun_is_served_from_the_cache(tmp_path):
+    cache = StageCache(cache_dir=str(tmp_path / "cache"))
+    input_file_path = write_input(tmp_path, [1, 2, 3])
+    first, computed = toy_stage(cache, tmp_path / "run1", input_file_path)
+    assert computed
+
+    second, computed = toy_stage(cache, tmp_path / "run2", input_file_path)
+
+    assert not computed
+    # the artifact points at the new run, with its nested dataclass rebuilt
+    assert second == ToyArtifact(output_file_path=os.path.join(tmp_path / "run2", "out", "values.txt"),
+                                 metrics=ToyMetrics(rows=3))
+    with open(second.output_file_path) as file:
+        assert file.read() == "2.0\n4.0\n6.0"
+    # the output is a hard link to the cached file, not a copy
+    assert os.stat(second.output_file_path).st_ino == os.stat(first.output_file_path).st_ino
+
+
+def test_a_changed_input_or_config_misses_the_cache(tmp_path):
+    cache = StageCache(cache_dir=str(tmp_path / "cache"))
+    input_file_path = write_input(tmp_path, [1, 2, 3])
+    toy_stage(cache, tmp_path / "run1", input_file_path)
+
+    _, computed = toy_stage(cache, tmp_path / "run2", input_file_path, ToyConfig(scale=3.0))
+    assert computed
+
+    write_input(tmp_path, [1, 2, 4])
+    artifact, computed = toy_stage(cache, tmp_path / "run3", input_file_path)
+    assert computed
+    with open(artifact.output_file_path) as file:
+        assert file.read() == "2.0\n4.0\n8.0"
+    assert len(cache.entries()) == 3
+
+
+def test_force_recompute_ignores_a_cached_entry(tmp_path):
+    input_file_path = write_input(tmp_path, [1, 2, 3])
+    toy_stage(StageCache(cache_dir=str(tmp_path / "cache")), tmp_path / "run1", input_file_path)
+
+    _, computed = toy_stage(StageCache(cache_dir=str(tmp_path / "cache"), force_recompute=True),
+                            tmp_path / "run2", input_file_path)
+
+    assert computed
+
+
+def test_entries_are_evicted_by_age_then_least_recently_used_first(tmp_path):
+    cache = StageCache(cache_dir=str(tmp_path / "cache"))
+    for values in ([1], [2], [3]):
+        toy_stage(cache, tmp_path / f"run{values[0]}", write_input(tmp_path, values))
+    entries = cache.entries()
+    # last used 10 days, 2 days and 1 day ago
+    for entry, age_days in zip(entries, (10, 2, 1)):
+        used = time.time() - age_days * 86400
+        os.utime(os.path.join(cache.cache_dir, "toy", entry["key"], "entry.yaml"), (used, used))
+
+    removed = cache.evict(max_age_days=5)
+    assert [entry["key"] for entry in removed] == [entries[0]["key"]]
+
+    removed = cache.evict(max_bytes=entries[2]["size"])
+    assert [entry["key"] for entry in removed] == [entries[1]["key"]]
+    assert [entry["key"] for entry in cache.entries()] == [entries[2]["key"]]
+    assert not os.path.exists(os.path.join(cache.cache_dir, "toy", entries[1]["key"]))
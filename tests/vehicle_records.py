@@ -0,0 +1,45 @@
+"""
+Synthetic vehicle insurance records and models fitted on them, shared by the tests.
+"""
+import numpy as np
+import pandas as pd
+
+from src.components.data_transformation import DataTransformation
+from src.constants import SCHEMA_FILE_PATH, TARGET_COLUMN
+from src.entity.estimator import BinnedClassifier, FeatureBinner, FeatureEncoder, MyModel
+from src.utils.main_utils import read_yaml_file
+
+
+def vehicle_frame(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "Gender": rng.choice(["Male", "Female"], n_rows),
+        "Age": rng.integers(20, 85, n_rows),
+        "Driving_License": rng.choice([0, 1], n_rows, p=[0.05, 0.95]),
+        "Region_Code": rng.integers(0, 52, n_rows).astype(float),
+        "Previously_Insured": rng.choice([0, 1], n_rows),
+        "Vehicle_Age": rng.choice(["< 1 Year", "1-2 Year", "> 2 Year"], n_rows),
+        "Vehicle_Damage": rng.choice(["Yes", "No"], n_rows),
+        "Annual_Premium": rng.uniform(2630, 100000, n_rows).round(0),
+        "Policy_Sales_Channel": rng.integers(1, 163, n_rows).astype(float),
+        "Vintage": rng.integers(10, 299, n_rows),
+    })
+    logit = -3 + 3 * (frame.Vehicle_Damage == "Yes") - 3 * frame.Previously_Insured + 0.05 * (frame.Age - 40)
+    frame[TARGET_COLUMN] = (rng.random(n_rows) < 1 / (1 + np.exp(-logit))).astype(int)
+    return frame
+
+
+def fit_model(frame: pd.DataFrame, estimator: object, binned: bool = False, decision_threshold: float = None) -> MyModel:
+    """
+    Fits `estimator` on the transformed records as the trainer does, on bin indices when `binned`.
+    """
+    encoder = FeatureEncoder(read_yaml_file(SCHEMA_FILE_PATH))
+    preprocessing = DataTransformation(None, None, None).get_transformation_object()
+    features = preprocessing.fit_transform(pd.DataFrame(encoder.encode(frame), columns=encoder.feature_names))
+    target = frame[TARGET_COLUMN].to_numpy()
+    if binned:
+        binner = FeatureBinner.fit(features)
+        estimator = BinnedClassifier(binner, estimator.fit(binner.transform(features), target))
+    else:
+        estimator.fit(features, target)
+    return MyModel(preprocessing, estimator, encoder, decision_threshold=decision_threshold)